@@ -34,26 +34,25 @@ async def get_current_user(token: str = Depends(oauth2_scheme)) -> CurrentUser:
             detail="Invalid or expired token"
         )
 
+# Roles accepted by require_role(role); roles not listed accept only themselves
+ROLE_ACCEPTS = {
+    "viewer": frozenset({"viewer", "admin"}),
+}
+
 def require_role(role: str) -> Callable:
     """
     Dependency to require specific role. 
     - 'viewer' accepts both viewer and admin
     - other roles require exact match
+    The accepted set is resolved once here, so each check is one set lookup.
     """
+    accepted = ROLE_ACCEPTS.get(role, frozenset({role}))
+
     async def role_checker(user: CurrentUser = Depends(get_current_user)):
-        if role == "viewer":
-            # Admin can access viewer endpoints
-            if user.role not in ("viewer", "admin"):
-                raise HTTPException(
-                    status_code=status.HTTP_403_FORBIDDEN,
-                    detail="Insufficient permissions"
-                )
-        else:
-            # Exact role match required
-            if user.role != role:
-                raise HTTPException(
-                    status_code=status.HTTP_403_FORBIDDEN,
-                    detail="Insufficient permissions"
-                )
+        if user.role not in accepted:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Insufficient permissions"
+            )
         return user
     return role_checker
\ No newline at end of file
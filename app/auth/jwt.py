@@ -1,10 +1,58 @@
+import hashlib
+import time
+from collections import OrderedDict
 from datetime import datetime, timedelta
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Tuple
 
 from jose import jwt
 from app.config import settings
 
-ALGORITHM = "HS256"
+ALGORITHM = settings.JWT_ALGORITHM
+
+class VerifiedTokenCache:
+    """
+    LRU of decoded token payloads keyed by the token's SHA-256 digest.
+    An entry is only served until the token's own ``exp``, so a cache hit
+    never accepts a token that a fresh decode would reject as expired.
+    """
+    def __init__(self, max_entries: int = 4096):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[bytes, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, token: str) -> Optional[Dict[str, Any]]:
+        key = self.key(token)
+        entry = self._entries.get(key)
+        if entry is None or time.time() >= entry[0]:
+            self._entries.pop(key, None)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, token: str, payload: Dict[str, Any]) -> None:
+        expires_at = payload.get("exp")
+        if expires_at is None or self.max_entries <= 0:
+            return
+        key = self.key(token)
+        self._entries[key] = (float(expires_at), payload)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {"tokens": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+token_cache = VerifiedTokenCache(max_entries=settings.JWT_CACHE_MAX_ENTRIES)
 
 def create_access_token(data: Dict[str, Any], expires_delta: Optional[timedelta] = None) -> str:
     """
@@ -13,14 +61,19 @@ def create_access_token(data: Dict[str, Any], expires_delta: Optional[timedelta]
     to_encode = data.copy()
     if expires_delta is None:
         expires_delta = timedelta(minutes=60)
-    
+
     expire = datetime.utcnow() + expires_delta
     to_encode.update({"exp": expire})
-    
+
     return jwt.encode(to_encode, settings.JWT_SECRET, algorithm=ALGORITHM)
 
 def decode_access_token(token: str) -> Dict[str, Any]:
     """
     Decode and return the JWT payload. Raises JWTError on invalid/expired token.
+    Payloads of already verified tokens are served from the token cache.
     """
-    return jwt.decode(token, settings.JWT_SECRET, algorithms=[ALGORITHM])
\ No newline at end of file
+    payload = token_cache.get(token)
+    if payload is None:
+        payload = jwt.decode(token, settings.JWT_SECRET, algorithms=[ALGORITHM])
+        token_cache.put(token, payload)
+    return dict(payload)
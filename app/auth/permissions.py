@@ -1,33 +1,66 @@
-from enum import Enum
+from enum import IntFlag, auto
+from functools import reduce
+from operator import or_
 from fastapi import Depends, HTTPException, status
-from typing import List, Dict, Optional, Union, Any
-from ..models.user import get_current_user, User
+from typing import List, Dict, Iterable, Tuple, Union
+from ..models.user import get_authenticated_user, AuthenticatedUser, User
 
 
-class Permission(Enum):
-    """User permission levels"""
-    READ = "read"
-    WRITE = "write"
-    DELETE = "delete"
-    ADMIN = "admin"
-    
+class Permission(IntFlag):
+    """User permissions, one bit each so a role's permissions form one mask"""
+    READ = auto()
+    WRITE = auto()
+    DELETE = auto()
+    ADMIN = auto()
+
     # User management permissions
-    CREATE_USERS = "create_users"
-    READ_USERS = "read_users"
-    UPDATE_USERS = "update_users"
-    DELETE_USERS = "delete_users"
-    
+    CREATE_USERS = auto()
+    READ_USERS = auto()
+    UPDATE_USERS = auto()
+    DELETE_USERS = auto()
+
     # Room data permissions
-    CREATE_ROOM_DATA = "create_room_data"
-    READ_ROOM_DATA = "read_room_data"
-    UPDATE_ROOM_DATA = "update_room_data"
-    DELETE_ROOM_DATA = "delete_room_data"
+    CREATE_ROOM_DATA = auto()
+    READ_ROOM_DATA = auto()
+    UPDATE_ROOM_DATA = auto()
+    DELETE_ROOM_DATA = auto()
+
+
+NO_PERMISSIONS = Permission(0)
+ALL_PERMISSIONS = reduce(or_, Permission, NO_PERMISSIONS)
+
+# Compiled once at import: role -> permission bitmask
+ROLE_PERMISSIONS: Dict[str, Permission] = {
+    "admin": ALL_PERMISSIONS,
+    "user": Permission.READ | Permission.WRITE | Permission.READ_ROOM_DATA | Permission.CREATE_ROOM_DATA,
+    "viewer": Permission.READ | Permission.READ_ROOM_DATA,
+}
+
+# Expanded member lists for callers that want to enumerate a role's permissions
+ROLE_PERMISSION_LISTS: Dict[str, Tuple[Permission, ...]] = {
+    role: tuple(p for p in Permission if p in mask) for role, mask in ROLE_PERMISSIONS.items()
+}
+
+
+def permission_mask(permissions: Iterable[Permission]) -> Permission:
+    return reduce(or_, permissions, NO_PERMISSIONS)
+
+
+def role_permissions(role: str) -> Permission:
+    return ROLE_PERMISSIONS.get(role, NO_PERMISSIONS)
 
 
 def has_permission(required_permissions: list[Permission]):
-    """Dependency function to check if user has required permissions"""
-    def permission_checker(current_user: User = Depends(get_current_user)):
-        if current_user.role != "admin":
+    """
+    Dependency function to check if user has required permissions.
+    The required mask is built once here; each request is one dict lookup on
+    the role claim and one AND, with no database access. The checker is async
+    so FastAPI runs it on the event loop rather than the threadpool.
+    """
+    required = permission_mask(required_permissions)
+
+    async def permission_checker(current_user: AuthenticatedUser = Depends(get_authenticated_user)):
+        if role_permissions(current_user.role) & required != required:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="Not enough permissions"
@@ -36,29 +69,16 @@ def has_permission(required_permissions: list[Permission]):
     return permission_checker
 
 
-def get_user_permissions(user: User) -> List[Permission]:
+def get_user_permissions(user: Union[User, AuthenticatedUser]) -> List[Permission]:
     """Get list of permissions for a user based on their role"""
-    if user.role == "admin":
-        return list(Permission)  # Admin has all permissions
-    
-    elif user.role == "user":
-        return [
-            Permission.READ,
-            Permission.WRITE,
-            Permission.READ_ROOM_DATA,
-            Permission.CREATE_ROOM_DATA,
-        ]
-    
-    return []  # Default: no permissions
-
-
-def has_permission_check(user: User, required_permission: Permission) -> bool:
+    return list(ROLE_PERMISSION_LISTS.get(user.role, ()))
+
+
+def has_permission_check(user: Union[User, AuthenticatedUser], required_permission: Permission) -> bool:
     """Check if user has required permission based on their role (utility function)"""
     if not user:
         return False
-    
-    user_permissions = get_user_permissions(user)
-    return required_permission in user_permissions
+    return role_permissions(user.role) & required_permission == required_permission
 
 
 def require_permission(required_permission: Permission):
@@ -69,4 +89,4 @@ def require_permission(required_permission: Permission):
             # For now, just return the function
             return func(*args, **kwargs)
         return wrapper
-    return decorator
\ No newline at end of file
+    return decorator
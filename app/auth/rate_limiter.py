@@ -1,13 +1,79 @@
-from fastapi import Request
+from typing import Callable, Optional
+
+from fastapi import HTTPException, Request, Response, status
+from jose.exceptions import JWTError
+
+from app.auth.jwt import decode_access_token
+from app.config import settings
+from app.utils.rate_limiter import create_rate_limiter
+
+
+def client_ip(request: Request) -> str:
+    return request.client.host if request.client else "unknown"
+
+
+def user_or_ip(request: Request) -> str:
+    """Token subject for authenticated callers, client IP otherwise"""
+    authorization = request.headers.get("Authorization", "")
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() == "bearer" and token:
+        try:
+            subject = decode_access_token(token).get("sub")
+        except JWTError:
+            subject = None
+        if subject:
+            return f"user:{subject}"
+    return f"ip:{client_ip(request)}"
+
+
+def api_key_or_ip(request: Request) -> str:
+    api_key = request.headers.get("X-API-Key")
+    return f"key:{api_key}" if api_key else f"ip:{client_ip(request)}"
+
 
 class RateLimiter:
     """
-    Simple rate limiter placeholder.
-    Replace with real rate limiting logic later.
+    Token bucket rate limit dependency.
+    Adds RateLimit-* headers to the response and rejects callers whose
+    bucket is empty with 429 and Retry-After.
     """
-    async def check_rate_limit(self, request: Request):
-        # No-op for now to avoid import errors
-        # TODO: Implement real rate limiting (Redis, memory, etc.)
-        pass
+    def __init__(self, name: str, rate: float, burst: int, key: Callable[[Request], str] = client_ip):
+        self.name = name
+        self.key = key
+        self.limiter = create_rate_limiter(
+            settings.RATE_LIMIT_BACKEND,
+            rate,
+            burst,
+            path=f"{settings.RATE_LIMIT_PATH}.{name}",
+            slots=settings.RATE_LIMIT_SHARED_SLOTS
+        )
+
+    async def check_rate_limit(self, request: Request, response: Optional[Response] = None):
+        if not settings.RATE_LIMIT_ENABLED:
+            return
+        result = self.limiter.hit(f"{self.name}:{self.key(request)}")
+        if not result.allowed:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Rate limit exceeded",
+                headers=result.headers()
+            )
+        if response is not None:
+            response.headers.update(result.headers())
+
+    async def __call__(self, request: Request, response: Response):
+        await self.check_rate_limit(request, response)
+
 
-rate_limiter = RateLimiter()
\ No newline at end of file
+login_rate_limiter = RateLimiter(
+    "login",
+    rate=settings.LOGIN_RATE_LIMIT_PER_MINUTE / 60,
+    burst=settings.LOGIN_RATE_LIMIT_BURST,
+    key=client_ip
+)
+ingest_rate_limiter = RateLimiter(
+    "ingest",
+    rate=settings.INGEST_RATE_LIMIT_PER_SECOND,
+    burst=settings.INGEST_RATE_LIMIT_BURST,
+    key=user_or_ip
+)
@@ -11,12 +11,47 @@ class Settings(BaseSettings):
     DB_NAME: str = "fastapi_db"
     # Legacy single URL (optional, if set overrides granular parts)
     DB_URL: str | None = None
+    # Engine and connection pool settings (pool sizing is per worker process)
+    DB_ECHO: bool = False
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT: float = 30.0
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    DB_STATEMENT_CACHE_SIZE: int = 100
+    DB_STATEMENT_TIMEOUT_MS: int = 30000
     
     # Security settings
     JWT_SECRET: str
     JWT_ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
     REFRESH_TOKEN_EXPIRE_DAYS: int = 7
+    REFRESH_TOKEN_PURGE_INTERVAL_SECONDS: float = 3600
+    # last_login is written in batches; logins within MIN_INTERVAL of the stored value are not recorded
+    LAST_LOGIN_FLUSH_INTERVAL_SECONDS: float = 5.0
+    LAST_LOGIN_MIN_INTERVAL_SECONDS: float = 0.0
+    # Trust identity and role from verified token claims instead of loading the user per request;
+    # role changes then take effect when the access token expires
+    AUTH_TRUST_TOKEN_CLAIMS: bool = True
+    USER_CACHE_TTL_SECONDS: float = 30.0
+    USER_CACHE_MAX_ENTRIES: int = 1024
+    # Decoded payloads of verified tokens kept per worker (0 disables the cache)
+    JWT_CACHE_MAX_ENTRIES: int = 4096
+    # bcrypt runs on a per-worker thread pool; requests beyond the pending limit get 503
+    PASSWORD_HASH_WORKERS: int = 2
+    PASSWORD_HASH_MAX_PENDING: int = 32
+    PASSWORD_HASH_BULK_WORKERS: int = 4
+    USER_BULK_MAX_ITEMS: int = 10000
+
+    # Rate limiting: "memory" buckets are per worker, "shared" buckets live in mmap files under RATE_LIMIT_PATH
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_BACKEND: str = "memory"
+    RATE_LIMIT_PATH: str = "/dev/shm/hotel_energy_ratelimit"
+    RATE_LIMIT_SHARED_SLOTS: int = 65536
+    LOGIN_RATE_LIMIT_PER_MINUTE: float = 10
+    LOGIN_RATE_LIMIT_BURST: int = 5
+    INGEST_RATE_LIMIT_PER_SECOND: float = 50
+    INGEST_RATE_LIMIT_BURST: int = 200
     
     # CORS settings
     CORS_ORIGINS: List[str] = ["http://localhost:3000", "http://localhost:8000"]
@@ -24,6 +59,45 @@ class Settings(BaseSettings):
     # Application settings
     LOG_LEVEL: str = "INFO"
     WORKERS_COUNT: int = 4
+
+    # Metrics history settings
+    METRICS_HISTORY_CAPACITY: int = 100
+    # "memory" keeps history per worker; "shared" maps one buffer into every worker
+    METRICS_HISTORY_BACKEND: str = "memory"
+    METRICS_HISTORY_PATH: str = "/dev/shm/hotel_energy_metrics.buf"
+    # Analytics snapshots are rebuilt per new reading, and at least this often (time-of-day rules)
+    ANALYTICS_SNAPSHOT_MAX_AGE_SECONDS: float = 60.0
+    # Dedicated threads for snapshot rebuilds, kept off the event loop and the request thread pool
+    ANALYTICS_WORKERS: int = 2
+    ANALYTICS_MAX_PENDING: int = 16
+    # Anomaly detection: rolling z-score window and per-hour-of-day baseline window, in readings
+    ANOMALY_WINDOW: int = 24
+    ANOMALY_BASELINE_WINDOW: int = 168
+
+    # Forecasting: artifacts written by app.scripts.train_forecast_model, loaded lazily per worker
+    FORECAST_MODEL_DIR: str = "models/forecast"
+    FORECAST_LAGS: int = 6
+    FORECAST_HORIZON_HOURS: int = 8
+    FORECAST_RIDGE_ALPHA: float = 1.0
+    # Forecasts are memoized per (history version, last reading, horizon, model version)
+    FORECAST_CACHE_TTL_SECONDS: float = 300.0
+    FORECAST_CACHE_MAX_ENTRIES: int = 256
+
+    # Room telemetry ingestion settings
+    ROOM_DATA_BULK_MAX_ITEMS: int = 50000
+    # Write-behind mode acknowledges readings before they are committed
+    ROOM_DATA_WRITE_BEHIND: bool = False
+    ROOM_DATA_QUEUE_MAX_ROWS: int = 100000
+    ROOM_DATA_FLUSH_ROWS: int = 5000
+    ROOM_DATA_FLUSH_INTERVAL_MS: int = 250
+    # Failed batches are retried this often, then split; a single row that keeps failing is dead-lettered
+    ROOM_DATA_FLUSH_MAX_ATTEMPTS: int = 3
+    # How long a worker trusts its cached latest reading per room
+    ROOM_LATEST_CACHE_TTL_SECONDS: float = 5.0
+    # Raw readings older than this are dropped (rollups are kept)
+    ROOM_DATA_RETENTION_DAYS: int = 90
+    ROOM_DATA_PARTITION_MONTHS_AHEAD: int = 3
+    ROOM_DATA_PURGE_CHUNK_SIZE: int = 10000
     
     @property
     def DATABASE_URL(self) -> str:
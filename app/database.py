@@ -1,15 +1,88 @@
+from sqlalchemy import exc
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
 from sqlalchemy.orm import declarative_base
-from typing import AsyncGenerator
-import os
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from typing import AsyncGenerator, Any, Dict
+import time
 
-# Database URL - you can change this to match your database
-DATABASE_URL = os.getenv("DATABASE_URL", "sqlite+aiosqlite:///./hotel_energy.db")
+from app.config import Settings, settings
 
-engine = create_async_engine(DATABASE_URL, echo=True)
+class PoolMetrics:
+    """Counters for connection acquisition from the engine pool"""
+    def __init__(self):
+        self.acquisitions = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def record_wait(self, seconds: float):
+        self.acquisitions += 1
+        self.wait_seconds_total += seconds
+        self.wait_seconds_max = max(self.wait_seconds_max, seconds)
+
+pool_metrics = PoolMetrics()
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """Queue pool that records how long callers wait for a connection"""
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            pool_metrics.timeouts += 1
+            raise
+        finally:
+            pool_metrics.record_wait(time.perf_counter() - started)
+
+def build_engine_options(config: Settings) -> Dict[str, Any]:
+    """Translate Settings into create_async_engine keyword arguments"""
+    url = config.DATABASE_URL
+    options: Dict[str, Any] = {"echo": config.DB_ECHO}
+    if url.startswith("sqlite"):
+        # SQLite picks its own pool; sizing options do not apply
+        return options
+
+    options.update(
+        poolclass=InstrumentedQueuePool,
+        pool_size=config.DB_POOL_SIZE,
+        max_overflow=config.DB_MAX_OVERFLOW,
+        pool_timeout=config.DB_POOL_TIMEOUT,
+        pool_recycle=config.DB_POOL_RECYCLE,
+        pool_pre_ping=config.DB_POOL_PRE_PING,
+    )
+    if url.startswith("postgresql+asyncpg"):
+        options["connect_args"] = {
+            # asyncpg's own cache and SQLAlchemy's adapter cache
+            "statement_cache_size": config.DB_STATEMENT_CACHE_SIZE,
+            "prepared_statement_cache_size": config.DB_STATEMENT_CACHE_SIZE,
+            "server_settings": {"statement_timeout": str(config.DB_STATEMENT_TIMEOUT_MS)},
+        }
+    return options
+
+engine = create_async_engine(settings.DATABASE_URL, **build_engine_options(settings))
 async_session = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
 Base = declarative_base()
 
+def pool_status() -> Dict[str, Any]:
+    """Current pool occupancy plus acquisition wait statistics"""
+    pool = engine.pool
+    status: Dict[str, Any] = {"pool_class": type(pool).__name__}
+    if isinstance(pool, AsyncAdaptedQueuePool):
+        status.update(
+            size=pool.size(),
+            checked_out=pool.checkedout(),
+            checked_in=pool.checkedin(),
+            overflow=pool.overflow(),
+        )
+    acquisitions = pool_metrics.acquisitions
+    status.update(
+        acquisitions=acquisitions,
+        timeouts=pool_metrics.timeouts,
+        wait_ms_avg=round(pool_metrics.wait_seconds_total / acquisitions * 1000, 3) if acquisitions else 0.0,
+        wait_ms_max=round(pool_metrics.wait_seconds_max * 1000, 3),
+    )
+    return status
+
 async def get_db() -> AsyncGenerator[AsyncSession, None]:
     async with async_session() as session:
         try:
@@ -1,14 +1,24 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from typing import List, Dict
 import json
-from datetime import datetime
+from datetime import datetime, timedelta
 
 from app.services.data_service import DataService
 from app.services.insights_service import AIInsightsService  
 from app.services.ml_service import MLService
-from app.routes import users, auth
-from app.database import create_tables
+from app.services.forecast_model import forecast_models
+from app.services.forecast_cache import forecast_cache
+from app.services.timeseries import create_metrics_buffer
+from app.services.analytics_snapshot import AnalyticsSnapshotStore, analytics_executor
+from app.services.ingest_buffer import room_data_buffer
+from app.config import settings
+from app.routes import users, auth, data
+from app.database import create_tables, pool_status
+from app.auth.jwt import token_cache
+from app.services.user_cache import user_cache
+from app.services.password_pool import bulk_password_pool, password_pool
+from app.services.refresh_token_service import refresh_token_purger
+from app.services.last_login_buffer import last_login_buffer
 
 app = FastAPI(
     title="Hotel Energy SaaS API",
@@ -28,29 +38,76 @@ app.add_middleware(
 # Include routers
 app.include_router(auth.router)
 app.include_router(users.router)
+app.include_router(data.router)
 
 # Initialize services
 data_service = DataService()
 insights_service = AIInsightsService()
-ml_service = MLService()
+ml_service = MLService(
+    anomaly_window=settings.ANOMALY_WINDOW,
+    baseline_window=settings.ANOMALY_BASELINE_WINDOW,
+    forecast_models=forecast_models,
+    forecast_cache=forecast_cache
+)
+
+# Columnar ring buffer of recent readings (per worker or shared across workers)
+history = create_metrics_buffer(
+    backend=settings.METRICS_HISTORY_BACKEND,
+    capacity=settings.METRICS_HISTORY_CAPACITY,
+    path=settings.METRICS_HISTORY_PATH
+)
 
-# In-memory storage (replace with database in production)
-historical_data: List[Dict] = []
+# Analytics responses rendered once per history version and shared by all analytics endpoints
+analytics = AnalyticsSnapshotStore(
+    history, data_service, insights_service, ml_service,
+    max_age=settings.ANALYTICS_SNAPSHOT_MAX_AGE_SECONDS,
+    executor=analytics_executor
+)
+
+async def _snapshot_response(request: Request, view: str) -> Response:
+    """Serve one view of the current analytics snapshot, honouring conditional requests"""
+    snapshot = await analytics.get()
+    headers = {
+        "ETag": snapshot.etags[view],
+        "Last-Modified": snapshot.last_modified,
+        "Cache-Control": "no-cache"
+    }
+    if snapshot.not_modified(view, request.headers.get("if-none-match"), request.headers.get("if-modified-since")):
+        return Response(status_code=304, headers=headers)
+    return Response(content=snapshot.payloads[view], media_type="application/json", headers=headers)
 
 @app.on_event("startup")
 async def startup_event():
     """Initialize system with database tables and sample data"""
     await create_tables()
     
-    global historical_data
     # Generate initial historical data for better insights
-    for i in range(24):  # Last 24 hours
+    # (only the first worker seeds a shared buffer)
+    samples = []
+    now = datetime.utcnow()
+    for i in range(24):  # Last 24 hours, oldest first
         sample_data = data_service.generate_hotel_metrics()
-        sample_data["timestamp"] = (datetime.utcnow().replace(hour=i)).isoformat()
-        historical_data.append(sample_data)
+        sample_data["timestamp"] = (now - timedelta(hours=24 - i)).isoformat()
+        samples.append(sample_data)
+    history.seed(samples)
+
+    if settings.ROOM_DATA_WRITE_BEHIND:
+        await room_data_buffer.start()
+    await refresh_token_purger.start()
+    await last_login_buffer.start()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Drain queued room readings and last_login writes before the worker exits"""
+    await room_data_buffer.stop()
+    await refresh_token_purger.stop()
+    await last_login_buffer.stop()
+    password_pool.shutdown()
+    bulk_password_pool.shutdown()
+    analytics_executor.shutdown()
 
 @app.get("/")
-def read_root():
+async def read_root():
     return {
         "message": "Hotel Energy SaaS API",
         "status": "operational", 
@@ -59,156 +116,104 @@ def read_root():
     }
 
 @app.get("/metrics")
-def get_current_metrics():
+async def get_current_metrics():
     """Get real-time hotel energy metrics"""
     try:
         metrics = data_service.generate_hotel_metrics()
         
-        # Store for historical analysis
-        if len(historical_data) > 100:  # Keep last 100 readings
-            historical_data.pop(0)
-        historical_data.append(metrics)
+        # Store for historical analysis (oldest reading is evicted when full)
+        history.append(metrics)
+        # The reading is stored; analytics catch up without holding this response
+        analytics.refresh_in_background()
         
         # Add computed fields
         metrics["status"] = "operational"
         metrics["last_updated"] = datetime.utcnow().isoformat()
         
         return metrics
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error generating metrics: {str(e)}")
 
 @app.get("/insights")
-def get_ai_insights():
+async def get_ai_insights(request: Request):
     """Get AI-generated insights and recommendations"""
     try:
-        if not historical_data:
-            return []
-        
-        current_metrics = historical_data[-1]
-        insights = insights_service.generate_insights(current_metrics, historical_data)
-        
-        # Add metadata
-        for insight in insights:
-            insight["generated_at"] = datetime.utcnow().isoformat()
-            insight["id"] = f"insight_{len(insights)}_{int(datetime.utcnow().timestamp())}"
-        
-        return insights
+        return await _snapshot_response(request, "insights")
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error generating insights: {str(e)}")
 
 @app.get("/recommendations") 
-def get_optimization_recommendations():
+async def get_optimization_recommendations(request: Request):
     """Get specific optimization recommendations"""
     try:
-        if not historical_data:
-            return []
-        
-        current_metrics = historical_data[-1]
-        recommendations = insights_service.generate_optimizations(current_metrics)
-        
-        # Add metadata and priority scoring
-        for i, rec in enumerate(recommendations):
-            rec["id"] = f"opt_{i}_{int(datetime.utcnow().timestamp())}"
-            rec["status"] = "pending"
-            rec["created_at"] = datetime.utcnow().isoformat()
-            rec["priority_score"] = rec["expectedSavings"] * rec["confidence"]
-        
-        # Sort by priority score
-        recommendations.sort(key=lambda x: x["priority_score"], reverse=True)
-        
-        return recommendations
+        return await _snapshot_response(request, "recommendations")
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error generating recommendations: {str(e)}")
 
 @app.get("/predictions")
-def get_energy_predictions():
+async def get_energy_predictions(request: Request):
     """Get ML-based energy usage predictions"""
     try:
-        predictions = ml_service.predict_energy_usage(historical_data, hours_ahead=8)
-        
-        return {
-            "predictions": predictions,
-            "model_accuracy": ml_service.prediction_model_accuracy,
-            "generated_at": datetime.utcnow().isoformat(),
-            "baseline_usage": historical_data[-1]["energy_usage"] if historical_data else 0
-        }
+        return await _snapshot_response(request, "predictions")
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error generating predictions: {str(e)}")
 
 @app.get("/efficiency-score")
-def get_efficiency_score():
+async def get_efficiency_score(request: Request):
     """Get energy efficiency score and benchmarks"""
     try:
-        score = data_service.calculate_efficiency_score(historical_data)
-        
-        return {
-            "score": score,
-            "grade": "Excellent" if score >= 85 else "Good" if score >= 70 else "Needs Improvement",
-            "benchmarks": [
-                {"name": "Hotel Average", "score": 72, "type": "industry"},
-                {"name": "Industry Leader", "score": 88, "type": "best_practice"},
-                {"name": "Your Target", "score": 85, "type": "goal"}
-            ],
-            "factors": {
-                "usage_efficiency": round(score * 0.4, 1),
-                "occupancy_optimization": round(score * 0.3, 1), 
-                "system_performance": round(score * 0.3, 1)
-            },
-            "calculated_at": datetime.utcnow().isoformat()
-        }
+        return await _snapshot_response(request, "efficiency")
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error calculating efficiency score: {str(e)}")
 
 @app.get("/metrics/history")
-def get_metrics_history():
+async def get_metrics_history():
     """Get historical metrics data for charts"""
     try:
+        readings = history.records()
         return {
-            "readings": historical_data,
-            "count": len(historical_data),
+            "readings": readings,
+            "count": len(readings),
             "time_range": {
-                "start": historical_data[0]["timestamp"] if historical_data else None,
-                "end": historical_data[-1]["timestamp"] if historical_data else None
+                "start": readings[0]["timestamp"] if readings else None,
+                "end": readings[-1]["timestamp"] if readings else None
             }
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error retrieving history: {str(e)}")
 
 @app.get("/anomalies")
-def get_anomaly_detection():
+async def get_anomaly_detection(request: Request):
     """Get detected anomalies in energy patterns"""
     try:
-        if not historical_data:
-            return []
-        
-        current_metrics = historical_data[-1] 
-        anomalies = ml_service.detect_anomalies(current_metrics, historical_data)
-        
-        return {
-            "anomalies": anomalies,
-            "detection_time": datetime.utcnow().isoformat(),
-            "baseline_period": "24_hours"
-        }
+        return await _snapshot_response(request, "anomalies")
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error detecting anomalies: {str(e)}")
 
 @app.get("/savings-potential")
-def get_savings_potential():
+async def get_savings_potential(request: Request):
     """Calculate potential savings from all optimizations"""
     try:
-        if not historical_data:
-            return {}
-        
-        current_metrics = historical_data[-1]
-        optimizations = insights_service.generate_optimizations(current_metrics)
-        savings = ml_service.calculate_savings_potential(current_metrics, optimizations)
-        
-        return savings
+        return await _snapshot_response(request, "savings")
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error calculating savings: {str(e)}")
 
 @app.get("/health")
-def health_check():
+async def health_check():
     """API health check endpoint"""
     return {
         "status": "healthy",
@@ -218,5 +223,14 @@ def health_check():
             "insights_service": "operational", 
             "ml_service": "operational"
         },
-        "data_points": len(historical_data)
+        "data_points": len(history),
+        "ingest_queue": room_data_buffer.stats(),
+        "database_pool": pool_status(),
+        "auth_cache": {"tokens": token_cache.stats(), "users": user_cache.stats()},
+        "password_pool": password_pool.stats(),
+        "last_login": last_login_buffer.stats(),
+        "analytics_snapshot": analytics.stats(),
+        "anomaly_baselines": ml_service.baselines.stats(),
+        "forecast_model": forecast_models.stats(),
+        "forecast_cache": forecast_cache.stats()
     }
@@ -1,2 +1,2 @@
-from .room import RoomData
+from .room import RoomData, RoomDataHourly, RoomDataDaily
 from .user import User, Token, get_current_user, create_access_token
@@ -1,17 +1,50 @@
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime
+from typing import Any, Dict, List, Optional
+from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, Index, PrimaryKeyConstraint, Sequence
+from sqlalchemy.ext.compiler import compiles
 from pydantic import BaseModel
 from app.database import Base
 
 class RoomData(Base):
     __tablename__ = "room_data"
 
-    id = Column(Integer, primary_key=True, index=True)
-    room_id = Column(String, index=True)
+    # Partitioned by month on PostgreSQL (migration 005), so the partition key is part of the primary key
+    id = Column(Integer, Sequence("room_data_id_seq"), primary_key=True, index=True)
+    room_id = Column(String)
     temp = Column(Float)
     humidity = Column(Float)
     occupied = Column(Boolean)
-    timestamp = Column(DateTime, default=datetime.utcnow)
+    timestamp = Column(DateTime, primary_key=True, nullable=False, default=datetime.utcnow)
+
+@compiles(PrimaryKeyConstraint, "sqlite")
+def _sqlite_primary_key(constraint, compiler, **kw):
+    # SQLite has no partitions, and only a lone INTEGER primary key assigns ids,
+    # so room_data keys on id alone there
+    if constraint.table is not None and constraint.table.name == RoomData.__tablename__:
+        return "PRIMARY KEY (id)"
+    return compiler.visit_primary_key_constraint(constraint, **kw)
+
+# Latest-reading lookups per room seek this index instead of sorting the room's rows
+Index("ix_room_data_room_id_timestamp", RoomData.room_id, RoomData.timestamp.desc())
+
+class RoomDataRollupMixin:
+    """Per-room aggregates of room_data over a fixed time bucket"""
+    room_id = Column(String, primary_key=True)
+    bucket_start = Column(DateTime, primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+    temp_sum = Column(Float)
+    temp_min = Column(Float)
+    temp_max = Column(Float)
+    humidity_sum = Column(Float)
+    humidity_min = Column(Float)
+    humidity_max = Column(Float)
+    occupied_count = Column(Integer, nullable=False, default=0)
+
+class RoomDataHourly(RoomDataRollupMixin, Base):
+    __tablename__ = "room_data_hourly"
+
+class RoomDataDaily(RoomDataRollupMixin, Base):
+    __tablename__ = "room_data_daily"
 
 class RoomDataCreate(BaseModel):
     room_id: str
@@ -25,3 +58,28 @@ class RoomDataResponse(RoomDataCreate):
 
     class Config:
         from_attributes = True
+
+class BulkItemStatus(BaseModel):
+    index: int
+    status: str  # "created" or "invalid"
+    errors: Optional[List[Any]] = None
+
+class BulkIngestResponse(BaseModel):
+    accepted: int
+    rejected: int
+    results: List[BulkItemStatus]
+
+class RoomAnomaly(BaseModel):
+    room_id: str
+    score: float
+    metric: str  # "temp", "humidity" or "occupancy"
+    method: str  # "zscore", "mad" or "seasonal"
+    value: float
+    expected: Optional[float] = None
+    scores: Dict[str, float]
+
+class RoomAnomalyResponse(BaseModel):
+    window_start: datetime
+    window_end: datetime
+    rooms_scored: int
+    anomalies: List[RoomAnomaly]
@@ -1,4 +1,278 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, ForeignKey, selectfrom sqlalchemy.ext.declarative import declarative_basefrom sqlalchemy.orm import relationshipfrom sqlalchemy.ext.asyncio import AsyncSessionfrom pydantic import BaseModel, EmailStrfrom datetime import datetime, timedeltafrom passlib.context import CryptContextfrom fastapi import HTTPException, status, Dependsfrom fastapi.security import OAuth2PasswordBearerimport jwtfrom jwt import JWTErrorfrom typing import Optionalimport re# Settings configurationclass Settings:    JWT_SECRET = "your-secret-key-here-change-this-in-production"    ALGORITHM = "HS256"settings = Settings()Base = declarative_base()pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")# Pydantic modelsclass UserBase(BaseModel):    username: str    email: Optional[EmailStr] = None    role: str = "viewer"class UserCreate(UserBase):    password: strclass UserUpdate(BaseModel):    email: Optional[EmailStr] = None    password: Optional[str] = None    role: Optional[str] = Noneclass UserResponse(UserBase):    id: int    created_at: datetime    last_login: Optional[datetime] = None    class Config:        from_attributes = Trueclass Token(BaseModel):    access_token: str    refresh_token: str    token_type: strclass TokenData(BaseModel):    username: Optional[str] = None    role: Optional[str] = None    token_type: Optional[str] = None# SQLAlchemy modelsclass User(Base):    __tablename__ = "users"    id = Column(Integer, primary_key=True)    username = Column(String, unique=True, index=True)    email = Column(String, unique=True, index=True, nullable=True)    password_hash = Column(String)    role = Column(String)  # "admin" or "viewer"    created_at = Column(DateTime, default=datetime.utcnow)    last_login = Column(DateTime, nullable=True)    def set_password(self, password: str):        """Set user password with hashing"""        if not validate_password(password):            raise ValueError("Password does not meet complexity requirements")        self.password_hash = hash_password(password)    def check_password(self, password: str) -> bool:        """Check if provided password matches user's password"""        return verify_password(password, self.password_hash)class RefreshToken(Base):    __tablename__ = "refresh_tokens"    id = Column(Integer, primary_key=True)    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"))    token = Column(String, unique=True, index=True)    expires_at = Column(DateTime)    revoked = Column(Boolean, default=False)    created_at = Column(DateTime, default=datetime.utcnow)# Password complexity settingsPASSWORD_MIN_LENGTH = 8PASSWORD_PATTERNS = [    (r"[A-Z]", "uppercase letter"),    (r"[a-z]", "lowercase letter"),    (r"\d", "number"),    (r"[!@#$%^&*(),.?\":{}|<>]", "special character")]# Token settingsACCESS_TOKEN_EXPIRE_MINUTES = 30REFRESH_TOKEN_EXPIRE_DAYS = 7# Password functionsdef verify_password(plain_password: str, hashed_password: str) -> bool:    return pwd_context.verify(plain_password, hashed_password)def hash_password(password: str) -> str:    return pwd_context.hash(password)def validate_password(password: str) -> bool:    """Validate password meets complexity requirements"""    if len(password) < PASSWORD_MIN_LENGTH:        return False        for pattern, description in PASSWORD_PATTERNS:        if not re.search(pattern, password):            return False        return True# Database functionsasync def get_user_by_username(username: str, db: AsyncSession) -> Optional[User]:    result = await db.execute(select(User).filter(User.username == username))    return result.scalar_one_or_none()async def get_user_by_id(user_id: int, db: AsyncSession) -> Optional[User]:    result = await db.execute(select(User).filter(User.id == user_id))    return result.scalar_one_or_none()async def authenticate_user(username: str, password: str, db: AsyncSession) -> Optional[User]:    user = await get_user_by_username(username, db)    if not user:        return None    if not verify_password(password, user.password_hash):        return None    # Update last login time    user.last_login = datetime.utcnow()    await db.commit()    return user# JWT token functionsdef create_access_token(data: dict, expires_delta: Optional[timedelta] = None):    to_encode = data.copy()    if expires_delta:        expire = datetime.utcnow() + expires_delta    else:        expire = datetime.utcnow() + timedelta(minutes=15)    to_encode.update({"exp": expire})    encoded_jwt = jwt.encode(to_encode, settings.JWT_SECRET, algorithm=settings.ALGORITHM)    return encoded_jwtdef create_refresh_token(data: dict, expires_delta: Optional[timedelta] = None):    to_encode = data.copy()    if expires_delta:        expire = datetime.utcnow() + expires_delta    else:        expire = datetime.utcnow() + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)    to_encode.update({"exp": expire, "type": "refresh"})    encoded_jwt = jwt.encode(to_encode, settings.JWT_SECRET, algorithm=settings.ALGORITHM)    return encoded_jwt# FastAPI dependenciesasync def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends()) -> User:    credentials_exception = HTTPException(        status_code=status.HTTP_401_UNAUTHORIZED,        detail="Could not validate credentials",        headers={"WWW-Authenticate": "Bearer"},    )    try:        payload = jwt.decode(token, settings.JWT_SECRET, algorithms=[settings.ALGORITHM])        username: str = payload.get("sub")        role: str = payload.get("role")        if username is None:            raise credentials_exception        token_data = TokenData(username=username, role=role)    except JWTError:        raise credentials_exception        user = await get_user_by_username(token_data.username, db)    if user is None:        raise credentials_exception    return userasync def get_current_admin(current_user: User = Depends(get_current_user)) -> User:    if current_user.role != "admin":        raise HTTPException(            status_code=status.HTTP_403_FORBIDDEN,            detail="Not enough permissions"        )    return current_userasync def get_current_user_optional(token: Optional[str] = Depends(oauth2_scheme)) -> Optional[User]:    """Get current user if token is provided, otherwise return None"""    if not token:        return None
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, ForeignKey, Index, select
+from sqlalchemy.orm import make_transient_to_detached, relationship
+from sqlalchemy.ext.asyncio import AsyncSession
+from pydantic import BaseModel, EmailStr
+from datetime import datetime, timedelta
+from passlib.context import CryptContext
+from fastapi import HTTPException, status, Depends
+from fastapi.security import OAuth2PasswordBearer
+from jose import jwt, JWTError
+from typing import Any, List, Optional
+import re
+
+from app.auth.jwt import decode_access_token
+from app.config import settings
+from app.database import Base, get_db
+from app.services.password_pool import password_pool
+from app.services.user_cache import user_cache
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
+
+# Pydantic models
+class UserBase(BaseModel):
+    username: str
+    email: Optional[EmailStr] = None
+    role: str = "viewer"
+
+class UserCreate(UserBase):
+    password: str
+
+class UserUpdate(BaseModel):
+    email: Optional[EmailStr] = None
+    password: Optional[str] = None
+    role: Optional[str] = None
+
+class UserResponse(UserBase):
+    id: int
+    created_at: datetime
+    last_login: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+class BulkUserStatus(BaseModel):
+    index: int
+    status: str  # "created", "invalid" or "conflict"
+    errors: Optional[List[Any]] = None
+
+class BulkUserImportResponse(BaseModel):
+    created: int
+    rejected: int
+    results: List[BulkUserStatus]
+
+class Token(BaseModel):
+    access_token: str
+    refresh_token: str
+    token_type: str
+
+class RefreshRequest(BaseModel):
+    refresh_token: str
+
+class TokenData(BaseModel):
+    username: Optional[str] = None
+    user_id: Optional[int] = None
+    role: Optional[str] = None
+    token_type: Optional[str] = None
+
+class AuthenticatedUser(BaseModel):
+    """Identity and role of the caller, taken from verified token claims"""
+    id: int
+    username: str
+    role: str
+
+    class Config:
+        from_attributes = True
+
+# SQLAlchemy models
+class User(Base):
+    __tablename__ = "users"
+
+    id = Column(Integer, primary_key=True)
+    username = Column(String, unique=True, index=True)
+    email = Column(String, unique=True, index=True, nullable=True)
+    password_hash = Column(String)
+    role = Column(String)  # "admin" or "viewer"
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    last_login = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        # Keyset pagination for list_users; INCLUDE makes it covering on PostgreSQL
+        Index(
+            "ix_users_created_at_id",
+            created_at.desc(),
+            id.desc(),
+            postgresql_include=["username", "email", "role", "last_login"]
+        ),
+    )
+
+    def set_password(self, password: str):
+        """Set user password with hashing"""
+        if not validate_password(password):
+            raise ValueError("Password does not meet complexity requirements")
+        self.password_hash = hash_password(password)
+
+    def check_password(self, password: str) -> bool:
+        """Check if provided password matches user's password"""
+        return verify_password(password, self.password_hash)
+
+class RefreshToken(Base):
+    __tablename__ = "refresh_tokens"
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), index=True)
+    token = Column(String, unique=True, index=True)  # SHA-256 digest, never the raw token
+    expires_at = Column(DateTime, index=True)
+    revoked = Column(Boolean, default=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+# Password complexity settings
+PASSWORD_MIN_LENGTH = 8
+PASSWORD_PATTERNS = [
+    (r"[A-Z]", "uppercase letter"),
+    (r"[a-z]", "lowercase letter"),
+    (r"\d", "number"),
+    (r"[!@#$%^&*(),.?\":{}|<>]", "special character")
+]
+
+# Token settings
+ACCESS_TOKEN_EXPIRE_MINUTES = settings.ACCESS_TOKEN_EXPIRE_MINUTES
+REFRESH_TOKEN_EXPIRE_DAYS = settings.REFRESH_TOKEN_EXPIRE_DAYS
+
+# Password functions
+def verify_password(plain_password: str, hashed_password: str) -> bool:
+    return pwd_context.verify(plain_password, hashed_password)
+
+def hash_password(password: str) -> str:
+    return pwd_context.hash(password)
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """verify_password on the bcrypt pool, off the event loop"""
+    return await password_pool.run(verify_password, plain_password, hashed_password)
+
+async def hash_password_async(password: str) -> str:
+    """hash_password on the bcrypt pool, off the event loop"""
+    return await password_pool.run(hash_password, password)
+
+def validate_password(password: str) -> bool:
+    """Validate password meets complexity requirements"""
+    if len(password) < PASSWORD_MIN_LENGTH:
+        return False
+    
+    for pattern, description in PASSWORD_PATTERNS:
+        if not re.search(pattern, password):
+            return False
+    
+    return True
+
+# Database functions
+async def get_user_by_username(username: str, db: AsyncSession) -> Optional[User]:
+    result = await db.execute(select(User).filter(User.username == username))
+    return result.scalar_one_or_none()
+
+def user_snapshot(user: User) -> dict:
+    """Column values of a loaded user, suitable for the user cache"""
+    return {column.key: getattr(user, column.key) for column in User.__table__.columns}
+
+async def load_user(username: str, db: AsyncSession) -> Optional[User]:
+    """
+    Fetch a user through the user cache. A cached snapshot is attached to
+    the session as a persistent instance without issuing a SELECT.
+    """
+    snapshot = user_cache.get(username)
+    if snapshot is None:
+        user = await get_user_by_username(username, db)
+        if user is not None:
+            user_cache.put(username, user_snapshot(user))
+        return user
+    user = User(**snapshot)
+    make_transient_to_detached(user)
+    return await db.merge(user, load=False)
+
+async def get_user_by_id(user_id: int, db: AsyncSession) -> Optional[User]:
+    result = await db.execute(select(User).filter(User.id == user_id))
+    return result.scalar_one_or_none()
+
+async def authenticate_user(username: str, password: str, db: AsyncSession) -> Optional[User]:
+    """Check credentials; last_login is recorded by the caller through last_login_buffer"""
+    user = await get_user_by_username(username, db)
+    if not user:
+        return None
+    if not await verify_password_async(password, user.password_hash):
+        return None
+    return user
+
+# JWT token functions
+def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
+    to_encode = data.copy()
+    if expires_delta:
+        expire = datetime.utcnow() + expires_delta
+    else:
+        expire = datetime.utcnow() + timedelta(minutes=15)
+    to_encode.update({"exp": expire})
+    encoded_jwt = jwt.encode(to_encode, settings.JWT_SECRET, algorithm=settings.JWT_ALGORITHM)
+    return encoded_jwt
+
+def create_refresh_token(data: dict, expires_delta: Optional[timedelta] = None):
+    to_encode = data.copy()
+    if expires_delta:
+        expire = datetime.utcnow() + expires_delta
+    else:
+        expire = datetime.utcnow() + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
+    to_encode.update({"exp": expire, "type": "refresh"})
+    encoded_jwt = jwt.encode(to_encode, settings.JWT_SECRET, algorithm=settings.JWT_ALGORITHM)
+    return encoded_jwt
+
+# FastAPI dependencies
+def decode_token_claims(token: str) -> TokenData:
+    credentials_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Could not validate credentials",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+    try:
+        payload = decode_access_token(token)
+    except JWTError:
+        raise credentials_exception
+    # Refresh tokens are only accepted by /auth/refresh, never as bearer credentials
+    if payload.get("sub") is None or payload.get("type") == "refresh":
+        raise credentials_exception
+    return TokenData(
+        username=payload.get("sub"),
+        user_id=payload.get("uid"),
+        role=payload.get("role"),
+        token_type=payload.get("type")
+    )
+
+async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)) -> User:
+    """Resolve the token to a User row (served from the user cache when warm)"""
+    token_data = decode_token_claims(token)
+    user = await load_user(token_data.username, db)
+    if user is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return user
+
+async def get_authenticated_user(
+    token: str = Depends(oauth2_scheme),
+    db: AsyncSession = Depends(get_db)
+) -> AuthenticatedUser:
+    """
+    Resolve the caller's identity and role. With AUTH_TRUST_TOKEN_CLAIMS the
+    verified claims are used as-is and no query is issued; tokens that lack
+    the uid/role claims fall back to loading the user.
+    """
+    token_data = decode_token_claims(token)
+    if settings.AUTH_TRUST_TOKEN_CLAIMS and token_data.user_id is not None and token_data.role:
+        return AuthenticatedUser(id=token_data.user_id, username=token_data.username, role=token_data.role)
+    user = await get_current_user(token, db)
+    return AuthenticatedUser.model_validate(user)
+
+async def get_current_admin(current_user: AuthenticatedUser = Depends(get_authenticated_user)) -> AuthenticatedUser:
+    if current_user.role != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not enough permissions"
+        )
+    return current_user
+
+async def get_current_user_optional(token: Optional[str] = Depends(oauth2_scheme)) -> Optional[User]:
+    """Get current user if token is provided, otherwise return None"""
+    if not token:
+        return None
     try:
         # You would need to inject db here too in a real implementation
         # This is a simplified version
@@ -1,22 +1,59 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
+from jose import JWTError
 from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import timedelta
 
 from ..models.user import (
     User, 
     Token, 
+    RefreshRequest,
     authenticate_user, 
     create_access_token, 
-    create_refresh_token,
-    ACCESS_TOKEN_EXPIRE_MINUTES,
-    REFRESH_TOKEN_EXPIRE_DAYS
+    load_user,
+    ACCESS_TOKEN_EXPIRE_MINUTES
 )
 from ..database import get_db
+from ..auth.jwt import decode_access_token
+from ..auth.rate_limiter import login_rate_limiter
+from ..services.last_login_buffer import last_login_buffer
+from ..services.refresh_token_service import (
+    hash_token,
+    issue_refresh_token,
+    revoke_refresh_token,
+    revoke_user_refresh_tokens
+)
 
 router = APIRouter(prefix="/api/v1/auth", tags=["authentication"])
 
-@router.post("/login", response_model=Token)
+async def _issue_tokens(user: User, db: AsyncSession) -> dict:
+    """Mint an access token and a persisted refresh token, then commit"""
+    access_token = create_access_token(
+        data={"sub": user.username, "uid": user.id, "role": user.role},
+        expires_delta=timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    )
+    refresh_token = await issue_refresh_token(db, user)
+    await db.commit()
+    return {
+        "access_token": access_token,
+        "refresh_token": refresh_token,
+        "token_type": "bearer"
+    }
+
+def _refresh_claims(token: str) -> dict:
+    try:
+        claims = decode_access_token(token)
+    except JWTError:
+        claims = {}
+    if claims.get("type") != "refresh":
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid refresh token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return claims
+
+@router.post("/login", response_model=Token, dependencies=[Depends(login_rate_limiter)])
 async def login(
     form_data: OAuth2PasswordRequestForm = Depends(),
     db: AsyncSession = Depends(get_db)
@@ -29,21 +66,47 @@ async def login(
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    
-    access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    refresh_token_expires = timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
-    
-    access_token = create_access_token(
-        data={"sub": user.username, "role": user.role},
-        expires_delta=access_token_expires
-    )
-    refresh_token = create_refresh_token(
-        data={"sub": user.username, "role": user.role},
-        expires_delta=refresh_token_expires
-    )
-    
-    return {
-        "access_token": access_token,
-        "refresh_token": refresh_token,
-        "token_type": "bearer"
-    }
\ No newline at end of file
+    last_login_buffer.record(user)
+    return await _issue_tokens(user, db)
+
+@router.post("/refresh", response_model=Token)
+async def refresh(
+    body: RefreshRequest,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Exchange a refresh token for a new token pair.
+    The presented refresh token is revoked (rotation); presenting an already
+    rotated token revokes every refresh token of that user.
+    """
+    claims = _refresh_claims(body.refresh_token)
+    user_id = await revoke_refresh_token(db, hash_token(body.refresh_token))
+    if user_id is None:
+        if claims.get("uid") is not None:
+            await revoke_user_refresh_tokens(db, claims["uid"])
+            await db.commit()
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Refresh token has been revoked",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+    user = await load_user(claims["sub"], db)
+    if user is None or user.id != user_id:
+        await db.commit()
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid refresh token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return await _issue_tokens(user, db)
+
+@router.post("/logout", status_code=status.HTTP_204_NO_CONTENT)
+async def logout(
+    body: RefreshRequest,
+    db: AsyncSession = Depends(get_db)
+):
+    """Revoke a refresh token"""
+    _refresh_claims(body.refresh_token)
+    await revoke_refresh_token(db, hash_token(body.refresh_token))
+    await db.commit()
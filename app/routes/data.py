@@ -1,40 +1,170 @@
-from fastapi import APIRouter, Depends, HTTPException
+import json
+from datetime import datetime, timedelta, timezone
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import TypeAdapter, ValidationError
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from sqlalchemy.sql import desc
-from app.models.room import RoomData, RoomDataCreate, RoomDataResponse
-from app.models.user import User, get_current_user
+from app.models.room import RoomData, RoomDataCreate, RoomDataResponse, BulkIngestResponse, RoomAnomalyResponse
+from app.models.user import AuthenticatedUser, get_authenticated_user
 from app.auth.permissions import Permission, has_permission
-from app.database import get_db
+from app.auth.rate_limiter import ingest_rate_limiter
+from app.services.room_data_service import bulk_insert_room_data, latest_per_room_query
+from app.services.ingest_buffer import room_data_buffer
+from app.services.room_cache import latest_readings
+from app.services.rollup_service import apply_rollups
+from app.services.analytics_snapshot import analytics_executor
+from app.services.room_anomaly_service import MAX_ANOMALY_HOURS, load_room_rollups, rank_room_rollups
+from app.services.series_service import (
+    AGGREGATES, BUCKETS, MAX_SERIES_BUCKETS, ROLLUP_BUCKETS,
+    downsample_points, query_rollup_series, query_room_series
+)
+from app.config import settings
+from app.database import get_db, async_session, engine
 
 router = APIRouter(prefix="/api/v1")
 
-@router.post("/data", response_model=RoomDataResponse)
+def _naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """Timestamps are stored as naive UTC; convert offset-aware query values to match"""
+    if value is None or value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+def _enqueue_or_reject(rows: List[dict]) -> None:
+    """Queue readings for write-behind, applying backpressure when full"""
+    if not room_data_buffer.submit(rows):
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Ingestion queue is full, retry later",
+            headers={"Retry-After": "1"}
+        )
+
+async def _iter_ndjson(request: Request) -> AsyncIterator[object]:
+    """Yield one parsed object per line of a streamed NDJSON body"""
+    pending = b""
+    async for chunk in request.stream():
+        pending += chunk
+        *lines, pending = pending.split(b"\n")
+        for line in lines:
+            if line.strip():
+                yield json.loads(line)
+    if pending.strip():
+        yield json.loads(pending)
+
+async def _read_bulk_items(request: Request) -> AsyncIterator[object]:
+    """Yield raw items from a JSON array or NDJSON request body"""
+    content_type = request.headers.get("content-type", "")
+    try:
+        if "ndjson" in content_type or "jsonlines" in content_type:
+            async for item in _iter_ndjson(request):
+                yield item
+            return
+        items = json.loads(await request.body())
+    except json.JSONDecodeError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Malformed body: {e}")
+    if not isinstance(items, list):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Expected a JSON array of readings")
+    for item in items:
+        yield item
+
+_bulk_adapter = TypeAdapter(List[RoomDataCreate])
+
+def _validate_bulk_items(items: List[object]) -> Tuple[List[dict], List[dict]]:
+    """Validate every item in one pass, returning insertable rows and per-item status"""
+    errors: Dict[int, list] = {}
+    try:
+        readings = _bulk_adapter.validate_python(items)
+    except ValidationError as e:
+        # Group the list-level errors by item index, then keep the valid items
+        for error in e.errors(include_url=False, include_input=False, include_context=False):
+            index, *loc = error["loc"]
+            errors.setdefault(index, []).append({**error, "loc": tuple(loc)})
+        readings = _bulk_adapter.validate_python([item for i, item in enumerate(items) if i not in errors])
+
+    rows = [dict(reading.__dict__) for reading in readings]
+    results = [
+        {"index": i, "status": "invalid", "errors": errors[i]} if i in errors else {"index": i, "status": "created"}
+        for i in range(len(items))
+    ]
+    return rows, results
+
+@router.post("/data", response_model=RoomDataResponse, dependencies=[Depends(ingest_rate_limiter)])
 async def create_room_data(
     data: RoomDataCreate,
-    current_user: User = Depends(get_current_user),
+    current_user: AuthenticatedUser = Depends(get_authenticated_user),
     db: AsyncSession = Depends(get_db)
 ):
     """
     Store room data in PostgreSQL database
     Requires create_room_data permission (admin role)
+    In write-behind mode the reading is queued and acknowledged with 202
     """
-    db_data = RoomData(**data.dict())
+    if settings.ROOM_DATA_WRITE_BEHIND:
+        _enqueue_or_reject([data.dict()])
+        return JSONResponse(
+            status_code=status.HTTP_202_ACCEPTED,
+            content={"status": "queued", "queue_depth": room_data_buffer.depth}
+        )
+
+    row = {**data.dict(), "timestamp": datetime.utcnow()}
+    db_data = RoomData(**row)
     db.add(db_data)
+    await apply_rollups(db, [row])
     await db.commit()
     await db.refresh(db_data)
+    latest_readings.put(RoomDataResponse.model_validate(db_data).model_dump())
     return db_data
 
+@router.post("/data/bulk", response_model=BulkIngestResponse, dependencies=[Depends(ingest_rate_limiter)])
+async def create_room_data_bulk(
+    request: Request,
+    current_user: AuthenticatedUser = Depends(has_permission([Permission.CREATE_ROOM_DATA])),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Store many room readings in one transaction
+    Accepts a JSON array or an NDJSON body (application/x-ndjson)
+    Requires create_room_data permission (admin or user role)
+    """
+    items = []
+    async for item in _read_bulk_items(request):
+        items.append(item)
+        if len(items) > settings.ROOM_DATA_BULK_MAX_ITEMS:
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail=f"At most {settings.ROOM_DATA_BULK_MAX_ITEMS} readings per request"
+            )
+
+    rows, results = _validate_bulk_items(items)
+    if settings.ROOM_DATA_WRITE_BEHIND:
+        _enqueue_or_reject(rows)
+        return JSONResponse(
+            status_code=status.HTTP_202_ACCEPTED,
+            content={"accepted": len(rows), "rejected": len(items) - len(rows), "results": results}
+        )
+
+    accepted = await bulk_insert_room_data(db, rows)
+    return {"accepted": accepted, "rejected": len(items) - accepted, "results": results}
+
 @router.get("/room/{room_id}/latest", response_model=RoomDataResponse)
 async def get_latest_room_data(
     room_id: str,
-    current_user: User = Depends(has_permission([Permission.READ_ROOM_DATA])),
+    current_user: AuthenticatedUser = Depends(has_permission([Permission.READ_ROOM_DATA])),
     db: AsyncSession = Depends(get_db)
 ):
     """
     Get the most recent data for a specific room
     Requires read_room_data permission (admin or viewer role)
+    Served from the in-process latest-reading table when fresh
     """
+    cached = latest_readings.get(room_id)
+    if cached is not None:
+        return cached
+
+    # Index seek on (room_id, timestamp DESC)
     query = select(RoomData).filter(RoomData.room_id == room_id).order_by(desc(RoomData.timestamp)).limit(1)
     result = await db.execute(query)
     data = result.scalar_one_or_none()
@@ -42,4 +172,97 @@ async def get_latest_room_data(
     if not data:
         raise HTTPException(status_code=404, detail=f"No data found for room {room_id}")
     
+    latest_readings.put(RoomDataResponse.model_validate(data).model_dump())
     return data
+
+@router.get("/rooms/latest", response_model=List[RoomDataResponse])
+async def get_latest_rooms_data(
+    room_ids: Optional[List[str]] = Query(None, description="Room ids (repeated or comma-separated); omit for all rooms"),
+    current_user: AuthenticatedUser = Depends(has_permission([Permission.READ_ROOM_DATA]))
+):
+    """
+    Get the most recent data for many rooms in one request
+    Requires read_room_data permission (admin or viewer role)
+    """
+    if room_ids:
+        room_ids = [room_id for value in room_ids for room_id in value.split(",") if room_id]
+    query = latest_per_room_query(engine.dialect.name, room_ids)
+
+    async def stream_rows() -> AsyncIterator[str]:
+        # The response outlives request-scoped dependencies, so use our own session
+        async with async_session() as db:
+            result = await db.stream_scalars(query)
+            yield "["
+            first = True
+            async for row in result:
+                reading = RoomDataResponse.model_validate(row)
+                latest_readings.put(reading.model_dump())
+                yield ("" if first else ",") + reading.model_dump_json()
+                first = False
+            yield "]"
+
+    return StreamingResponse(stream_rows(), media_type="application/json")
+
+@router.get("/room/{room_id}/series")
+async def get_room_series(
+    room_id: str,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    bucket: str = Query("15m", description="Bucket width: " + ", ".join(BUCKETS)),
+    agg: str = Query("avg,min,max,count", description="Comma-separated aggregates"),
+    max_points: int = Query(500, ge=3, le=10000),
+    current_user: AuthenticatedUser = Depends(has_permission([Permission.READ_ROOM_DATA])),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Get time-bucketed aggregates of a room's readings for charts
+    Defaults to the last 24 hours; aggregation happens in SQL
+    Hourly and daily buckets are served from the rollup tables
+    Requires read_room_data permission (admin or viewer role)
+    """
+    if bucket not in BUCKETS:
+        raise HTTPException(status_code=400, detail=f"Unsupported bucket '{bucket}'")
+    aggregates = [a.strip() for a in agg.split(",") if a.strip()]
+    unknown = set(aggregates) - set(AGGREGATES)
+    if not aggregates or unknown:
+        raise HTTPException(status_code=400, detail=f"Unsupported aggregates: {', '.join(sorted(unknown)) or agg}")
+
+    end = _naive_utc(end) or datetime.utcnow()
+    start = _naive_utc(start) or end - timedelta(hours=24)
+    if start >= end:
+        raise HTTPException(status_code=400, detail="start must be before end")
+    bucket_seconds = BUCKETS[bucket]
+    if (end - start).total_seconds() / bucket_seconds > MAX_SERIES_BUCKETS:
+        raise HTTPException(status_code=400, detail="Time range too large for this bucket size")
+
+    if bucket in ROLLUP_BUCKETS:
+        points = await query_rollup_series(db, room_id, start, end, ROLLUP_BUCKETS[bucket], aggregates)
+    else:
+        points = await query_room_series(db, room_id, start, end, bucket_seconds, aggregates)
+    total = len(points)
+    points = downsample_points(points, max_points)
+    return {
+        "room_id": room_id,
+        "bucket": bucket,
+        "start": start,
+        "end": end,
+        "total_buckets": total,
+        "downsampled": len(points) < total,
+        "points": points
+    }
+
+@router.get("/anomalies/rooms", response_model=RoomAnomalyResponse)
+async def get_room_anomalies(
+    hours: int = Query(48, ge=24, le=MAX_ANOMALY_HOURS, description="Hourly buckets of history per room"),
+    top_k: int = Query(20, ge=1, le=500),
+    min_score: float = Query(3.0, ge=0),
+    current_user: AuthenticatedUser = Depends(has_permission([Permission.READ_ROOM_DATA])),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Rank rooms whose latest hourly readings deviate most from their own history
+    Every room is scored in one pass over the hourly rollups (z-score, MAD, seasonal)
+    Requires read_room_data permission (admin or viewer role)
+    """
+    rows, start = await load_room_rollups(db, datetime.utcnow(), hours)
+    return await analytics_executor.run(rank_room_rollups, rows, start, hours, top_k, min_score)
@@ -1,10 +1,10 @@
 from fastapi import APIRouter, Depends
-from app.models.user import get_current_user
+from app.models.user import get_authenticated_user
 
 router = APIRouter()
 
 @router.get("/")
-async def root(current_user = Depends(get_current_user)):
+async def root(current_user = Depends(get_authenticated_user)):
     """
     Root endpoint that returns service status
     Requires basic authentication
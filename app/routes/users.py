@@ -1,27 +1,61 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
+from pydantic import TypeAdapter, ValidationError
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
-from typing import List
+from sqlalchemy import exists, false, insert, or_, select, func, tuple_
+from typing import AsyncIterator, Dict, List, Optional, Tuple
 from datetime import datetime
+import base64
+import csv
+import io
+import json
 
 from ..models.user import (
     User, 
     UserCreate, 
     UserUpdate, 
     UserResponse,
+    BulkUserImportResponse,
     hash_password,
+    hash_password_async,
     validate_password,
+    AuthenticatedUser,
     get_current_admin,
     get_current_user
 )
-from ..database import get_db
+from ..database import async_session, get_db
+from ..services.password_pool import bulk_password_pool
+from ..services.user_cache import user_cache
+from ..config import settings
 
 router = APIRouter(prefix="/api/v1/users", tags=["users"])
 
+PASSWORD_RULES = "Password must be at least 8 characters with uppercase, lowercase, number, and special character"
+
+def _admin_count():
+    return select(func.count(User.id)).filter(User.role == "admin").scalar_subquery()
+
+def _email_taken(email: Optional[str], user_id: int):
+    if email is None:
+        return false()
+    return exists().where(User.email == email, User.id != user_id)
+
+async def _commit_unique(db: AsyncSession) -> None:
+    """Commit, turning a unique constraint violation (lost race) into a 400"""
+    try:
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Username or email already registered"
+        )
+
 @router.post("/", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
 async def create_user(
     user_data: UserCreate,
-    current_user: User = Depends(get_current_admin),
+    current_user: AuthenticatedUser = Depends(get_current_admin),
     db: AsyncSession = Depends(get_db)
 ):
     """Create a new user (admin only)"""
@@ -30,48 +64,198 @@ async def create_user(
     if not validate_password(user_data.password):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Password must be at least 8 characters with uppercase, lowercase, number, and special character"
+            detail=PASSWORD_RULES
         )
     
-    # Check if username exists
-    result = await db.execute(select(User).filter(User.username == user_data.username))
-    if result.scalar_one_or_none():
+    # Check username and email in one query (the unique constraints catch races)
+    conditions = [User.username == user_data.username]
+    if user_data.email:
+        conditions.append(User.email == user_data.email)
+    result = await db.execute(select(User.username, User.email).where(or_(*conditions)))
+    for username, email in result:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Username already registered"
+            detail="Username already registered" if username == user_data.username else "Email already registered"
         )
     
-    # Check if email exists (if provided)
-    if user_data.email:
-        result = await db.execute(select(User).filter(User.email == user_data.email))
-        if result.scalar_one_or_none():
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Email already registered"
-            )
-    
     # Create new user
     new_user = User(
         username=user_data.username,
         email=user_data.email,
-        password_hash=hash_password(user_data.password),
+        password_hash=await hash_password_async(user_data.password),
         role=user_data.role,
         created_at=datetime.utcnow()
     )
     
     db.add(new_user)
-    await db.commit()
-    await db.refresh(new_user)
+    await _commit_unique(db)
     return new_user
 
+_bulk_user_adapter = TypeAdapter(List[UserCreate])
+
+async def _read_bulk_users(request: Request) -> List[object]:
+    """Raw user items from a JSON array or a CSV upload with a header row"""
+    body = await request.body()
+    if "csv" in request.headers.get("content-type", ""):
+        try:
+            reader = csv.DictReader(io.StringIO(body.decode("utf-8-sig")))
+            # Empty cells mean "not provided" (e.g. no email, default role)
+            return [{key: value for key, value in row.items() if value} for row in reader]
+        except (UnicodeDecodeError, csv.Error) as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Malformed CSV: {e}")
+    try:
+        items = json.loads(body)
+    except json.JSONDecodeError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Malformed body: {e}")
+    if not isinstance(items, list):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Expected a JSON array of users")
+    return items
+
+def _validate_bulk_users(items: List[object]) -> Tuple[Dict[int, UserCreate], Dict[int, list]]:
+    """Validate every item in one pass; returns valid users and errors by item index"""
+    errors: Dict[int, list] = {}
+    try:
+        parsed = _bulk_user_adapter.validate_python(items)
+        valid = dict(enumerate(parsed))
+    except ValidationError as e:
+        for error in e.errors(include_url=False, include_input=False, include_context=False):
+            index, *loc = error["loc"]
+            errors.setdefault(index, []).append({**error, "loc": tuple(loc)})
+        indexes = [i for i in range(len(items)) if i not in errors]
+        valid = dict(zip(indexes, _bulk_user_adapter.validate_python([items[i] for i in indexes])))
+
+    for index, user in list(valid.items()):
+        if not validate_password(user.password):
+            errors[index] = [{"loc": ("password",), "msg": PASSWORD_RULES, "type": "password_complexity"}]
+            del valid[index]
+    return valid, errors
+
+@router.post("/bulk", response_model=BulkUserImportResponse)
+async def create_users_bulk(
+    request: Request,
+    current_user: AuthenticatedUser = Depends(get_current_admin),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Import many users in one request (admin only)
+    Accepts a JSON array or CSV (username,email,password,role) with text/csv
+    Passwords are hashed in parallel and all users are inserted in one batch
+    """
+    items = await _read_bulk_users(request)
+    if len(items) > settings.USER_BULK_MAX_ITEMS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"At most {settings.USER_BULK_MAX_ITEMS} users per request"
+        )
+    valid, errors = _validate_bulk_users(items)
+
+    # Duplicates inside the upload and against existing users (one query)
+    conflicts = set()
+    seen_usernames, seen_emails = set(), set()
+    for index, user in valid.items():
+        if user.username in seen_usernames or (user.email and user.email in seen_emails):
+            conflicts.add(index)
+        seen_usernames.add(user.username)
+        if user.email:
+            seen_emails.add(user.email)
+    if valid:
+        result = await db.execute(
+            select(User.username, User.email).where(
+                or_(User.username.in_(seen_usernames), User.email.in_(seen_emails))
+            )
+        )
+        taken_usernames, taken_emails = set(), set()
+        for username, email in result:
+            taken_usernames.add(username)
+            taken_emails.add(email)
+        conflicts.update(
+            index for index, user in valid.items()
+            if user.username in taken_usernames or (user.email and user.email in taken_emails)
+        )
+        # Release the connection before minutes of hashing instead of idling in
+        # a transaction; the unique constraints still catch a racing insert
+        await db.rollback()
+
+    to_create = [(index, user) for index, user in valid.items() if index not in conflicts]
+    if to_create:
+        hashes = await bulk_password_pool.map(hash_password, [user.password for _, user in to_create])
+        now = datetime.utcnow()
+        await db.execute(insert(User), [
+            {
+                "username": user.username,
+                "email": user.email,
+                "password_hash": password_hash,
+                "role": user.role,
+                "created_at": now
+            }
+            for (_, user), password_hash in zip(to_create, hashes)
+        ])
+        await _commit_unique(db)
+
+    results = []
+    for index in range(len(items)):
+        if index in errors:
+            results.append({"index": index, "status": "invalid", "errors": errors[index]})
+        elif index in conflicts:
+            results.append({"index": index, "status": "conflict", "errors": ["Username or email already registered"]})
+        else:
+            results.append({"index": index, "status": "created"})
+    return {"created": len(to_create), "rejected": len(items) - len(to_create), "results": results}
+
+# Columns served by list_users; all of them are in the covering index on PostgreSQL
+USER_LIST_COLUMNS = (User.id, User.username, User.email, User.role, User.created_at, User.last_login)
+
+def _encode_cursor(created_at: datetime, user_id: int) -> str:
+    return base64.urlsafe_b64encode(f"{created_at.isoformat()}|{user_id}".encode()).decode()
+
+def _decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        created_at, user_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(created_at), int(user_id)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+
+def _user_list_query(cursor: Optional[str]):
+    """Newest users first, continuing after ``cursor`` (keyset on created_at, id)"""
+    query = select(*USER_LIST_COLUMNS).order_by(User.created_at.desc(), User.id.desc())
+    if cursor:
+        query = query.where(tuple_(User.created_at, User.id) < _decode_cursor(cursor))
+    return query
+
 @router.get("/", response_model=List[UserResponse])
 async def list_users(
-    current_user: User = Depends(get_current_admin),
+    response: Response,
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor value from the previous page"),
+    format: str = Query("json", pattern="^(json|ndjson)$", description="ndjson streams every remaining user"),
+    current_user: AuthenticatedUser = Depends(get_current_admin),
     db: AsyncSession = Depends(get_db)
 ):
-    """List all users (admin only)"""
-    result = await db.execute(select(User).order_by(User.created_at.desc()))
-    return result.scalars().all()
+    """
+    List users, newest first (admin only)
+    Pages of ``limit`` users; the X-Next-Cursor header continues the listing
+    """
+    query = _user_list_query(cursor)
+
+    if format == "ndjson":
+        async def stream_users() -> AsyncIterator[str]:
+            # The response outlives request-scoped dependencies, so use our own session
+            async with async_session() as stream_db:
+                result = await stream_db.stream(query)
+                async for row in result.mappings():
+                    yield UserResponse.model_validate(dict(row)).model_dump_json() + "\n"
+
+        return StreamingResponse(stream_users(), media_type="application/x-ndjson")
+
+    result = await db.execute(query.limit(limit + 1))
+    rows = result.mappings().all()
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers["X-Next-Cursor"] = _encode_cursor(rows[-1]["created_at"], rows[-1]["id"])
+    return [dict(row) for row in rows]
 
 @router.get("/me", response_model=UserResponse)
 async def get_current_user_info(
@@ -83,7 +267,7 @@ async def get_current_user_info(
 @router.get("/{user_id}", response_model=UserResponse)
 async def get_user(
     user_id: int,
-    current_user: User = Depends(get_current_admin),
+    current_user: AuthenticatedUser = Depends(get_current_admin),
     db: AsyncSession = Depends(get_db)
 ):
     """Get user details (admin only)"""
@@ -105,15 +289,8 @@ async def update_current_user(
 ):
     """Update current user's information"""
     
-    # Update email if provided
+    # Update email if provided (a taken email fails the unique constraint on commit)
     if user_data.email is not None:
-        if user_data.email != current_user.email:
-            result = await db.execute(select(User).filter(User.email == user_data.email))
-            if result.scalar_one_or_none():
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail="Email already registered"
-                )
         current_user.email = user_data.email
     
     # Update password if provided
@@ -121,9 +298,9 @@ async def update_current_user(
         if not validate_password(user_data.password):
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Password must be at least 8 characters with uppercase, lowercase, number, and special character"
+                detail=PASSWORD_RULES
             )
-        current_user.password_hash = hash_password(user_data.password)
+        current_user.password_hash = await hash_password_async(user_data.password)
     
     # Don't allow role changes for self
     if user_data.role is not None and user_data.role != current_user.role:
@@ -132,46 +309,44 @@ async def update_current_user(
             detail="Cannot change your own role"
         )
     
-    await db.commit()
-    await db.refresh(current_user)
+    await _commit_unique(db)
+    user_cache.invalidate(current_user.username)
     return current_user
 
 @router.put("/{user_id}", response_model=UserResponse)
 async def update_user(
     user_id: int,
     user_data: UserUpdate,
-    current_user: User = Depends(get_current_admin),
+    current_user: AuthenticatedUser = Depends(get_current_admin),
     db: AsyncSession = Depends(get_db)
 ):
     """Update user details (admin only)"""
-    result = await db.execute(select(User).filter(User.id == user_id))
-    user = result.scalar_one_or_none()
+    # Load the user, the admin count and the email check in one round trip
+    result = await db.execute(
+        select(User, _admin_count(), _email_taken(user_data.email, user_id)).filter(User.id == user_id)
+    )
+    row = result.first()
     
-    if not user:
+    if not row:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, 
             detail="User not found"
         )
+    user, admin_count, email_taken = row
     
     # Update email if provided
     if user_data.email is not None:
-        if user_data.email != user.email:  # Only check if email is actually changing
-            result = await db.execute(select(User).filter(User.email == user_data.email))
-            if result.scalar_one_or_none():
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail="Email already registered"
-                )
+        if email_taken:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Email already registered"
+            )
         user.email = user_data.email
     
     # Update role if provided
     if user_data.role is not None:
         # Prevent removing the last admin
         if user.role == "admin" and user_data.role != "admin":
-            admin_count_result = await db.execute(
-                select(func.count(User.id)).filter(User.role == "admin")
-            )
-            admin_count = admin_count_result.scalar()
             if admin_count <= 1:
                 raise HTTPException(
                     status_code=status.HTTP_400_BAD_REQUEST,
@@ -184,29 +359,30 @@ async def update_user(
         if not validate_password(user_data.password):
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Password must be at least 8 characters with uppercase, lowercase, number, and special character"
+                detail=PASSWORD_RULES
             )
-        user.password_hash = hash_password(user_data.password)
+        user.password_hash = await hash_password_async(user_data.password)
     
-    await db.commit()
-    await db.refresh(user)
+    await _commit_unique(db)
+    user_cache.invalidate(user.username)
     return user
 
 @router.delete("/{user_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_user(
     user_id: int,
-    current_user: User = Depends(get_current_admin),
+    current_user: AuthenticatedUser = Depends(get_current_admin),
     db: AsyncSession = Depends(get_db)
 ):
     """Delete a user (admin only)"""
-    result = await db.execute(select(User).filter(User.id == user_id))
-    user = result.scalar_one_or_none()
+    result = await db.execute(select(User, _admin_count()).filter(User.id == user_id))
+    row = result.first()
     
-    if not user:
+    if not row:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, 
             detail="User not found"
         )
+    user, admin_count = row
     
     # Prevent self-deletion
     if user.id == current_user.id:
@@ -217,10 +393,6 @@ async def delete_user(
     
     # Prevent deleting the last admin
     if user.role == "admin":
-        admin_count_result = await db.execute(
-            select(func.count(User.id)).filter(User.role == "admin")
-        )
-        admin_count = admin_count_result.scalar()
         if admin_count <= 1:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -229,3 +401,4 @@ async def delete_user(
     
     await db.delete(user)
     await db.commit()
+    user_cache.invalidate(user.username)
@@ -0,0 +1,51 @@
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+from app.main import app, history, data_service
+
+DASHBOARD_PATHS = ("/metrics", "/insights", "/recommendations", "/predictions", "/efficiency-score", "/anomalies")
+
+async def run(clients: int, polls: int) -> dict:
+    """Each client polls every dashboard endpoint ``polls`` times, like a browser tab"""
+    if not history.count:
+        history.seed(data_service.generate_hotel_metrics() for _ in range(24))
+
+    latencies = []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def dashboard():
+            for _ in range(polls):
+                for path in DASHBOARD_PATHS:
+                    started = time.perf_counter()
+                    response = await client.get(path)
+                    latencies.append(time.perf_counter() - started)
+                    response.raise_for_status()
+
+        started = time.perf_counter()
+        await asyncio.gather(*(dashboard() for _ in range(clients)))
+        elapsed = time.perf_counter() - started
+
+    latency_ms = sorted(s * 1000 for s in latencies)
+    return {
+        "requests": len(latency_ms),
+        "elapsed_s": round(elapsed, 3),
+        "p50_ms": round(statistics.median(latency_ms), 2),
+        "p99_ms": round(latency_ms[round((len(latency_ms) - 1) * 0.99)], 2),
+        "max_ms": round(latency_ms[-1], 2)
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Request latency with many concurrent dashboard clients")
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--polls", type=int, default=5)
+    args = parser.parse_args()
+
+    result = asyncio.run(run(args.clients, args.polls))
+    print(
+        f"{result['requests']} requests in {result['elapsed_s']}s, "
+        f"p50={result['p50_ms']}ms p99={result['p99_ms']}ms max={result['max_ms']}ms"
+    )
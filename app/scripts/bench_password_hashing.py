@@ -0,0 +1,64 @@
+import argparse
+import asyncio
+import statistics
+import time
+
+from passlib.context import CryptContext
+
+from app.config import settings
+from app.services.password_pool import PasswordHashPool
+
+async def measure_loop_lag(stop: asyncio.Event, interval: float, samples: list) -> None:
+    """Record how late the event loop wakes a periodic ticker"""
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        samples.append(time.perf_counter() - started - interval)
+
+async def run(mode: str, logins: int, rounds: int, workers: int, interval: float) -> dict:
+    context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=rounds)
+    hashed = context.hash("Sup3r$ecret")
+    pool = PasswordHashPool(workers=workers, max_pending=logins)
+
+    async def login():
+        if mode == "inline":
+            # What the handlers did before: bcrypt directly inside the coroutine
+            context.verify("Sup3r$ecret", hashed)
+        else:
+            await pool.run(context.verify, "Sup3r$ecret", hashed)
+
+    samples = []
+    stop = asyncio.Event()
+    ticker = asyncio.create_task(measure_loop_lag(stop, interval, samples))
+    await asyncio.sleep(interval * 2)
+    started = time.perf_counter()
+    await asyncio.gather(*(login() for _ in range(logins)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await ticker
+    pool.shutdown()
+
+    lag_ms = sorted(s * 1000 for s in samples)
+    return {
+        "mode": mode,
+        "logins": logins,
+        "elapsed_s": round(elapsed, 3),
+        "lag_p50_ms": round(statistics.median(lag_ms), 2),
+        "lag_p99_ms": round(lag_ms[round((len(lag_ms) - 1) * 0.99)], 2),
+        "lag_max_ms": round(lag_ms[-1], 2)
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Event-loop latency under concurrent bcrypt logins")
+    parser.add_argument("--logins", type=int, default=20)
+    parser.add_argument("--rounds", type=int, default=12, help="bcrypt cost factor")
+    parser.add_argument("--workers", type=int, default=settings.PASSWORD_HASH_WORKERS)
+    parser.add_argument("--interval-ms", type=float, default=10.0, help="ticker period")
+    args = parser.parse_args()
+
+    for mode in ("inline", "pool"):
+        result = asyncio.run(run(mode, args.logins, args.rounds, args.workers, args.interval_ms / 1000))
+        print(
+            f"{result['mode']:>6}: {result['logins']} logins in {result['elapsed_s']}s, "
+            f"loop lag p50={result['lag_p50_ms']}ms p99={result['lag_p99_ms']}ms max={result['lag_max_ms']}ms"
+        )
@@ -0,0 +1,31 @@
+import argparse
+import asyncio
+
+from app.config import settings
+from app.database import async_session
+from app.services.retention_service import (
+    drop_expired_partitions,
+    ensure_partitions,
+    is_partitioned,
+    purge_expired_rows
+)
+
+async def maintain(months_ahead: int, retention_days: int, chunk_size: int) -> None:
+    """Create upcoming room_data partitions and apply the retention policy"""
+    async with async_session() as db:
+        if await is_partitioned(db):
+            created = await ensure_partitions(db, months_ahead)
+            dropped = await drop_expired_partitions(db, retention_days)
+            print(f"Created partitions: {', '.join(created) or 'none'}")
+            print(f"Dropped partitions: {', '.join(dropped) or 'none'}")
+        else:
+            deleted = await purge_expired_rows(db, retention_days, chunk_size)
+            print(f"Deleted {deleted} expired room_data rows")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="room_data partition and retention maintenance")
+    parser.add_argument("--months-ahead", type=int, default=settings.ROOM_DATA_PARTITION_MONTHS_AHEAD)
+    parser.add_argument("--retention-days", type=int, default=settings.ROOM_DATA_RETENTION_DAYS)
+    parser.add_argument("--chunk-size", type=int, default=settings.ROOM_DATA_PURGE_CHUNK_SIZE)
+    args = parser.parse_args()
+    asyncio.run(maintain(args.months_ahead, args.retention_days, args.chunk_size))
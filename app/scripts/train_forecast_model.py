@@ -0,0 +1,92 @@
+import argparse
+import asyncio
+import os
+from typing import List, Tuple
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import func, select
+
+from app.config import settings
+from app.database import async_session
+from app.models.room import RoomDataHourly
+from app.services.forecast_model import FORECAST_FIELDS, resample_hourly, save_forecast_model, train_forecast_model
+from app.services.timeseries import SharedMetricsBuffer, to_epoch
+
+def read_readings(path: str) -> pd.DataFrame:
+    """Load exported hotel readings from CSV, a JSON array or NDJSON"""
+    if path.endswith(".csv"):
+        return pd.read_csv(path)
+    return pd.read_json(path, lines=path.endswith((".ndjson", ".jsonl")))
+
+def collect_readings(paths: List[str], include_history: bool) -> Tuple[np.ndarray, np.ndarray]:
+    """Return epoch timestamps and a (fields x n) value matrix from every source"""
+    frames = [read_readings(path) for path in paths]
+    if include_history:
+        if settings.METRICS_HISTORY_BACKEND != "shared" or not os.path.exists(settings.METRICS_HISTORY_PATH):
+            raise SystemExit("--history needs the shared metrics history backend")
+        history = SharedMetricsBuffer(settings.METRICS_HISTORY_PATH, capacity=settings.METRICS_HISTORY_CAPACITY)
+        frames.append(pd.DataFrame(history.records()))
+    if not frames:
+        raise SystemExit("No training data: pass --readings and/or --history")
+
+    readings = pd.concat(frames, ignore_index=True).dropna(subset=["timestamp", "energy_usage"])
+    missing = set(FORECAST_FIELDS) - set(readings.columns)
+    if missing:
+        raise SystemExit(f"Readings are missing columns: {', '.join(sorted(missing))}")
+    timestamps = np.array([to_epoch(ts) for ts in readings["timestamp"].astype(str)], dtype=np.int64)
+    values = readings[list(FORECAST_FIELDS)].to_numpy(dtype=np.float64).T
+    return timestamps, values
+
+async def room_occupancy(first_hour: int, hours: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Hotel-wide occupancy (%) per hour from the room_data hourly rollups"""
+    start = pd.Timestamp(first_hour * 3600, unit="s").to_pydatetime()
+    end = pd.Timestamp((first_hour + hours) * 3600, unit="s").to_pydatetime()
+    query = (
+        select(
+            RoomDataHourly.bucket_start,
+            func.sum(RoomDataHourly.occupied_count),
+            func.sum(RoomDataHourly.count)
+        )
+        .where(RoomDataHourly.bucket_start >= start, RoomDataHourly.bucket_start < end)
+        .group_by(RoomDataHourly.bucket_start)
+    )
+    async with async_session() as db:
+        rows = (await db.execute(query)).all()
+    if not rows:
+        return np.empty(0, dtype=np.int64), np.empty(0)
+    buckets, occupied, count = zip(*rows)
+    hours_index = np.array([to_epoch(b) // 3600 for b in buckets], dtype=np.int64) - first_hour
+    return hours_index, 100.0 * np.asarray(occupied, dtype=np.float64) / np.asarray(count, dtype=np.float64)
+
+def main(args) -> None:
+    timestamps, values = collect_readings(args.readings, args.history)
+    first_hour, series = resample_hourly(timestamps, values)
+
+    if args.room_data:
+        # Room sensors are the ground truth for occupancy where they cover an hour
+        hours_index, occupancy = asyncio.run(room_occupancy(first_hour, len(series)))
+        series[hours_index, FORECAST_FIELDS.index("occupancy")] = occupancy
+        print(f"Occupancy from room_data for {len(hours_index)} of {len(series)} hours")
+
+    trained = train_forecast_model(
+        series, first_hour, lags=args.lags, horizons=args.horizons, alpha=args.alpha, holdout=args.holdout
+    )
+    version = save_forecast_model(args.output_dir, trained)
+    backtest = trained["meta"]["backtest"]
+    print(f"Trained on {trained['meta']['train_rows']} hourly origins, holdout {backtest['holdout_rows']}")
+    print(f"Energy usage accuracy by horizon: {backtest['horizon_accuracy']['energy_usage']}")
+    print(f"Saved model {version} to {args.output_dir} (overall accuracy {backtest['accuracy']})")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train the hourly energy forecast model")
+    parser.add_argument("--readings", action="append", default=[], help="CSV, JSON or NDJSON export of readings")
+    parser.add_argument("--history", action="store_true", help="Include the shared metrics history buffer")
+    parser.add_argument("--no-room-data", dest="room_data", action="store_false",
+                        help="Do not take hourly occupancy from room_data")
+    parser.add_argument("--lags", type=int, default=settings.FORECAST_LAGS)
+    parser.add_argument("--horizons", type=int, default=settings.FORECAST_HORIZON_HOURS)
+    parser.add_argument("--alpha", type=float, default=settings.FORECAST_RIDGE_ALPHA)
+    parser.add_argument("--holdout", type=float, default=0.2, help="Fraction of the newest hours kept for the backtest")
+    parser.add_argument("--output-dir", default=settings.FORECAST_MODEL_DIR)
+    main(parser.parse_args())
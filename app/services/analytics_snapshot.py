@@ -0,0 +1,252 @@
+import asyncio
+import hashlib
+import json
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from types import MappingProxyType
+from typing import Any, Dict, List, Mapping, Optional
+
+from fastapi.encoders import jsonable_encoder
+
+from app.config import settings
+from app.services.timeseries import MetricsBuffer
+from app.utils.bounded_executor import BoundedExecutor
+
+logger = logging.getLogger(__name__)
+
+# Endpoint payloads held by every snapshot
+SNAPSHOT_VIEWS = ("insights", "recommendations", "predictions", "efficiency", "anomalies", "savings")
+
+
+@dataclass(frozen=True)
+class AnalyticsSnapshot:
+    """
+    Pre-rendered analytics responses for one history version.
+    Payloads are serialized once; serving a view is a dict lookup.
+    """
+    version: int
+    generated_at: datetime
+    built_at: float  # monotonic, for max-age checks
+    payloads: Mapping[str, bytes]
+    etags: Mapping[str, str]
+
+    @property
+    def last_modified(self) -> str:
+        return format_datetime(self.generated_at.replace(tzinfo=timezone.utc), usegmt=True)
+
+    def not_modified(self, view: str, if_none_match: Optional[str], if_modified_since: Optional[str]) -> bool:
+        """Evaluate conditional request headers against this snapshot (If-None-Match wins)"""
+        if if_none_match is not None:
+            etag = self.etags[view]
+            tags = {tag.strip() for tag in if_none_match.split(",")}
+            return "*" in tags or etag in tags or f"W/{etag}" in tags
+        if if_modified_since is not None:
+            try:
+                since = parsedate_to_datetime(if_modified_since)
+            except (TypeError, ValueError):
+                return False
+            if since.tzinfo is None:
+                since = since.replace(tzinfo=timezone.utc)
+            return self.generated_at.replace(microsecond=0, tzinfo=timezone.utc) <= since
+        return False
+
+
+def _render(payload: Any) -> bytes:
+    return json.dumps(jsonable_encoder(payload), separators=(",", ":")).encode()
+
+
+class AnalyticsSnapshotStore:
+    """
+    Holds the current AnalyticsSnapshot and rebuilds it only when the history
+    version (its append counter) changes, or when it is older than
+    ``max_age`` seconds since several views depend on the time of day.
+
+    Rebuilds read a frozen copy of the history and are serialized by a lock.
+    Async callers run them on ``executor`` and share a single in-flight
+    rebuild, so a burst of requests after a new reading costs one build.
+    """
+
+    def __init__(self, history: MetricsBuffer, data_service, insights_service, ml_service,
+                 max_age: float = 60.0, executor: Optional[BoundedExecutor] = None):
+        self.history = history
+        self.data_service = data_service
+        self.insights_service = insights_service
+        self.ml_service = ml_service
+        self.max_age = max_age
+        self.executor = executor
+        self._snapshot: Optional[AnalyticsSnapshot] = None
+        self._lock = threading.Lock()
+        self._inflight: Optional[asyncio.Future] = None
+        # (history version, model version, predictions) of the last build
+        self._forecast: Optional[tuple] = None
+        self.builds = 0
+        self.forecasts_reused = 0
+
+    def _is_fresh(self, snapshot: Optional[AnalyticsSnapshot]) -> bool:
+        return (
+            snapshot is not None
+            and snapshot.version == self.history.count
+            and time.monotonic() - snapshot.built_at <= self.max_age
+        )
+
+    def current(self) -> AnalyticsSnapshot:
+        snapshot = self._snapshot
+        if self._is_fresh(snapshot):
+            return snapshot
+        with self._lock:
+            # Another thread may have rebuilt while we waited for the lock
+            snapshot = self._snapshot
+            if self._is_fresh(snapshot):
+                return snapshot
+            return self._rebuild()
+
+    async def get(self) -> AnalyticsSnapshot:
+        """Return a fresh snapshot, rebuilding off the event loop when needed"""
+        snapshot = self._snapshot
+        # A reading may land while a rebuild is in flight; allow one follow-up rebuild
+        for _ in range(2):
+            if self._is_fresh(snapshot):
+                return snapshot
+            if self._inflight is None:
+                self._inflight = asyncio.ensure_future(self._run(self.current))
+                self._inflight.add_done_callback(self._clear_inflight)
+            snapshot = await asyncio.shield(self._inflight)
+        return snapshot
+
+    def refresh_in_background(self) -> None:
+        """
+        Start rebuilding for the latest history without waiting for it. Used
+        after a write so the write's response does not depend on the analytics
+        executor; a failed or rejected rebuild is logged and the next get() retries.
+        """
+        if self._is_fresh(self._snapshot):
+            return
+        task = asyncio.ensure_future(self.get())
+        task.add_done_callback(self._log_background_failure)
+
+    @staticmethod
+    def _log_background_failure(task: asyncio.Future) -> None:
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning("Background analytics snapshot rebuild failed: %r", task.exception())
+
+    async def _run(self, func):
+        if self.executor is None:
+            return func()
+        return await self.executor.run(func)
+
+    def _clear_inflight(self, future: asyncio.Future) -> None:
+        if self._inflight is future:
+            self._inflight = None
+
+    def refresh(self) -> AnalyticsSnapshot:
+        with self._lock:
+            return self._rebuild()
+
+    def _rebuild(self) -> AnalyticsSnapshot:
+        history = self.history.frozen()
+        version = history.count
+        now = datetime.utcnow()
+        payloads = {name: _render(payload) for name, payload in self._build_payloads(history, now).items()}
+        snapshot = AnalyticsSnapshot(
+            version=version,
+            generated_at=now,
+            built_at=time.monotonic(),
+            payloads=MappingProxyType(payloads),
+            etags=MappingProxyType({
+                name: f'"{hashlib.blake2b(body, digest_size=8).hexdigest()}"' for name, body in payloads.items()
+            })
+        )
+        self._snapshot = snapshot
+        self.builds += 1
+        return snapshot
+
+    def _predictions(self, history: MetricsBuffer) -> List[Dict]:
+        """Forecast for ``history``; a rebuild that only aged out reuses the previous one"""
+        key = (history.count, self.ml_service.prediction_model_version)
+        if self._forecast is not None and self._forecast[:2] == key:
+            self.forecasts_reused += 1
+            return self._forecast[2]
+        predictions = self.ml_service.predict_energy_usage(history, hours_ahead=8)
+        self._forecast = (*key, predictions)
+        return predictions
+
+    def _build_payloads(self, history: MetricsBuffer, now: datetime) -> Dict[str, Any]:
+        current_metrics = history.latest()
+        stamp = now.isoformat()
+        epoch = int(now.timestamp())
+
+        # Optimizations feed both /recommendations and /savings-potential
+        optimizations = self.insights_service.generate_optimizations(current_metrics) if current_metrics else []
+        savings = (
+            self.ml_service.calculate_savings_potential(current_metrics, optimizations) if current_metrics else {}
+        )
+
+        insights = self.insights_service.generate_insights(current_metrics, history) if current_metrics else []
+        for insight in insights:
+            insight["generated_at"] = stamp
+            insight["id"] = f"insight_{len(insights)}_{epoch}"
+
+        recommendations = [dict(opt) for opt in optimizations]
+        for i, rec in enumerate(recommendations):
+            rec["id"] = f"opt_{i}_{epoch}"
+            rec["status"] = "pending"
+            rec["created_at"] = stamp
+            rec["priority_score"] = rec["expectedSavings"] * rec["confidence"]
+        recommendations.sort(key=lambda x: x["priority_score"], reverse=True)
+
+        score = self.data_service.calculate_efficiency_score(history)
+
+        return {
+            "insights": insights,
+            "recommendations": recommendations,
+            "predictions": {
+                "predictions": self._predictions(history),
+                "model_accuracy": self.ml_service.prediction_model_accuracy,
+                "generated_at": stamp,
+                "baseline_usage": current_metrics["energy_usage"] if current_metrics else 0
+            },
+            "efficiency": {
+                "score": score,
+                "grade": "Excellent" if score >= 85 else "Good" if score >= 70 else "Needs Improvement",
+                "benchmarks": [
+                    {"name": "Hotel Average", "score": 72, "type": "industry"},
+                    {"name": "Industry Leader", "score": 88, "type": "best_practice"},
+                    {"name": "Your Target", "score": 85, "type": "goal"}
+                ],
+                "factors": {
+                    "usage_efficiency": round(score * 0.4, 1),
+                    "occupancy_optimization": round(score * 0.3, 1),
+                    "system_performance": round(score * 0.3, 1)
+                },
+                "calculated_at": stamp
+            },
+            "anomalies": {
+                "anomalies": self.ml_service.detect_anomalies(current_metrics, history),
+                "detection_time": stamp,
+                "baseline_period": "24_hours"
+            } if current_metrics else [],
+            "savings": savings
+        }
+
+    def stats(self) -> Dict:
+        snapshot = self._snapshot
+        return {
+            "version": snapshot.version if snapshot else None,
+            "generated_at": snapshot.generated_at.isoformat() if snapshot else None,
+            "builds": self.builds,
+            "forecasts_reused": self.forecasts_reused,
+            "rebuilding": self._inflight is not None,
+            "executor": self.executor.stats() if self.executor else None
+        }
+
+
+# CPU-bound analytics run here rather than on the event loop or Starlette's shared thread pool
+analytics_executor = BoundedExecutor(
+    "analytics",
+    workers=settings.ANALYTICS_WORKERS,
+    max_pending=settings.ANALYTICS_MAX_PENDING
+)
@@ -0,0 +1,144 @@
+import numpy as np
+from typing import Dict, Sequence, Tuple
+
+from app.services.timeseries import MetricsBuffer
+
+# Metrics watched by the anomaly detector by default
+ANOMALY_FIELDS = ("energy_usage", "occupancy", "humidity")
+
+HOURS_PER_DAY = 24
+
+
+class RollingBaselines:
+    """
+    Incrementally maintained statistics for anomaly detection.
+
+    Keeps, for every watched metric at once:
+      * mean/variance over the last ``window`` readings, and
+      * mean/variance per hour of day (24 buckets) over the last
+        ``baseline_window`` readings.
+
+    Both are sliding Welford accumulators: a new reading is added and the
+    reading leaving each window is removed, so ``push`` is O(1) per metric
+    and queries only read state. Evicted readings come from a private ring
+    of the last ``baseline_window`` readings. The accumulators are
+    recomputed exactly from that ring once per ring cycle so floating-point
+    error from removals cannot build up.
+    """
+
+    def __init__(self, fields: Sequence[str] = ANOMALY_FIELDS, window: int = 24, baseline_window: int = 168):
+        if window < 1 or baseline_window < window:
+            raise ValueError("need 1 <= window <= baseline_window")
+        self.fields = tuple(fields)
+        self.window = window
+        self.baseline_window = baseline_window
+        self._columns = {name: i for i, name in enumerate(self.fields)}
+        self.reset()
+
+    def reset(self) -> None:
+        width = len(self.fields)
+        self._ring = np.zeros((self.baseline_window, width), dtype=np.float64)
+        self._ring_hours = np.zeros(self.baseline_window, dtype=np.int64)
+        self._pushed = 0
+        # Rolling window accumulators are stored as one bucket so both share the Welford helpers
+        self._n = np.zeros(1, dtype=np.int64)
+        self._mean = np.zeros((1, width))
+        self._m2 = np.zeros((1, width))
+        self._hour_n = np.zeros(HOURS_PER_DAY, dtype=np.int64)
+        self._hour_mean = np.zeros((HOURS_PER_DAY, width))
+        self._hour_m2 = np.zeros((HOURS_PER_DAY, width))
+        self.synced_count = 0
+
+    @staticmethod
+    def _add(n: np.ndarray, mean: np.ndarray, m2: np.ndarray, k: int, x: np.ndarray) -> None:
+        n[k] += 1
+        delta = x - mean[k]
+        mean[k] += delta / n[k]
+        m2[k] += delta * (x - mean[k])
+
+    @staticmethod
+    def _remove(n: np.ndarray, mean: np.ndarray, m2: np.ndarray, k: int, x: np.ndarray) -> None:
+        n[k] -= 1
+        if n[k] == 0:
+            mean[k] = 0.0
+            m2[k] = 0.0
+            return
+        delta = x - mean[k]
+        mean[k] -= delta / n[k]
+        m2[k] = np.maximum(m2[k] - delta * (x - mean[k]), 0.0)
+
+    def push(self, values: np.ndarray, hour: int) -> None:
+        """Add one reading (values ordered like ``fields``) taken at ``hour`` UTC"""
+        i = self._pushed
+        size = self.baseline_window
+        if i >= self.window:
+            self._remove(self._n, self._mean, self._m2, 0, self._ring[(i - self.window) % size])
+        slot = i % size
+        if i >= size:
+            self._remove(self._hour_n, self._hour_mean, self._hour_m2, self._ring_hours[slot], self._ring[slot])
+
+        self._ring[slot] = values
+        self._ring_hours[slot] = hour
+        self._add(self._n, self._mean, self._m2, 0, self._ring[slot])
+        self._add(self._hour_n, self._hour_mean, self._hour_m2, hour, self._ring[slot])
+        self._pushed += 1
+        if self._pushed % size == 0:
+            self._recompute()
+
+    def _recompute(self) -> None:
+        """Rebuild every accumulator exactly from the ring (once per ring cycle)"""
+        size = min(self._pushed, self.baseline_window)
+        order = np.arange(self._pushed - size, self._pushed) % self.baseline_window
+        values, hours = self._ring[order], self._ring_hours[order]
+
+        recent = values[-self.window:]
+        self._n[0] = len(recent)
+        self._mean[0] = recent.mean(axis=0)
+        self._m2[0] = ((recent - self._mean[0]) ** 2).sum(axis=0)
+
+        self._hour_n[:] = np.bincount(hours, minlength=HOURS_PER_DAY)
+        sums = np.zeros_like(self._hour_mean)
+        np.add.at(sums, hours, values)
+        counts = np.maximum(self._hour_n, 1)[:, None]
+        self._hour_mean[:] = sums / counts
+        self._hour_m2[:] = 0.0
+        np.add.at(self._hour_m2, hours, (values - self._hour_mean[hours]) ** 2)
+
+    def sync(self, history: MetricsBuffer) -> int:
+        """Push the readings appended to ``history`` since the last sync; returns how many"""
+        if history.count < self.synced_count:
+            # A different or reset buffer: start over from what it holds
+            self.reset()
+        new = min(history.count - self.synced_count, len(history))
+        if new > 0:
+            values = np.stack([history.column(name, new) for name in self.fields], axis=1)
+            hours = (history.timestamps(new) // 3600) % HOURS_PER_DAY
+            for row, hour in zip(values, hours.tolist()):
+                self.push(row, hour)
+        self.synced_count = history.count
+        return new
+
+    def rolling(self, field: str) -> Tuple[int, float, float]:
+        """(count, mean, population std) over the rolling window"""
+        k = self._columns[field]
+        n = int(self._n[0])
+        if n == 0:
+            return 0, 0.0, 0.0
+        return n, float(self._mean[0, k]), float(np.sqrt(self._m2[0, k] / n))
+
+    def hourly(self, field: str, hour: int) -> Tuple[int, float, float]:
+        """(count, mean, population std) of readings taken at ``hour`` UTC"""
+        k = self._columns[field]
+        n = int(self._hour_n[hour])
+        if n == 0:
+            return 0, 0.0, 0.0
+        return n, float(self._hour_mean[hour, k]), float(np.sqrt(self._hour_m2[hour, k] / n))
+
+    def stats(self) -> Dict:
+        return {
+            "fields": list(self.fields),
+            "window": self.window,
+            "baseline_window": self.baseline_window,
+            "readings": self._pushed,
+            "hours_covered": int(np.count_nonzero(self._hour_n))
+        }
@@ -1,8 +1,11 @@
 import random
 import time
+import numpy as np
 from datetime import datetime, timedelta
 from typing import Dict, List
 
+from app.services.timeseries import MetricsBuffer
+
 class DataService:
     def __init__(self):
         self.base_energy_usage = 1200
@@ -67,16 +70,15 @@ class DataService:
             "timestamp": datetime.utcnow().isoformat()
         }
     
-    def calculate_efficiency_score(self, historical_data: List[Dict]) -> int:
+    def calculate_efficiency_score(self, history: MetricsBuffer) -> int:
         """Calculate energy efficiency score based on historical data"""
-        if not historical_data or len(historical_data) < 5:
+        if len(history) < 5:
             return 78  # Default score
         
-        # Calculate average usage per occupancy
-        avg_usage_per_occupancy = sum(
-            d["energy_usage"] / max(d["occupancy"], 1) 
-            for d in historical_data[-10:]
-        ) / min(len(historical_data), 10)
+        # Calculate average usage per occupancy over the last 10 readings
+        usage = history.column("energy_usage", 10)
+        occupancy = history.column("occupancy", 10)
+        avg_usage_per_occupancy = float(np.mean(usage / np.maximum(occupancy, 1)))
         
         # Benchmark: 15 kWh per % occupancy is excellent
         benchmark = 15.0
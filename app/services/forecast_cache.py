@@ -0,0 +1,79 @@
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+from app.config import settings
+
+
+class ForecastCache:
+    """
+    Per-worker LRU of forecast results.
+
+    Keys identify the forecast input completely (history version, last
+    reading timestamp, horizon, model version), so a hit is exactly what
+    recomputing would return. Entries expire after ``ttl`` seconds to release keys that are no
+    longer requested. Concurrent misses on one key are single-flight: the
+    first caller computes, the others wait for its result. Snapshot rebuilds
+    are already serialized by the snapshot lock; this covers direct callers.
+    Cached values are shared between callers and must be treated as read-only.
+    """
+
+    def __init__(self, ttl: float = 300.0, max_entries: int = 256):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._inflight: Dict[Hashable, Future] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry[0] <= self.ttl:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = self._inflight[key] = Future()
+                self.misses += 1
+            else:
+                self.coalesced += 1
+        if not owner:
+            return future.result()
+
+        try:
+            value = compute()
+        except BaseException as e:
+            with self._lock:
+                del self._inflight[key]
+            future.set_exception(e)
+            raise
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            del self._inflight[key]
+        future.set_result(value)
+        return value
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict:
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced
+        }
+
+
+forecast_cache = ForecastCache(ttl=settings.FORECAST_CACHE_TTL_SECONDS, max_entries=settings.FORECAST_CACHE_MAX_ENTRIES)
@@ -0,0 +1,236 @@
+import json
+import logging
+import os
+import shutil
+import threading
+import numpy as np
+from datetime import datetime
+from numpy.lib.stride_tricks import sliding_window_view
+from typing import Dict, Optional, Tuple
+
+from app.config import settings
+from app.services.timeseries import METRIC_FIELDS, MetricsBuffer
+
+logger = logging.getLogger(__name__)
+
+# Hourly inputs of the forecaster, and the subset it predicts
+FORECAST_FIELDS = ("energy_usage", "occupancy", "temperature", "humidity")
+FORECAST_TARGETS = ("energy_usage", "occupancy")
+LATEST_FILE = "LATEST"
+
+
+def resample_hourly(timestamps: np.ndarray, values: np.ndarray) -> Tuple[int, np.ndarray]:
+    """
+    Average (fields x n) readings into hourly buckets.
+    Returns the first bucket (epoch hours) and an (hours x fields) series in
+    which hours without readings repeat the previous hour.
+    """
+    hours = np.asarray(timestamps, dtype=np.int64) // 3600
+    first = int(hours.min())
+    index = hours - first
+    size = int(index.max()) + 1
+    counts = np.bincount(index, minlength=size)
+    series = np.empty((size, values.shape[0]))
+    for f in range(values.shape[0]):
+        series[:, f] = np.bincount(index, weights=values[f], minlength=size)
+    present = counts > 0
+    series[present] /= counts[present, None]
+    # Forward-fill gaps from the last hour that had readings
+    source = np.maximum.accumulate(np.where(present, np.arange(size), 0))
+    return first, series[source]
+
+
+def _features(windows: np.ndarray, origin_hours: np.ndarray) -> np.ndarray:
+    """(n x fields x lags) windows plus the hour of day of each window's last bucket"""
+    angle = 2 * np.pi * (origin_hours % 24) / 24
+    return np.hstack([windows.reshape(len(windows), -1), np.sin(angle)[:, None], np.cos(angle)[:, None]])
+
+
+def design_matrix(series: np.ndarray, first_hour: int, lags: int, horizons: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Build one training row per forecast origin: the last ``lags`` hours of every
+    field as inputs, and the next ``horizons`` hours of every target as outputs.
+    """
+    n = len(series) - lags - horizons + 1
+    if n <= 0:
+        return np.empty((0, len(FORECAST_FIELDS) * lags + 2)), np.empty((0, len(FORECAST_TARGETS) * horizons))
+    windows = sliding_window_view(series, lags, axis=0)[:n]
+    origins = first_hour + lags - 1 + np.arange(n)
+    targets = series[:, [FORECAST_FIELDS.index(t) for t in FORECAST_TARGETS]]
+    future = sliding_window_view(targets[lags:], horizons, axis=0)[:n]
+    return _features(windows, origins), future.reshape(n, -1)
+
+
+def train_forecast_model(
+    series: np.ndarray,
+    first_hour: int,
+    lags: int = 6,
+    horizons: int = 8,
+    alpha: float = 1.0,
+    holdout: float = 0.2
+) -> Dict:
+    """
+    Fit one multi-output ridge regression predicting every target at every
+    horizon. Accuracy comes from a chronological holdout backtest (1 - MAPE);
+    the served model is then refit on all rows. Standardization is folded
+    into the weights so inference is a single matrix-vector product.
+    """
+    from sklearn.linear_model import Ridge
+    from sklearn.pipeline import make_pipeline
+    from sklearn.preprocessing import StandardScaler
+
+    X, Y = design_matrix(series, first_hour, lags, horizons)
+    split = int(len(X) * (1 - holdout))
+    # Drop the rows whose targets overlap the holdout inputs
+    train_end = split - horizons
+    if train_end < 10 or len(X) - split < 5:
+        raise ValueError(f"Not enough hourly history to train and backtest ({len(series)} hours)")
+
+    backtest = make_pipeline(StandardScaler(), Ridge(alpha=alpha)).fit(X[:train_end], Y[:train_end])
+    actual = Y[split:]
+    errors = backtest.predict(X[split:]) - actual
+    shape = (len(FORECAST_TARGETS), horizons)
+    mae = np.abs(errors).mean(axis=0).reshape(shape)
+    mape = (np.abs(errors) / np.maximum(np.abs(actual), 1e-9)).mean(axis=0).reshape(shape)
+    accuracy = np.clip(1 - mape, 0.0, 1.0)
+
+    final = make_pipeline(StandardScaler(), Ridge(alpha=alpha)).fit(X, Y)
+    scaler, ridge = final[0], final[1]
+    weights = ridge.coef_ / scaler.scale_
+    bias = ridge.intercept_ - weights @ scaler.mean_
+
+    return {
+        "weights": weights,
+        "bias": bias,
+        "meta": {
+            "lags": lags,
+            "horizons": horizons,
+            "fields": list(FORECAST_FIELDS),
+            "targets": list(FORECAST_TARGETS),
+            "alpha": alpha,
+            "train_rows": len(X),
+            "train_start": datetime.utcfromtimestamp(first_hour * 3600).isoformat(),
+            "train_end": datetime.utcfromtimestamp((first_hour + len(series) - 1) * 3600).isoformat(),
+            "backtest": {
+                "holdout_rows": len(actual),
+                "accuracy": round(float(accuracy[0].mean()), 4),
+                "horizon_accuracy": {t: accuracy[i].round(4).tolist() for i, t in enumerate(FORECAST_TARGETS)},
+                "mae": {t: mae[i].round(3).tolist() for i, t in enumerate(FORECAST_TARGETS)}
+            }
+        }
+    }
+
+
+def save_forecast_model(directory: str, trained: Dict, version: Optional[str] = None) -> str:
+    """Write a versioned artifact directory and point LATEST at it; returns the version"""
+    version = version or datetime.utcnow().strftime("%Y%m%dT%H%M%SZ")
+    os.makedirs(directory, exist_ok=True)
+    staging = os.path.join(directory, f".{version}.tmp")
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+    np.save(os.path.join(staging, "weights.npy"), np.ascontiguousarray(trained["weights"], dtype=np.float64))
+    np.save(os.path.join(staging, "bias.npy"), np.ascontiguousarray(trained["bias"], dtype=np.float64))
+    with open(os.path.join(staging, "meta.json"), "w") as f:
+        json.dump({**trained["meta"], "version": version}, f, indent=2)
+    os.replace(staging, os.path.join(directory, version))
+
+    # Readers only ever see a complete artifact named by a complete LATEST file
+    pointer = os.path.join(directory, f".{LATEST_FILE}.tmp")
+    with open(pointer, "w") as f:
+        f.write(version)
+    os.replace(pointer, os.path.join(directory, LATEST_FILE))
+    return version
+
+
+class ForecastModel:
+    """A trained forecaster loaded from disk; weights are memory-mapped read-only"""
+
+    def __init__(self, weights: np.ndarray, bias: np.ndarray, meta: Dict):
+        self.weights = weights
+        self.bias = bias
+        self.meta = meta
+        self.version: str = meta["version"]
+        self.lags: int = meta["lags"]
+        self.horizons: int = meta["horizons"]
+        self.targets = tuple(meta["targets"])
+        self.accuracy: float = meta["backtest"]["accuracy"]
+        self.horizon_accuracy = meta["backtest"]["horizon_accuracy"]
+        self._field_rows = [METRIC_FIELDS.index(f) for f in meta["fields"]]
+
+    @classmethod
+    def load(cls, path: str) -> "ForecastModel":
+        with open(os.path.join(path, "meta.json")) as f:
+            meta = json.load(f)
+        weights = np.load(os.path.join(path, "weights.npy"), mmap_mode="r")
+        bias = np.load(os.path.join(path, "bias.npy"), mmap_mode="r")
+        return cls(weights, bias, meta)
+
+    def predict(self, features: np.ndarray) -> np.ndarray:
+        """(n x features) rows -> (n x targets x horizons) forecasts in one product"""
+        out = features @ self.weights.T + self.bias
+        return out.reshape(len(features), len(self.targets), self.horizons)
+
+    def forecast(self, history: MetricsBuffer) -> Optional[Tuple[int, np.ndarray]]:
+        """
+        Forecast every target and horizon from the latest hours of ``history``.
+        Returns the origin bucket (epoch hours) and a (targets x horizons)
+        array, or None if the history covers fewer than ``lags`` hours.
+        """
+        if not len(history):
+            return None
+        first, series = resample_hourly(history.timestamps(), history.window()[self._field_rows])
+        if len(series) < self.lags:
+            return None
+        origin = first + len(series) - 1
+        windows = series[-self.lags:].T[None]
+        return origin, self.predict(_features(windows, np.array([origin])))[0]
+
+
+def load_latest_model(directory: str) -> Optional[ForecastModel]:
+    try:
+        with open(os.path.join(directory, LATEST_FILE)) as f:
+            version = f.read().strip()
+    except FileNotFoundError:
+        return None
+    return ForecastModel.load(os.path.join(directory, version))
+
+
+class ForecastModelStore:
+    """
+    Loads the latest artifact lazily, once per process, on first use.
+    A missing or unreadable artifact yields None so callers can fall back.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._model: Optional[ForecastModel] = None
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    def get(self) -> Optional[ForecastModel]:
+        if not self._loaded:
+            with self._lock:
+                if not self._loaded:
+                    try:
+                        self._model = load_latest_model(self.directory)
+                    except (OSError, ValueError, KeyError) as e:
+                        logger.warning("Could not load forecast model from %s: %s", self.directory, e)
+                        self._model = None
+                    self._loaded = True
+        return self._model
+
+    def reload(self) -> Optional[ForecastModel]:
+        with self._lock:
+            self._loaded = False
+        return self.get()
+
+    def stats(self) -> Dict:
+        model = self._model
+        return {
+            "loaded": self._loaded,
+            "version": model.version if model else None,
+            "accuracy": model.accuracy if model else None
+        }
+
+
+forecast_models = ForecastModelStore(settings.FORECAST_MODEL_DIR)
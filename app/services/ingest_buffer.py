@@ -0,0 +1,198 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from app.config import settings
+from app.database import async_session
+from app.services.room_data_service import bulk_insert_room_data
+
+logger = logging.getLogger(__name__)
+
+
+class WriteBehindBuffer:
+    """
+    Bounded in-memory queue of room readings flushed to the database by a
+    background task. Readings are acknowledged as soon as they are queued;
+    a flush happens when ``flush_rows`` readings are pending or every
+    ``flush_interval`` seconds, whichever comes first.
+
+    A batch that fails ``max_attempts`` times in a row is split in half and
+    the halves retried, so a bad row is isolated in O(log n) steps; once it
+    is alone and still failing it is moved to ``dead_letters`` instead of
+    blocking every later reading.
+    """
+
+    def __init__(
+        self,
+        max_rows: int = 100000,
+        flush_rows: int = 5000,
+        flush_interval: float = 0.25,
+        max_attempts: int = 3,
+        dead_letter_rows: int = 1000
+    ):
+        self.max_rows = max_rows
+        self.flush_rows = flush_rows
+        self.flush_interval = flush_interval
+        self.max_attempts = max_attempts
+        self._rows: deque = deque()
+        self.dead_letters: deque = deque(maxlen=dead_letter_rows)
+        # Failure tracking for the batch at the head of the queue
+        self._attempts = 0
+        self._suspect_rows = 0  # head rows that belong to a failed batch still being split
+        self._batch_limit = flush_rows
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+
+        # Monitoring counters
+        self.queued_total = 0
+        self.rejected_total = 0
+        self.flushed_total = 0
+        self.flush_count = 0
+        self.flush_errors = 0
+        self.dead_lettered_total = 0
+        self.last_flush_ms = 0.0
+        self.max_flush_ms = 0.0
+
+    @property
+    def depth(self) -> int:
+        return len(self._rows)
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def submit(self, rows: List[Dict]) -> bool:
+        """Queue readings for the next flush; returns False if the queue is full"""
+        if self._stopping or len(self._rows) + len(rows) > self.max_rows:
+            self.rejected_total += len(rows)
+            return False
+
+        # Stamp readings on arrival, not when they reach the database
+        now = datetime.utcnow()
+        for row in rows:
+            if row.get("timestamp") is None:
+                row["timestamp"] = now
+        self._rows.extend(rows)
+        self.queued_total += len(rows)
+
+        if len(self._rows) >= self.flush_rows:
+            self._wakeup.set()
+        return True
+
+    async def start(self) -> None:
+        if not self.running:
+            self._stopping = False
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop accepting readings and drain everything still queued"""
+        self._stopping = True
+        if self._task is not None:
+            self._wakeup.set()
+            await self._task
+            self._task = None
+
+    async def _run(self) -> None:
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            # Keep going while full batches are waiting instead of one batch per interval
+            flushed = await self.flush()
+            while flushed and len(self._rows) >= self.flush_rows:
+                flushed = await self.flush()
+        # Drain on shutdown, giving a bad row enough attempts to be split out and
+        # dead-lettered; if flushes keep failing (database down) dead-letter the rest
+        failures = 0
+        while self._rows:
+            if await self.flush():
+                failures = 0
+                continue
+            failures += 1
+            if failures >= self.max_attempts * (self.flush_rows.bit_length() + 1):
+                logger.error("Dead-lettering %d queued room readings after failed shutdown flushes", len(self._rows))
+                self.dead_lettered_total += len(self._rows)
+                self.dead_letters.extend(self._rows)
+                self._rows.clear()
+
+    async def flush(self) -> bool:
+        """Write up to ``flush_rows`` queued readings in a single batch"""
+        if not self._rows:
+            return True
+
+        limit = self._batch_limit if self._suspect_rows else self.flush_rows
+        batch = [self._rows.popleft() for _ in range(min(limit, len(self._rows)))]
+        started = time.perf_counter()
+        try:
+            async with async_session() as db:
+                await bulk_insert_room_data(db, batch)
+        except Exception:
+            logger.exception("Failed to flush %d room readings", len(batch))
+            self.flush_errors += 1
+            # Put the batch back at the front so ordering is preserved
+            self._rows.extendleft(reversed(batch))
+            self._record_failure(len(batch))
+            return False
+
+        self._attempts = 0
+        if self._suspect_rows:
+            self._suspect_rows = max(0, self._suspect_rows - len(batch))
+            # Grow back towards full batches once a half has gone through
+            self._batch_limit = min(self.flush_rows, self._batch_limit * 2)
+
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        self.flush_count += 1
+        self.flushed_total += len(batch)
+        self.last_flush_ms = round(elapsed_ms, 2)
+        self.max_flush_ms = max(self.max_flush_ms, self.last_flush_ms)
+        return True
+
+    def _record_failure(self, size: int) -> None:
+        """Split the head batch, or dead-letter it once it is a single row, after repeated failures"""
+        if not self._suspect_rows:
+            self._suspect_rows = size
+            self._batch_limit = size
+        self._attempts += 1
+        if self._attempts < self.max_attempts:
+            return
+        self._attempts = 0
+        if size > 1:
+            self._batch_limit = max(1, size // 2)
+            return
+        row = self._rows.popleft()
+        self.dead_letters.append(row)
+        self.dead_lettered_total += 1
+        # The failure is explained; the rest of the batch goes back to full-size flushes
+        self._suspect_rows = 0
+        self._batch_limit = self.flush_rows
+        logger.error("Dead-lettered room reading after %d failed flushes: %r", self.max_attempts, row)
+
+    def stats(self) -> Dict:
+        return {
+            "enabled": settings.ROOM_DATA_WRITE_BEHIND,
+            "running": self.running,
+            "queue_depth": self.depth,
+            "queue_capacity": self.max_rows,
+            "queued_total": self.queued_total,
+            "rejected_total": self.rejected_total,
+            "flushed_total": self.flushed_total,
+            "flush_count": self.flush_count,
+            "flush_errors": self.flush_errors,
+            "dead_lettered_total": self.dead_lettered_total,
+            "last_flush_ms": self.last_flush_ms,
+            "max_flush_ms": self.max_flush_ms
+        }
+
+
+room_data_buffer = WriteBehindBuffer(
+    max_rows=settings.ROOM_DATA_QUEUE_MAX_ROWS,
+    flush_rows=settings.ROOM_DATA_FLUSH_ROWS,
+    flush_interval=settings.ROOM_DATA_FLUSH_INTERVAL_MS / 1000,
+    max_attempts=settings.ROOM_DATA_FLUSH_MAX_ATTEMPTS
+)
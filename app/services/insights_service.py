@@ -2,6 +2,8 @@ import random
 from typing import Dict, List
 from datetime import datetime
 
+from app.services.timeseries import MetricsBuffer
+
 class AIInsightsService:
     def __init__(self):
         self.insight_templates = {
@@ -37,7 +39,7 @@ class AIInsightsService:
             }
         }
     
-    def generate_insights(self, current_metrics: Dict, historical_data: List[Dict]) -> List[Dict]:
+    def generate_insights(self, current_metrics: Dict, history: MetricsBuffer) -> List[Dict]:
         """Generate AI-powered insights based on current and historical data"""
         insights = []
         
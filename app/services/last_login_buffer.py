@@ -0,0 +1,138 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+from sqlalchemy import DateTime, Integer, bindparam, column, or_, update, values
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.database import async_session
+from app.models.user import User
+
+logger = logging.getLogger(__name__)
+
+
+async def bulk_update_last_login(db: AsyncSession, logins: Dict[int, datetime]) -> None:
+    """Write many users' last_login in one statement (caller commits)"""
+    if not logins:
+        return
+    if db.get_bind().dialect.name == "postgresql":
+        # UPDATE users SET last_login = v.last_login FROM (VALUES ...) AS v(id, last_login)
+        incoming = values(
+            column("id", Integer), column("last_login", DateTime), name="v"
+        ).data(list(logins.items()))
+        await db.execute(
+            update(User)
+            .where(User.id == incoming.c.id)
+            .where(or_(User.last_login.is_(None), User.last_login < incoming.c.last_login))
+            .values(last_login=incoming.c.last_login)
+        )
+    else:
+        # Core executemany of UPDATE ... WHERE id = :user_id. Unlike the ORM bulk
+        # update by primary key, a deleted user matches no row instead of
+        # raising StaleDataError and failing the whole batch.
+        users = User.__table__
+        await db.execute(
+            update(users)
+            .where(users.c.id == bindparam("user_id"))
+            .where(or_(users.c.last_login.is_(None), users.c.last_login < bindparam("when")))
+            .values(last_login=bindparam("when")),
+            [{"user_id": user_id, "when": when} for user_id, when in logins.items()]
+        )
+
+
+class LastLoginBuffer:
+    """
+    Coalesces last_login writes so a login is not a write transaction.
+    Only the newest timestamp per user is kept and written by a background
+    task every ``flush_interval`` seconds. With ``min_interval`` set, logins
+    within that long of the stored value are not recorded at all.
+    """
+
+    def __init__(self, flush_interval: float = 5.0, min_interval: float = 0.0):
+        self.flush_interval = flush_interval
+        self.min_interval = timedelta(seconds=min_interval)
+        self._pending: Dict[int, datetime] = {}
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+
+        # Monitoring counters
+        self.recorded_total = 0
+        self.skipped_total = 0
+        self.flushed_total = 0
+        self.flush_errors = 0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def record(self, user: User, when: Optional[datetime] = None) -> bool:
+        """Queue ``user``'s login time; returns False if skipped by min_interval"""
+        when = when or datetime.utcnow()
+        if user.last_login is not None and when - user.last_login < self.min_interval:
+            self.skipped_total += 1
+            return False
+        self._pending[user.id] = max(when, self._pending.get(user.id, when))
+        self.recorded_total += 1
+        return True
+
+    async def start(self) -> None:
+        if not self.running:
+            self._stopping = False
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the flush loop and write whatever is still pending"""
+        self._stopping = True
+        if self._task is not None:
+            self._wakeup.set()
+            await self._task
+            self._task = None
+        else:
+            await self.flush()
+
+    async def _run(self) -> None:
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+        await self.flush()
+
+    async def flush(self) -> bool:
+        if not self._pending:
+            return True
+        batch, self._pending = self._pending, {}
+        try:
+            async with async_session() as db:
+                await bulk_update_last_login(db, batch)
+                await db.commit()
+        except Exception:
+            logger.exception("Failed to write last_login for %d users", len(batch))
+            self.flush_errors += 1
+            # Merge back, keeping anything newer recorded meanwhile
+            for user_id, when in batch.items():
+                self._pending[user_id] = max(when, self._pending.get(user_id, when))
+            return False
+        self.flushed_total += len(batch)
+        return True
+
+    def stats(self) -> Dict:
+        return {
+            "running": self.running,
+            "pending": len(self._pending),
+            "recorded_total": self.recorded_total,
+            "skipped_total": self.skipped_total,
+            "flushed_total": self.flushed_total,
+            "flush_errors": self.flush_errors
+        }
+
+
+last_login_buffer = LastLoginBuffer(
+    flush_interval=settings.LAST_LOGIN_FLUSH_INTERVAL_SECONDS,
+    min_interval=settings.LAST_LOGIN_MIN_INTERVAL_SECONDS
+)
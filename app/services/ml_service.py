@@ -1,23 +1,106 @@
-import random
 import numpy as np
 from datetime import datetime, timedelta
-from typing import Dict, List
+from typing import Dict, List, Optional
+
+from app.services.anomaly_baselines import ANOMALY_FIELDS, RollingBaselines
+from app.services.forecast_cache import ForecastCache
+from app.services.forecast_model import ForecastModel, ForecastModelStore
+from app.services.timeseries import MetricsBuffer
+
+# Display label and unit per watched metric
+ANOMALY_LABELS = {
+    "energy_usage": ("Energy usage", "kWh"),
+    "occupancy": ("Occupancy", "%"),
+    "humidity": ("Humidity", "%"),
+}
+
+# Confidence of the hand-written fallback rules used until a model is trained
+HEURISTIC_ACCURACY = 0.85
 
 class MLService:
-    def __init__(self):
-        self.prediction_model_accuracy = 0.85
-        
-    def predict_energy_usage(self, historical_data: List[Dict], hours_ahead: int = 6) -> List[Dict]:
-        """Predict energy usage for the next few hours"""
-        if not historical_data:
+    def __init__(
+        self,
+        anomaly_fields=ANOMALY_FIELDS,
+        anomaly_window: int = 24,
+        baseline_window: int = 168,
+        forecast_models: Optional[ForecastModelStore] = None,
+        forecast_cache: Optional[ForecastCache] = None
+    ):
+        # Updated from the history buffer as readings arrive; queries only read it
+        self.baselines = RollingBaselines(anomaly_fields, window=anomaly_window, baseline_window=baseline_window)
+        self.forecast_models = forecast_models
+        self.forecast_cache = forecast_cache
+
+    @property
+    def prediction_model_accuracy(self) -> Optional[float]:
+        """Holdout backtest accuracy of the trained model; None while no model is available"""
+        model = self.forecast_models.get() if self.forecast_models else None
+        return model.accuracy if model else None
+
+    @property
+    def prediction_model_version(self) -> Optional[str]:
+        model = self.forecast_models.get() if self.forecast_models else None
+        return model.version if model else None
+
+    def predict_energy_usage(self, history: MetricsBuffer, hours_ahead: int = 6) -> List[Dict]:
+        """
+        Predict energy usage for the next few hours.
+        The result depends only on the history, the horizon and the model, so it is
+        memoized on (history version, last reading timestamp, horizon, model version).
+        Timestamps have whole-second resolution, so the append counter is what tells
+        two readings in the same second apart.
+        """
+        if not len(history):
+            return []
+        model = self.forecast_models.get() if self.forecast_models else None
+        if self.forecast_cache is None:
+            return self._predict(history, model, hours_ahead)
+        key = (history.count, int(history.timestamps(1)[0]), hours_ahead, model.version if model else None)
+        return self.forecast_cache.get_or_compute(key, lambda: self._predict(history, model, hours_ahead))
+
+    def _predict(self, history: MetricsBuffer, model: Optional[ForecastModel], hours_ahead: int) -> List[Dict]:
+        if model is not None:
+            forecast = model.forecast(history)
+            if forecast is not None:
+                return self._model_predictions(model, *forecast, hours_ahead)
+        return self._heuristic_predictions(history, hours_ahead)
+
+    def _model_predictions(self, model: ForecastModel, origin: int, forecast, hours_ahead: int) -> List[Dict]:
+        """Shape a (targets x horizons) forecast made at ``origin`` (epoch hours) into the API payload"""
+        usage = forecast[model.targets.index("energy_usage")]
+        occupancy = forecast[model.targets.index("occupancy")]
+        accuracy = model.horizon_accuracy["energy_usage"]
+        predictions = []
+        for h in range(min(hours_ahead, model.horizons)):
+            future_time = datetime.utcfromtimestamp((origin + h + 1) * 3600)
+            predicted_occupancy = float(occupancy[h])
+            predictions.append({
+                "timestamp": future_time.isoformat(),
+                "predicted_usage": round(float(usage[h]), 1),
+                "predicted_occupancy": round(predicted_occupancy, 1),
+                "confidence": round(accuracy[h], 2),
+                "factors": {
+                    "time_of_day": future_time.hour,
+                    "occupancy_impact": round((predicted_occupancy - 75) * 0.02, 3),
+                    "seasonal_factor": 1.0
+                },
+                "model_version": model.version
+            })
+        return predictions
+
+    def _heuristic_predictions(self, history: MetricsBuffer, hours_ahead: int) -> List[Dict]:
+        latest = history.latest()
+        if latest is None:
             return []
         
         predictions = []
-        last_usage = historical_data[-1]["energy_usage"]
-        last_occupancy = historical_data[-1]["occupancy"]
+        last_usage = latest["energy_usage"]
+        last_occupancy = latest["occupancy"]
+        # Project from the latest reading rather than the wall clock so equal inputs give equal output
+        origin = datetime.fromisoformat(latest["timestamp"])
         
         for hour in range(1, hours_ahead + 1):
-            future_time = datetime.utcnow() + timedelta(hours=hour)
+            future_time = origin + timedelta(hours=hour)
             future_hour = future_time.hour
             
             # Predict occupancy patterns
@@ -43,16 +126,14 @@ class MLService:
                 base_prediction *= 1.15
             elif 1 <= future_hour <= 6:   # Off-peak
                 base_prediction *= 0.85
-                
-            # Add some realistic variance
-            variance = random.uniform(-0.08, 0.08)
-            predicted_usage = base_prediction * (1 + variance)
+
+            predicted_usage = base_prediction
             
             predictions.append({
                 "timestamp": future_time.isoformat(),
                 "predicted_usage": round(predicted_usage, 1),
                 "predicted_occupancy": round(predicted_occupancy, 1),
-                "confidence": round(self.prediction_model_accuracy - (hour * 0.05), 2),
+                "confidence": round(HEURISTIC_ACCURACY - (hour * 0.05), 2),
                 "factors": {
                     "time_of_day": future_hour,
                     "occupancy_impact": round((predicted_occupancy - 75) * 0.02, 3),
@@ -65,49 +146,51 @@ class MLService:
         
         return predictions
     
-    def detect_anomalies(self, current_metrics: Dict, historical_data: List[Dict]) -> List[Dict]:
-        """Detect anomalies in energy usage patterns"""
-        if len(historical_data) < 10:
+    def detect_anomalies(self, current_metrics: Dict, history: MetricsBuffer) -> List[Dict]:
+        """Detect anomalies in usage, occupancy and humidity patterns"""
+        self.baselines.sync(history)
+        if len(history) < 10:
             return []
-        
+
         anomalies = []
-        recent_data = historical_data[-24:]  # Last 24 hours
-        
-        # Calculate statistical baselines
-        usage_values = [d["energy_usage"] for d in recent_data]
-        mean_usage = np.mean(usage_values)
-        std_usage = np.std(usage_values)
-        
-        # Z-score anomaly detection
-        current_usage = current_metrics["energy_usage"]
-        z_score = abs(current_usage - mean_usage) / std_usage if std_usage > 0 else 0
-        
-        if z_score > 2.5:  # Significant deviation
-            anomalies.append({
-                "type": "statistical_anomaly",
-                "severity": "high" if z_score > 3 else "medium",
-                "description": f"Energy usage {current_usage:.0f} kWh is {z_score:.1f} standard deviations from normal",
-                "expected_range": f"{mean_usage - 2*std_usage:.0f} - {mean_usage + 2*std_usage:.0f} kWh",
-                "z_score": round(z_score, 2),
-                "recommendation": "Investigate equipment status and occupancy patterns"
-            })
-        
-        # Pattern-based anomaly detection
-        same_hour_data = [d for d in recent_data if 
-                         datetime.fromisoformat(d["timestamp"].replace('Z', '+00:00')).hour == datetime.now().hour]
-        
-        if len(same_hour_data) >= 3:
-            same_hour_mean = np.mean([d["energy_usage"] for d in same_hour_data])
-            if abs(current_usage - same_hour_mean) > same_hour_mean * 0.3:
+        current_hour = datetime.utcnow().hour
+        for field in self.baselines.fields:
+            label, unit = ANOMALY_LABELS.get(field, (field, ""))
+            current_value = current_metrics[field]
+
+            # Z-score against the rolling window
+            _, mean_value, std_value = self.baselines.rolling(field)
+            z_score = abs(current_value - mean_value) / std_value if std_value > 0 else 0
+
+            if z_score > 2.5:  # Significant deviation
+                anomalies.append({
+                    "type": "statistical_anomaly",
+                    "metric": field,
+                    "severity": "high" if z_score > 3 else "medium",
+                    "description": f"{label} {current_value:.0f} {unit} is {z_score:.1f} standard deviations from normal",
+                    "expected_range": f"{mean_value - 2*std_value:.0f} - {mean_value + 2*std_value:.0f} {unit}",
+                    "z_score": round(z_score, 2),
+                    "recommendation": "Investigate equipment status and occupancy patterns"
+                })
+
+            # Pattern-based check against the baseline for this hour of day
+            same_hour_count, same_hour_mean, _ = self.baselines.hourly(field, current_hour)
+            # A relative deviation is undefined against a zero baseline (e.g. an empty hotel at night)
+            if (
+                same_hour_count >= 3
+                and same_hour_mean != 0
+                and abs(current_value - same_hour_mean) > abs(same_hour_mean) * 0.3
+            ):
                 anomalies.append({
                     "type": "temporal_anomaly",
+                    "metric": field,
                     "severity": "medium",
-                    "description": f"Usage unusual for this time of day (hour {datetime.now().hour})",
+                    "description": f"{label} unusual for this time of day (hour {current_hour})",
                     "historical_average": round(same_hour_mean, 1),
-                    "deviation": round(((current_usage - same_hour_mean) / same_hour_mean) * 100, 1),
+                    "deviation": round(((current_value - same_hour_mean) / same_hour_mean) * 100, 1),
                     "recommendation": "Check for schedule changes or equipment issues"
                 })
-        
+
         return anomalies
     
     def calculate_savings_potential(self, current_metrics: Dict, optimizations: List[Dict]) -> Dict:
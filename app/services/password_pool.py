@@ -0,0 +1,26 @@
+from app.config import settings
+from app.utils.bounded_executor import BoundedExecutor
+
+
+class PasswordHashPool(BoundedExecutor):
+    """
+    Size-limited thread pool for bcrypt work.
+
+    bcrypt releases the GIL while hashing, so threads keep the event loop
+    responsive without the pickling overhead of a process pool. At most
+    ``max_pending`` calls may be queued or running; beyond that callers get
+    a 503 instead of waiting behind a login burst.
+    """
+
+    saturated_detail = "Password hashing is saturated, retry shortly"
+
+    def __init__(self, workers: int = 2, max_pending: int = 32):
+        super().__init__("bcrypt", workers=workers, max_pending=max_pending)
+
+
+password_pool = PasswordHashPool(
+    workers=settings.PASSWORD_HASH_WORKERS,
+    max_pending=settings.PASSWORD_HASH_MAX_PENDING
+)
+# Separate pool for bulk imports so they cannot starve logins; one import at a time
+bulk_password_pool = PasswordHashPool(workers=settings.PASSWORD_HASH_BULK_WORKERS, max_pending=1)
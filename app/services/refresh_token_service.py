@@ -0,0 +1,108 @@
+import asyncio
+import hashlib
+import logging
+import secrets
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import delete, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.database import async_session
+from app.models.user import RefreshToken, User, create_refresh_token
+
+logger = logging.getLogger(__name__)
+
+
+def hash_token(token: str) -> str:
+    """Refresh tokens are stored and looked up by SHA-256 digest only"""
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+async def issue_refresh_token(db: AsyncSession, user: User) -> str:
+    """Mint a refresh token for ``user`` and persist its digest (caller commits)"""
+    expires_delta = timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
+    token = create_refresh_token(
+        data={"sub": user.username, "uid": user.id, "jti": secrets.token_urlsafe(16)},
+        expires_delta=expires_delta
+    )
+    db.add(RefreshToken(
+        user_id=user.id,
+        token=hash_token(token),
+        expires_at=datetime.utcnow() + expires_delta,
+        revoked=False,
+        created_at=datetime.utcnow()
+    ))
+    return token
+
+
+async def revoke_refresh_token(db: AsyncSession, digest: str) -> Optional[int]:
+    """
+    Atomically mark one live token revoked. Returns its user id, or None when
+    the token is unknown, expired or already revoked. Concurrent rotations of
+    the same token therefore succeed at most once.
+    """
+    result = await db.execute(
+        update(RefreshToken)
+        .where(
+            RefreshToken.token == digest,
+            RefreshToken.revoked.is_(False),
+            RefreshToken.expires_at > datetime.utcnow()
+        )
+        .values(revoked=True)
+        .returning(RefreshToken.user_id)
+    )
+    return result.scalar()
+
+
+async def revoke_user_refresh_tokens(db: AsyncSession, user_id: int) -> None:
+    """Revoke every live token of a user (refresh token reuse detected)"""
+    await db.execute(
+        update(RefreshToken)
+        .where(RefreshToken.user_id == user_id, RefreshToken.revoked.is_(False))
+        .values(revoked=True)
+    )
+
+
+async def purge_expired_refresh_tokens(db: AsyncSession) -> int:
+    result = await db.execute(delete(RefreshToken).where(RefreshToken.expires_at <= datetime.utcnow()))
+    await db.commit()
+    return result.rowcount
+
+
+class RefreshTokenPurger:
+    """Background task deleting expired refresh tokens"""
+
+    def __init__(self, interval: float = 3600):
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+        self.purged_total = 0
+
+    async def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def run_once(self) -> None:
+        async with async_session() as db:
+            self.purged_total += await purge_expired_refresh_tokens(db)
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.run_once()
+            except Exception:
+                logger.exception("Refresh token purge failed")
+            await asyncio.sleep(self.interval)
+
+
+refresh_token_purger = RefreshTokenPurger(interval=settings.REFRESH_TOKEN_PURGE_INTERVAL_SECONDS)
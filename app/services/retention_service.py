@@ -0,0 +1,126 @@
+import logging
+import re
+from datetime import date, datetime, timedelta
+from typing import List, Optional
+
+from sqlalchemy import delete, select, text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.room import RoomData
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PARTITION = "room_data_default"
+PARTITION_NAME = re.compile(r"^room_data_y(\d{4})m(\d{2})$")
+
+
+def month_start(day: date, offset: int = 0) -> date:
+    """First day of the month ``offset`` months after ``day``'s month"""
+    months = day.year * 12 + day.month - 1 + offset
+    return date(months // 12, months % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"room_data_y{month.year:04d}m{month.month:02d}"
+
+
+async def is_partitioned(db: AsyncSession) -> bool:
+    """True when room_data is a partitioned table (PostgreSQL after migration 005)"""
+    if db.get_bind().dialect.name != "postgresql":
+        return False
+    result = await db.execute(text(
+        "SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid "
+        "WHERE c.relname = 'room_data'"
+    ))
+    return result.scalar() is not None
+
+
+async def list_partitions(db: AsyncSession) -> List[str]:
+    result = await db.execute(text(
+        "SELECT child.relname FROM pg_inherits "
+        "JOIN pg_class parent ON parent.oid = pg_inherits.inhparent "
+        "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+        "WHERE parent.relname = 'room_data' ORDER BY child.relname"
+    ))
+    return [name for (name,) in result]
+
+
+async def _create_partition(db: AsyncSession, name: str, start: date, end: date) -> None:
+    """
+    Create the partition for [start, end). If readings for that range already
+    landed in the default partition, PARTITION OF would fail its constraint
+    check, so build the table standalone, move those rows into it and attach it.
+    """
+    bounds = f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+    in_range = f"timestamp >= '{start.isoformat()}' AND timestamp < '{end.isoformat()}'"
+    stranded = await db.execute(text(f"SELECT 1 FROM {DEFAULT_PARTITION} WHERE {in_range} LIMIT 1"))
+    if stranded.scalar() is None:
+        await db.execute(text(f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF room_data {bounds}"))
+        return
+
+    await db.execute(text(f"CREATE TABLE {name} (LIKE room_data INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"))
+    moved = await db.execute(text(
+        f"WITH moved AS (DELETE FROM {DEFAULT_PARTITION} WHERE {in_range} RETURNING *) "
+        f"INSERT INTO {name} SELECT * FROM moved"
+    ))
+    await db.execute(text(f"ALTER TABLE room_data ATTACH PARTITION {name} {bounds}"))
+    logger.info("Moved %d rows from %s into new partition %s", moved.rowcount, DEFAULT_PARTITION, name)
+
+
+async def ensure_partitions(db: AsyncSession, months_ahead: int, today: Optional[date] = None) -> List[str]:
+    """
+    Create monthly partitions from the current month up to ``months_ahead``
+    months out. A partition that cannot be created is logged and skipped so
+    the remaining months (and retention) still run.
+    """
+    today = today or datetime.utcnow().date()
+    existing = set(await list_partitions(db))
+    created = []
+    for offset in range(months_ahead + 1):
+        start = month_start(today, offset)
+        name = partition_name(start)
+        if name in existing:
+            continue
+        try:
+            async with db.begin_nested():
+                await _create_partition(db, name, start, month_start(start, 1))
+        except DBAPIError as e:
+            logger.error("Could not create partition %s: %s", name, e)
+            continue
+        created.append(name)
+    await db.commit()
+    return created
+
+
+async def drop_expired_partitions(db: AsyncSession, retention_days: int, today: Optional[date] = None) -> List[str]:
+    """Drop every monthly partition that ends before the retention cutoff"""
+    cutoff = (today or datetime.utcnow().date()) - timedelta(days=retention_days)
+    dropped = []
+    for name in await list_partitions(db):
+        match = PARTITION_NAME.match(name)
+        if not match:
+            continue  # e.g. room_data_default
+        upper = month_start(date(int(match.group(1)), int(match.group(2)), 1), 1)
+        if upper <= cutoff:
+            await db.execute(text(f"DROP TABLE {name}"))
+            dropped.append(name)
+    await db.commit()
+    return dropped
+
+
+async def purge_expired_rows(db: AsyncSession, retention_days: int, chunk_size: int) -> int:
+    """
+    Delete raw readings older than the retention cutoff in bounded chunks,
+    committing after each so no single transaction grows with table size.
+    Used where partitions are not available (SQLite).
+    """
+    cutoff = datetime.utcnow() - timedelta(days=retention_days)
+    deleted = 0
+    while True:
+        chunk = select(RoomData.id).where(RoomData.timestamp < cutoff).limit(chunk_size).scalar_subquery()
+        result = await db.execute(delete(RoomData).where(RoomData.id.in_(chunk)))
+        await db.commit()
+        deleted += result.rowcount
+        if result.rowcount < chunk_size:
+            return deleted
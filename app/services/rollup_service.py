@@ -0,0 +1,91 @@
+from datetime import datetime
+from typing import Dict, Iterable, List, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.room import RoomDataHourly, RoomDataDaily
+
+
+def truncate_hour(ts: datetime) -> datetime:
+    return ts.replace(minute=0, second=0, microsecond=0)
+
+
+def truncate_day(ts: datetime) -> datetime:
+    return ts.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+# Rollup model and bucket truncation for each rollup granularity
+ROLLUPS = (
+    (RoomDataHourly, truncate_hour),
+    (RoomDataDaily, truncate_day),
+)
+
+
+def aggregate_rollup_rows(rows: Iterable[Dict], truncate) -> List[Dict]:
+    """
+    Collapse raw readings into one partial aggregate per (room, bucket).
+    Aggregates are sorted by (room_id, bucket_start) so concurrent upserts
+    lock rollup rows in the same order and cannot deadlock each other.
+    """
+    buckets: Dict[Tuple[str, datetime], Dict] = {}
+    for row in rows:
+        key = (row["room_id"], truncate(row["timestamp"]))
+        temp, humidity = row["temp"], row["humidity"]
+        agg = buckets.get(key)
+        if agg is None:
+            buckets[key] = {
+                "room_id": key[0],
+                "bucket_start": key[1],
+                "count": 1,
+                "temp_sum": temp,
+                "temp_min": temp,
+                "temp_max": temp,
+                "humidity_sum": humidity,
+                "humidity_min": humidity,
+                "humidity_max": humidity,
+                "occupied_count": int(bool(row["occupied"])),
+            }
+            continue
+        agg["count"] += 1
+        agg["temp_sum"] += temp
+        agg["temp_min"] = min(agg["temp_min"], temp)
+        agg["temp_max"] = max(agg["temp_max"], temp)
+        agg["humidity_sum"] += humidity
+        agg["humidity_min"] = min(agg["humidity_min"], humidity)
+        agg["humidity_max"] = max(agg["humidity_max"], humidity)
+        agg["occupied_count"] += int(bool(row["occupied"]))
+    return [buckets[key] for key in sorted(buckets)]
+
+
+async def apply_rollups(db: AsyncSession, rows: List[Dict]) -> None:
+    """
+    Merge a batch of new readings into the hourly and daily rollups.
+    Runs inside the caller's transaction so raw rows and rollups commit together.
+    """
+    dialect = db.get_bind().dialect.name
+    if not rows or dialect not in ("postgresql", "sqlite"):
+        return
+
+    insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+    # PostgreSQL spells scalar min/max as LEAST/GREATEST
+    least = func.least if dialect == "postgresql" else func.min
+    greatest = func.greatest if dialect == "postgresql" else func.max
+
+    for model, truncate in ROLLUPS:
+        stmt = insert(model)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[model.room_id, model.bucket_start],
+            set_={
+                "count": model.count + stmt.excluded.count,
+                "temp_sum": model.temp_sum + stmt.excluded.temp_sum,
+                "temp_min": least(model.temp_min, stmt.excluded.temp_min),
+                "temp_max": greatest(model.temp_max, stmt.excluded.temp_max),
+                "humidity_sum": model.humidity_sum + stmt.excluded.humidity_sum,
+                "humidity_min": least(model.humidity_min, stmt.excluded.humidity_min),
+                "humidity_max": greatest(model.humidity_max, stmt.excluded.humidity_max),
+                "occupied_count": model.occupied_count + stmt.excluded.occupied_count,
+            }
+        )
+        await db.execute(stmt, aggregate_rollup_rows(rows, truncate))
@@ -0,0 +1,189 @@
+import warnings
+import numpy as np
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, List, Sequence, Tuple
+
+from sqlalchemy import BigInteger, cast, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.room import RoomDataHourly
+from app.services.rollup_service import truncate_hour
+from app.services.timeseries import to_epoch
+
+# Hourly metrics scored per room, and the scoring methods applied to each
+ROOM_ANOMALY_METRICS = ("temp", "humidity", "occupancy")
+ROOM_ANOMALY_METHODS = ("zscore", "mad", "seasonal")
+MAX_ANOMALY_HOURS = 24 * 14
+# Rooms with fewer hourly buckets of history than this are not scored
+MIN_HISTORY_BUCKETS = 12
+# Scales MAD to the standard deviation of a normal distribution
+MAD_SCALE = 0.6745
+# Smallest spread a metric is scored against, so a jump away from a perfectly
+# flat history scores high instead of dividing by zero (occupancy is a 0-1 fraction)
+SPREAD_FLOOR = {"temp": 0.1, "humidity": 0.5, "occupancy": 0.05}
+
+
+@dataclass
+class RoomMatrix:
+    """Hourly rollups for many rooms as one (rooms x hours) array per metric"""
+    room_ids: np.ndarray
+    start: datetime
+    hours: int
+    values: Dict[str, np.ndarray]
+
+    @property
+    def hour_of_day(self) -> np.ndarray:
+        return (self.start.hour + np.arange(self.hours)) % 24
+
+
+def build_room_matrix(rows: Sequence[tuple], start: datetime, hours: int) -> RoomMatrix:
+    """
+    Scatter (room_id, bucket_start epoch seconds, count, temp_sum, humidity_sum,
+    occupied_count) rows into dense matrices; hours without a rollup row are NaN.
+    """
+    if not rows:
+        empty = np.empty((0, hours))
+        return RoomMatrix(np.array([], dtype=str), start, hours, {m: empty for m in ROOM_ANOMALY_METRICS})
+
+    # One column at a time: transposing with zip(*rows) allocates a tuple per row
+    def column(i: int, dtype=np.float64) -> np.ndarray:
+        return np.fromiter((row[i] for row in rows), dtype, len(rows))
+
+    room_ids, room_index = np.unique(np.array([row[0] for row in rows], dtype=str), return_inverse=True)
+    # Integer epochs keep the bucket offsets vectorized; datetime64 over Python datetimes is not
+    hour_index = (column(1, np.int64) - to_epoch(start)) // 3600
+    count = column(2)
+
+    values = {}
+    for metric, i in (("temp", 3), ("humidity", 4), ("occupancy", 5)):
+        matrix = np.full((len(room_ids), hours), np.nan)
+        matrix[room_index, hour_index] = column(i) / count
+        values[metric] = matrix
+    return RoomMatrix(room_ids, start, hours, values)
+
+
+async def load_room_rollups(db: AsyncSession, end: datetime, hours: int) -> Tuple[List[tuple], datetime]:
+    """
+    Load the hourly rollups of every room for the ``hours`` buckets ending with
+    ``end``'s hour, as build_room_matrix rows. Returns the rows and the window start.
+    """
+    end_bucket = truncate_hour(end) + timedelta(hours=1)
+    start = end_bucket - timedelta(hours=hours)
+    query = select(
+        RoomDataHourly.room_id,
+        cast(func.extract("epoch", RoomDataHourly.bucket_start), BigInteger),
+        RoomDataHourly.count,
+        RoomDataHourly.temp_sum,
+        RoomDataHourly.humidity_sum,
+        RoomDataHourly.occupied_count
+    ).where(RoomDataHourly.bucket_start >= start, RoomDataHourly.bucket_start < end_bucket)
+    result = await db.execute(query)
+    return result.all(), start
+
+
+def _ratio(numerator: np.ndarray, spread: np.ndarray, floor: float) -> np.ndarray:
+    """numerator / spread, with the spread raised to at least ``floor``"""
+    return numerator / np.fmax(spread, floor)
+
+
+def score_rooms(matrix: RoomMatrix) -> Dict[str, np.ndarray]:
+    """
+    Score every room's most recent hourly bucket against its own history in
+    one vectorized pass per metric:
+      * zscore   - deviation from the window mean in standard deviations
+      * mad      - robust z-score from the median and median absolute deviation
+      * seasonal - deviation from the room's mean for the same hour of day,
+                   scaled by the spread of its seasonal residuals
+    Returns arrays indexed [metric, method, room] plus the overall score.
+    """
+    rooms = len(matrix.room_ids)
+    shape = (len(ROOM_ANOMALY_METRICS), len(ROOM_ANOMALY_METHODS), rooms)
+    scores, expected = np.zeros(shape), np.full(shape, np.nan)
+    current_values = np.full((len(ROOM_ANOMALY_METRICS), rooms), np.nan)
+    if rooms == 0:
+        return {"score": np.zeros(0), "scores": scores, "expected": expected, "values": current_values,
+                "scored": np.zeros(0, dtype=bool)}
+
+    rows = np.arange(rooms)
+    hour_of_day = matrix.hour_of_day
+    # Each room is judged on its latest reported hour; everything before it is history
+    observed = ~np.isnan(matrix.values["temp"])
+    current = matrix.hours - 1 - np.argmax(observed[:, ::-1], axis=1)
+    scored = np.count_nonzero(observed, axis=1) - 1 >= MIN_HISTORY_BUCKETS
+
+    with warnings.catch_warnings():
+        # All-NaN rows and hours are expected; they produce NaN and are masked below
+        warnings.simplefilter("ignore", RuntimeWarning)
+        for m, metric in enumerate(ROOM_ANOMALY_METRICS):
+            values = matrix.values[metric]
+            x = values[rows, current]
+            history = values.copy()
+            history[rows, current] = np.nan
+
+            mean, std = np.nanmean(history, axis=1), np.nanstd(history, axis=1)
+            median = np.nanmedian(history, axis=1)
+            mad = np.nanmedian(np.abs(history - median[:, None]), axis=1)
+
+            profile = np.full((rooms, 24), np.nan)
+            for hour in np.unique(hour_of_day):
+                profile[:, hour] = np.nanmean(history[:, hour_of_day == hour], axis=1)
+            residual_std = np.nanstd(history - profile[:, hour_of_day], axis=1)
+            seasonal = profile[rows, hour_of_day[current]]
+
+            floor = SPREAD_FLOOR[metric]
+            scores[m, 0] = _ratio(x - mean, std, floor)
+            scores[m, 1] = _ratio(MAD_SCALE * (x - median), mad, floor)
+            scores[m, 2] = _ratio(x - seasonal, residual_std, floor)
+            expected[m] = mean, median, seasonal
+            current_values[m] = x
+
+    scores = np.nan_to_num(scores, nan=0.0)
+    scores[:, :, ~scored] = 0.0
+    return {
+        "score": np.abs(scores).max(axis=(0, 1)),
+        "scores": scores,
+        "expected": expected,
+        "values": current_values,
+        "scored": scored
+    }
+
+
+def rank_room_anomalies(matrix: RoomMatrix, top_k: int = 20, min_score: float = 3.0) -> Dict:
+    """Score all rooms and describe the ``top_k`` highest scores above ``min_score``"""
+    result = score_rooms(matrix)
+    score = result["score"]
+    candidates = np.flatnonzero(score >= min_score)
+    if candidates.size > top_k:
+        candidates = candidates[np.argpartition(-score[candidates], top_k - 1)[:top_k]]
+    candidates = candidates[np.argsort(-score[candidates], kind="stable")]
+
+    anomalies: List[Dict] = []
+    methods = len(ROOM_ANOMALY_METHODS)
+    for room in candidates.tolist():
+        room_scores = result["scores"][:, :, room]
+        best = int(np.argmax(np.abs(room_scores)))
+        m, k = divmod(best, methods)
+        expected = result["expected"][m, k, room]
+        anomalies.append({
+            "room_id": str(matrix.room_ids[room]),
+            "score": round(float(score[room]), 2),
+            "metric": ROOM_ANOMALY_METRICS[m],
+            "method": ROOM_ANOMALY_METHODS[k],
+            "value": round(float(result["values"][m, room]), 2),
+            "expected": None if np.isnan(expected) else round(float(expected), 2),
+            "scores": {method: round(float(room_scores[m, j]), 2) for j, method in enumerate(ROOM_ANOMALY_METHODS)}
+        })
+
+    return {
+        "window_start": matrix.start,
+        "window_end": matrix.start + timedelta(hours=matrix.hours),
+        "rooms_scored": int(np.count_nonzero(result["scored"])),
+        "anomalies": anomalies
+    }
+
+
+def rank_room_rollups(rows: Sequence[tuple], start: datetime, hours: int, top_k: int = 20,
+                      min_score: float = 3.0) -> Dict:
+    """Build the room matrix from load_room_rollups rows and rank it (CPU-bound; run off the event loop)"""
+    return rank_room_anomalies(build_room_matrix(rows, start, hours), top_k, min_score)
@@ -0,0 +1,57 @@
+import time
+from typing import Dict, Iterable, Optional, Tuple
+
+from app.config import settings
+
+
+class LatestReadingCache:
+    """
+    Per-worker "last value per room" table updated by the ingestion path.
+
+    Entries expire after ``ttl`` seconds so readings ingested by other
+    workers become visible through the indexed query fallback.
+    """
+
+    def __init__(self, ttl: float = 5.0):
+        self.ttl = ttl
+        self._entries: Dict[str, Tuple[float, Dict]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, room_id: str) -> Optional[Dict]:
+        entry = self._entries.get(room_id)
+        if entry is None or time.monotonic() - entry[0] > self.ttl:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry[1]
+
+    def put(self, reading: Dict) -> None:
+        """Store a reading unless a newer one is already cached for its room"""
+        room_id = reading["room_id"]
+        entry = self._entries.get(room_id)
+        if entry is not None and entry[1]["timestamp"] > reading["timestamp"]:
+            return
+        self._entries[room_id] = (time.monotonic(), reading)
+
+    def update(self, readings: Iterable[Dict]) -> None:
+        # Reduce the batch to its newest reading per room before touching the table
+        newest: Dict[str, Dict] = {}
+        for reading in readings:
+            current = newest.get(reading["room_id"])
+            if current is None or reading["timestamp"] >= current["timestamp"]:
+                newest[reading["room_id"]] = reading
+        for reading in newest.values():
+            self.put(reading)
+
+    def invalidate(self, room_id: Optional[str] = None) -> None:
+        if room_id is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(room_id, None)
+
+    def stats(self) -> Dict:
+        return {"rooms": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+latest_readings = LatestReadingCache(ttl=settings.ROOM_LATEST_CACHE_TTL_SECONDS)
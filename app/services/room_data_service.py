@@ -0,0 +1,83 @@
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from sqlalchemy import func, insert, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+from sqlalchemy.sql import Select
+
+from app.models.room import RoomData
+from app.services.room_cache import latest_readings
+from app.services.rollup_service import apply_rollups
+
+# Column order used for COPY on PostgreSQL
+ROOM_DATA_COLUMNS = ("id", "room_id", "temp", "humidity", "occupied", "timestamp")
+
+
+async def bulk_insert_room_data(db: AsyncSession, rows: List[Dict]) -> int:
+    """
+    Insert many room readings with a single statement and one commit.
+    Uses asyncpg COPY on PostgreSQL and an executemany INSERT elsewhere.
+    Hourly/daily rollups are updated in the same transaction.
+    Generated ids are written back into ``rows``.
+    """
+    if not rows:
+        return 0
+
+    now = datetime.utcnow()
+    for row in rows:
+        if row.get("timestamp") is None:
+            row["timestamp"] = now
+
+    if db.get_bind().dialect.name == "postgresql":
+        # Reserve ids up front so COPY (which returns nothing) can include them
+        result = await db.execute(
+            text("SELECT nextval('room_data_id_seq') FROM generate_series(1, :n)"),
+            {"n": len(rows)}
+        )
+        for row, (row_id,) in zip(rows, result):
+            row["id"] = row_id
+
+        conn = await db.connection()
+        raw = await conn.get_raw_connection()
+        records = [tuple(row[column] for column in ROOM_DATA_COLUMNS) for row in rows]
+        await raw.driver_connection.copy_records_to_table(
+            RoomData.__tablename__, records=records, columns=list(ROOM_DATA_COLUMNS)
+        )
+    else:
+        result = await db.execute(
+            insert(RoomData).returning(RoomData.id, sort_by_parameter_order=True), rows
+        )
+        for row, row_id in zip(rows, result.scalars()):
+            row["id"] = row_id
+
+    await apply_rollups(db, rows)
+    await db.commit()
+    latest_readings.update(rows)
+    return len(rows)
+
+
+def latest_per_room_query(dialect: str, room_ids: Optional[List[str]] = None) -> Select:
+    """
+    Build one query returning the newest RoomData row of every (or each given) room.
+    PostgreSQL uses DISTINCT ON; other databases rank rows with ROW_NUMBER().
+    """
+    if dialect == "postgresql":
+        query = (
+            select(RoomData)
+            .distinct(RoomData.room_id)
+            .order_by(RoomData.room_id, RoomData.timestamp.desc())
+        )
+        if room_ids:
+            query = query.filter(RoomData.room_id.in_(room_ids))
+        return query
+
+    rank = func.row_number().over(
+        partition_by=RoomData.room_id, order_by=RoomData.timestamp.desc()
+    ).label("row_rank")
+    ranked = select(RoomData, rank)
+    if room_ids:
+        ranked = ranked.filter(RoomData.room_id.in_(room_ids))
+    ranked = ranked.subquery()
+    latest = aliased(RoomData, ranked)
+    return select(latest).filter(ranked.c.row_rank == 1).order_by(latest.room_id)
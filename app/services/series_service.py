@@ -0,0 +1,158 @@
+import numpy as np
+from datetime import datetime, timezone
+from typing import Dict, List, Sequence, Tuple
+
+from sqlalchemy import Integer, case, cast, func, literal_column, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.room import RoomData
+from app.services.rollup_service import ROLLUPS
+
+# Supported bucket widths in seconds
+BUCKETS = {"1m": 60, "15m": 900, "1h": 3600, "1d": 86400}
+AGGREGATES = ("avg", "min", "max", "count")
+SERIES_METRICS = ("temp", "humidity")
+MAX_SERIES_BUCKETS = 100000
+# Buckets answered from rollup tables (model, truncation) instead of raw rows
+ROLLUP_BUCKETS = {"1h": ROLLUPS[0], "1d": ROLLUPS[1]}
+
+
+def bucket_expression(dialect: str, seconds: int):
+    """SQL expression truncating RoomData.timestamp to the start of its bucket"""
+    if dialect == "postgresql":
+        return func.date_bin(
+            literal_column(f"INTERVAL '{int(seconds)} seconds'"),
+            RoomData.timestamp,
+            literal_column("TIMESTAMP '2000-01-01'")
+        )
+    # SQLite: bucket on epoch seconds
+    epoch = cast(func.strftime("%s", RoomData.timestamp), Integer)
+    return (epoch // int(seconds)) * int(seconds)
+
+
+def _bucket_start(value) -> datetime:
+    if isinstance(value, datetime):
+        return value
+    return datetime.fromtimestamp(int(value), timezone.utc).replace(tzinfo=None)
+
+
+async def query_room_series(
+    db: AsyncSession,
+    room_id: str,
+    start: datetime,
+    end: datetime,
+    bucket_seconds: int,
+    aggregates: Sequence[str]
+) -> List[Dict]:
+    """Aggregate a room's readings into time buckets inside the database"""
+    bucket = bucket_expression(db.get_bind().dialect.name, bucket_seconds).label("bucket")
+    columns = [bucket]
+    for metric in SERIES_METRICS:
+        column = getattr(RoomData, metric)
+        for agg in aggregates:
+            if agg != "count":
+                columns.append(getattr(func, agg)(column).label(f"{metric}_{agg}"))
+    if "avg" in aggregates:
+        columns.append(func.avg(case((RoomData.occupied, 1.0), else_=0.0)).label("occupied_ratio"))
+    if "count" in aggregates:
+        columns.append(func.count().label("count"))
+
+    query = (
+        select(*columns)
+        .where(RoomData.room_id == room_id, RoomData.timestamp >= start, RoomData.timestamp < end)
+        .group_by(bucket)
+        .order_by(bucket)
+    )
+    result = await db.execute(query)
+
+    points = []
+    for row in result.mappings():
+        point = dict(row)
+        point["timestamp"] = _bucket_start(point.pop("bucket"))
+        points.append(point)
+    return points
+
+
+async def query_rollup_series(
+    db: AsyncSession,
+    room_id: str,
+    start: datetime,
+    end: datetime,
+    rollup: Tuple,
+    aggregates: Sequence[str]
+) -> List[Dict]:
+    """Read pre-aggregated buckets from a rollup table (never scans raw rows)"""
+    model, truncate = rollup
+    query = (
+        select(model)
+        .where(model.room_id == room_id, model.bucket_start >= truncate(start), model.bucket_start < end)
+        .order_by(model.bucket_start)
+    )
+    result = await db.execute(query)
+
+    points = []
+    for row in result.scalars():
+        point = {}
+        for metric in SERIES_METRICS:
+            if "avg" in aggregates:
+                total = getattr(row, f"{metric}_sum")
+                point[f"{metric}_avg"] = total / row.count if total is not None and row.count else None
+            if "min" in aggregates:
+                point[f"{metric}_min"] = getattr(row, f"{metric}_min")
+            if "max" in aggregates:
+                point[f"{metric}_max"] = getattr(row, f"{metric}_max")
+        if "avg" in aggregates:
+            point["occupied_ratio"] = row.occupied_count / row.count if row.count else None
+        if "count" in aggregates:
+            point["count"] = row.count
+        point["timestamp"] = row.bucket_start
+        points.append(point)
+    return points
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets downsampling.
+    Returns the indices of at most ``threshold`` points that preserve the
+    visual shape of the series (first and last points are always kept).
+    """
+    n = len(x)
+    if threshold >= n:
+        return np.arange(n)
+    if threshold < 3:
+        return np.array([0, n - 1][:max(threshold, 0)])
+
+    every = (n - 2) / (threshold - 2)
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0] = 0
+    a = 0
+    for i in range(threshold - 2):
+        start = int(i * every) + 1
+        end = int((i + 1) * every) + 1
+        next_end = min(int((i + 2) * every) + 1, n)
+        avg_x = x[end:next_end].mean()
+        avg_y = y[end:next_end].mean()
+
+        area = np.abs(
+            (x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a])
+        )
+        a = start + int(np.argmax(area))
+        selected[i + 1] = a
+    selected[-1] = n - 1
+    return selected
+
+
+def downsample_points(points: List[Dict], max_points: int) -> List[Dict]:
+    """Reduce bucketed points to ``max_points`` with LTTB on the primary metric"""
+    if len(points) <= max_points:
+        return points
+    key = next(
+        (k for k in ("temp_avg", "temp_max", "temp_min", "count") if points[0].get(k) is not None),
+        None
+    )
+    if key is None:
+        return points[:max_points]
+
+    x = np.array([p["timestamp"].replace(tzinfo=timezone.utc).timestamp() for p in points], dtype=np.float64)
+    y = np.array([p[key] for p in points], dtype=np.float64)
+    return [points[i] for i in lttb_indices(x, y, max_points)]
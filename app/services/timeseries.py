@@ -0,0 +1,309 @@
+import fcntl
+import os
+import threading
+import numpy as np
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, Iterable, List, Optional, Union
+
+# Numeric columns kept for every hotel metrics reading
+METRIC_FIELDS = (
+    "energy_usage",
+    "occupancy",
+    "temperature",
+    "humidity",
+    "carbon_intensity",
+    "energy_price",
+    "potential_savings",
+    "integrations",
+)
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+# Columns returned as ints by records(); everything else is a float
+INTEGER_FIELDS = frozenset({"integrations"})
+
+
+def to_epoch(timestamp: Union[str, datetime, int, float, None]) -> int:
+    """Convert an ISO string / naive UTC datetime to epoch seconds"""
+    return to_epoch_us(timestamp) // 1_000_000
+
+
+def to_epoch_us(timestamp: Union[str, datetime, int, float, None]) -> int:
+    """Convert an ISO string / naive UTC datetime / epoch seconds to epoch microseconds"""
+    if timestamp is None:
+        timestamp = datetime.now(timezone.utc)
+    if isinstance(timestamp, (int, float)):
+        return round(timestamp * 1_000_000)
+    if isinstance(timestamp, str):
+        timestamp = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.replace(tzinfo=timezone.utc)
+    return (timestamp - EPOCH) // timedelta(microseconds=1)
+
+
+def from_epoch(timestamp: int, micros: int = 0) -> str:
+    """Convert epoch seconds (plus microseconds) back to the naive UTC ISO format used by the API"""
+    return (EPOCH + timedelta(seconds=int(timestamp), microseconds=int(micros))).replace(tzinfo=None).isoformat()
+
+
+class MetricsBuffer:
+    """
+    Fixed-capacity columnar ring buffer for hotel metrics readings.
+
+    Every column is stored twice (slot ``i`` and ``i + capacity``) so the
+    most recent ``n`` readings are always one contiguous slice. Appending and
+    evicting are O(1) and window reads are zero-copy NumPy views.
+
+    Writers serialize on a lock. Window views are only stable on the thread
+    that appends; code running on other threads should read from ``frozen()``.
+    """
+
+    def __init__(self, capacity: int = 100):
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self.capacity = capacity
+        self._values = np.zeros((len(METRIC_FIELDS), 2 * capacity), dtype=np.float64)
+        self._timestamps = np.zeros(2 * capacity, dtype=np.int64)
+        # Sub-second part of each timestamp, so records() returns readings as they arrived
+        self._micros = np.zeros(2 * capacity, dtype=np.int64)
+        self._rows = {name: i for i, name in enumerate(METRIC_FIELDS)}
+        self._count = 0
+        self._lock = threading.Lock()
+
+    @property
+    def count(self) -> int:
+        """Total number of readings ever appended (monotonic version counter)"""
+        return self._count
+
+    def __len__(self) -> int:
+        return min(self._count, self.capacity)
+
+    def append(self, metrics: Dict) -> None:
+        """Append a reading, evicting the oldest one when full"""
+        with self._lock:
+            self._append(metrics)
+
+    def _append(self, metrics: Dict) -> None:
+        pos = self._count % self.capacity
+        mirror = pos + self.capacity
+        for name, row in self._rows.items():
+            value = metrics.get(name, 0.0)
+            self._values[row, pos] = value
+            self._values[row, mirror] = value
+        ts, micros = divmod(to_epoch_us(metrics.get("timestamp")), 1_000_000)
+        self._timestamps[pos] = ts
+        self._timestamps[mirror] = ts
+        self._micros[pos] = micros
+        self._micros[mirror] = micros
+        self._count += 1
+
+    def _window_slice(self, n: Optional[int]) -> slice:
+        size = len(self)
+        n = size if n is None else max(0, min(n, size))
+        end = (self._count - 1) % self.capacity + self.capacity + 1 if self._count else 0
+        return slice(end - n, end)
+
+    def window(self, n: Optional[int] = None) -> np.ndarray:
+        """Return a (fields x n) view over the most recent ``n`` readings"""
+        return self._values[:, self._window_slice(n)]
+
+    def column(self, name: str, n: Optional[int] = None) -> np.ndarray:
+        """Return a view over the most recent ``n`` values of one metric"""
+        return self._values[self._rows[name], self._window_slice(n)]
+
+    def timestamps(self, n: Optional[int] = None) -> np.ndarray:
+        """Return a view over the most recent ``n`` epoch timestamps"""
+        return self._timestamps[self._window_slice(n)]
+
+    def seed(self, readings: Iterable[Dict]) -> bool:
+        """Append initial readings only if the buffer is still empty"""
+        with self._lock:
+            if self._count:
+                return False
+            for reading in readings:
+                self._append(reading)
+        return True
+
+    def frozen(self) -> "MetricsBuffer":
+        """Return a private in-memory copy taken atomically with respect to writers"""
+        with self._lock:
+            return self._copy()
+
+    def _copy(self) -> "MetricsBuffer":
+        copy = MetricsBuffer(capacity=self.capacity)
+        copy._values[...] = self._values
+        copy._timestamps[...] = self._timestamps
+        copy._micros[...] = self._micros
+        copy._count = self._count
+        return copy
+
+    def latest(self) -> Optional[Dict]:
+        """Return the most recent reading as a dict, or None if empty"""
+        records = self.records(1)
+        return records[0] if records else None
+
+    def records(self, n: Optional[int] = None) -> List[Dict]:
+        """Materialize the most recent ``n`` readings as dicts (oldest first)"""
+        with self._lock:
+            values, timestamps, micros = self.window(n).copy(), self.timestamps(n).copy(), self._micros_window(n)
+        return self._to_records(values, timestamps, micros)
+
+    def _micros_window(self, n: Optional[int]) -> np.ndarray:
+        return self._micros[self._window_slice(n)].copy()
+
+    def _to_records(self, values: np.ndarray, timestamps: np.ndarray, micros: np.ndarray) -> List[Dict]:
+        records = []
+        for i in range(values.shape[1]):
+            record = {
+                name: int(values[row, i]) if name in INTEGER_FIELDS else float(values[row, i])
+                for name, row in self._rows.items()
+            }
+            record["timestamp"] = from_epoch(timestamps[i], micros[i])
+            records.append(record)
+        return records
+
+
+class SharedMetricsBuffer(MetricsBuffer):
+    """
+    MetricsBuffer stored in a memory-mapped file shared by all worker processes.
+
+    Writers serialize on a thread lock plus an ``flock`` of the backing file
+    (flock alone does not exclude threads sharing one descriptor). Readers never take
+    the lock: a sequence counter in the header is bumped before and after each
+    write (seqlock), and readers copy the window and retry if it changed.
+    Reads therefore return copies rather than views.
+    """
+
+    _MAGIC = 0x48454D32  # "HEM2": adds sub-second timestamps and the integrations column
+    _HEADER_SLOTS = 8
+    _MAGIC_SLOT, _CAPACITY_SLOT, _COUNT_SLOT, _SEQ_SLOT = range(4)
+    _READ_RETRIES = 100
+
+    def __init__(self, path: str, capacity: int = 100):
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self.capacity = capacity
+        self.path = path
+        self._rows = {name: i for i, name in enumerate(METRIC_FIELDS)}
+        self._pid = None
+        self._lock = threading.Lock()
+        self._open()
+
+    def _open(self) -> None:
+        header_bytes = self._HEADER_SLOTS * 8
+        values_bytes = len(METRIC_FIELDS) * 2 * self.capacity * 8
+        timestamps_bytes = 2 * self.capacity * 8
+        size = header_bytes + values_bytes + 2 * timestamps_bytes
+
+        # Reopen after fork: flock is per open file description, so workers
+        # must not share a descriptor inherited from the master process.
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        with self._locked():
+            if os.fstat(self._fd).st_size == 0:
+                os.ftruncate(self._fd, size)
+            mm = np.memmap(self.path, dtype=np.uint8, mode="r+")
+            header = np.ndarray(self._HEADER_SLOTS, dtype=np.int64, buffer=mm)
+            if header[self._MAGIC_SLOT] == 0:
+                header[self._CAPACITY_SLOT] = self.capacity
+                header[self._MAGIC_SLOT] = self._MAGIC
+            elif header[self._MAGIC_SLOT] != self._MAGIC or header[self._CAPACITY_SLOT] != self.capacity:
+                raise ValueError(f"{self.path} holds a metrics buffer with a different layout")
+
+        self._mm = mm
+        self._header = header
+        self._values = np.ndarray(
+            (len(METRIC_FIELDS), 2 * self.capacity), dtype=np.float64, buffer=mm, offset=header_bytes
+        )
+        self._timestamps = np.ndarray(
+            2 * self.capacity, dtype=np.int64, buffer=mm, offset=header_bytes + values_bytes
+        )
+        self._micros = np.ndarray(
+            2 * self.capacity, dtype=np.int64, buffer=mm, offset=header_bytes + values_bytes + timestamps_bytes
+        )
+        self._pid = os.getpid()
+
+    def _check_pid(self) -> None:
+        if self._pid != os.getpid():
+            os.close(self._fd)
+            # The parent's lock may have been held by a thread that did not survive the fork
+            self._lock = threading.Lock()
+            self._open()
+
+    @contextmanager
+    def _locked(self):
+        with self._lock:
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    @property
+    def _count(self) -> int:
+        return int(self._header[self._COUNT_SLOT])
+
+    @_count.setter
+    def _count(self, value: int) -> None:
+        self._header[self._COUNT_SLOT] = value
+
+    def append(self, metrics: Dict) -> None:
+        self._check_pid()
+        with self._locked():
+            self._header[self._SEQ_SLOT] += 1  # odd: write in progress
+            self._append(metrics)
+            self._header[self._SEQ_SLOT] += 1
+
+    def seed(self, readings: Iterable[Dict]) -> bool:
+        # Check emptiness under the writer lock so only one worker seeds
+        self._check_pid()
+        with self._locked():
+            if self._count:
+                return False
+            for reading in readings:
+                self._header[self._SEQ_SLOT] += 1
+                self._append(reading)
+                self._header[self._SEQ_SLOT] += 1
+        return True
+
+    def _read(self, read: Callable):
+        """Run ``read`` until it observes a stable, even sequence number"""
+        self._check_pid()
+        for _ in range(self._READ_RETRIES):
+            before = int(self._header[self._SEQ_SLOT])
+            if before % 2 == 0:
+                result = read()
+                if int(self._header[self._SEQ_SLOT]) == before:
+                    return result
+        # Writers are starving us; fall back to taking the lock
+        with self._locked():
+            return read()
+
+    def window(self, n: Optional[int] = None) -> np.ndarray:
+        return self._read(lambda: super(SharedMetricsBuffer, self).window(n).copy())
+
+    def column(self, name: str, n: Optional[int] = None) -> np.ndarray:
+        return self._read(lambda: super(SharedMetricsBuffer, self).column(name, n).copy())
+
+    def timestamps(self, n: Optional[int] = None) -> np.ndarray:
+        return self._read(lambda: super(SharedMetricsBuffer, self).timestamps(n).copy())
+
+    def frozen(self) -> MetricsBuffer:
+        return self._read(self._copy)
+
+    def records(self, n: Optional[int] = None) -> List[Dict]:
+        values, timestamps, micros = self._read(lambda: (
+            MetricsBuffer.window(self, n).copy(),
+            MetricsBuffer.timestamps(self, n).copy(),
+            self._micros_window(n),
+        ))
+        return self._to_records(values, timestamps, micros)
+
+
+def create_metrics_buffer(backend: str = "memory", capacity: int = 100, path: Optional[str] = None) -> MetricsBuffer:
+    """Build the configured history backend ("memory" or "shared")"""
+    if backend == "memory":
+        return MetricsBuffer(capacity=capacity)
+    if backend == "shared":
+        if not path:
+            raise ValueError("shared metrics backend requires a path")
+        return SharedMetricsBuffer(path, capacity=capacity)
+    raise ValueError(f"Unknown metrics history backend: {backend}")
@@ -0,0 +1,50 @@
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from app.config import settings
+
+
+class UserCache:
+    """
+    Per-worker LRU of user row snapshots keyed by username.
+
+    Entries expire after ``ttl`` seconds; the users routes invalidate an
+    entry whenever they change or delete that user, so the TTL only bounds
+    staleness across workers.
+    """
+
+    def __init__(self, ttl: float = 30.0, max_entries: int = 1024):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, Dict]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, username: str) -> Optional[Dict]:
+        entry = self._entries.get(username)
+        if entry is None or time.monotonic() - entry[0] > self.ttl:
+            self._entries.pop(username, None)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(username)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, username: str, snapshot: Dict) -> None:
+        self._entries[username] = (time.monotonic(), snapshot)
+        self._entries.move_to_end(username)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, username: Optional[str] = None) -> None:
+        if username is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(username, None)
+
+    def stats(self) -> Dict:
+        return {"users": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+user_cache = UserCache(ttl=settings.USER_CACHE_TTL_SECONDS, max_entries=settings.USER_CACHE_MAX_ENTRIES)
@@ -0,0 +1,67 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, List, TypeVar
+
+from fastapi import HTTPException, status
+
+T = TypeVar("T")
+
+
+class BoundedExecutor:
+    """
+    Thread pool with a cap on queued plus running calls.
+
+    At most ``max_pending`` calls may be queued or running; beyond that
+    callers get a 503 with Retry-After instead of waiting behind a burst.
+    """
+
+    saturated_detail = "Server is busy, retry shortly"
+
+    def __init__(self, name: str, workers: int = 2, max_pending: int = 32):
+        self.name = name
+        self.workers = workers
+        self.max_pending = max_pending
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=name)
+
+    def _reserve(self) -> None:
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail=self.saturated_detail,
+                headers={"Retry-After": "1"}
+            )
+        self.pending += 1
+
+    async def run(self, func: Callable[..., T], *args) -> T:
+        self._reserve()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+        finally:
+            self.pending -= 1
+            self.completed += 1
+
+    async def map(self, func: Callable[..., T], items: Iterable) -> List[T]:
+        """Apply ``func`` to every item across the pool; counts as one pending call"""
+        self._reserve()
+        loop = asyncio.get_running_loop()
+        try:
+            return await asyncio.gather(*(loop.run_in_executor(self._executor, func, item) for item in items))
+        finally:
+            self.pending -= 1
+            self.completed += 1
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=True)
+
+    def stats(self) -> Dict:
+        return {
+            "workers": self.workers,
+            "pending": self.pending,
+            "max_pending": self.max_pending,
+            "completed": self.completed,
+            "rejected": self.rejected
+        }
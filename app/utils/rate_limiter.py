@@ -0,0 +1,190 @@
+import fcntl
+import hashlib
+import math
+import os
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Callable, Dict, NamedTuple, Tuple
+
+import numpy as np
+
+
+class RateLimitResult(NamedTuple):
+    allowed: bool
+    limit: int
+    remaining: int
+    reset_after: float   # seconds until the bucket is full again
+    retry_after: float   # seconds until the request would be allowed (0 when allowed)
+
+    def headers(self) -> Dict[str, str]:
+        headers = {
+            "RateLimit-Limit": str(self.limit),
+            "RateLimit-Remaining": str(self.remaining),
+            "RateLimit-Reset": str(math.ceil(self.reset_after)),
+        }
+        if not self.allowed:
+            headers["Retry-After"] = str(max(1, math.ceil(self.retry_after)))
+        return headers
+
+
+def _take(tokens: float, updated: float, now: float, rate: float, capacity: int, cost: float) -> Tuple[float, bool]:
+    """Refill a bucket up to ``now`` and try to take ``cost`` tokens from it"""
+    tokens = min(capacity, tokens + (now - updated) * rate)
+    if tokens >= cost:
+        return tokens - cost, True
+    return tokens, False
+
+
+def _result(tokens: float, allowed: bool, rate: float, capacity: int, cost: float) -> RateLimitResult:
+    return RateLimitResult(
+        allowed=allowed,
+        limit=capacity,
+        remaining=int(tokens),
+        reset_after=(capacity - tokens) / rate,
+        retry_after=0.0 if allowed else (cost - tokens) / rate,
+    )
+
+
+class TokenBucketLimiter:
+    """
+    Per-key token buckets held in process memory.
+
+    Each key refills at ``rate`` tokens per second up to ``capacity``.
+    Buckets are kept in access order; a bucket idle long enough to be full
+    again is indistinguishable from a new one, so it is evicted from the
+    cold end on later calls. ``max_keys`` bounds memory under key floods.
+    """
+
+    def __init__(self, rate: float, capacity: int, max_keys: int = 100000,
+                 clock: Callable[[], float] = time.monotonic):
+        self.rate = rate
+        self.capacity = capacity
+        self.max_keys = max_keys
+        self.clock = clock
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+
+    def hit(self, key: str, cost: float = 1) -> RateLimitResult:
+        now = self.clock()
+        tokens, updated = self._buckets.pop(key, (self.capacity, now))
+        tokens, allowed = _take(tokens, updated, now, self.rate, self.capacity, cost)
+        self._buckets[key] = (tokens, now)
+        self._evict(now)
+        return _result(tokens, allowed, self.rate, self.capacity, cost)
+
+    def _evict(self, now: float) -> None:
+        idle = self.capacity / self.rate
+        while self._buckets:
+            key, (_, updated) = next(iter(self._buckets.items()))
+            if now - updated < idle and len(self._buckets) <= self.max_keys:
+                break
+            del self._buckets[key]
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+class SharedTokenBucketLimiter:
+    """
+    Token buckets in a memory-mapped file so every worker process enforces
+    the same limit.
+
+    The file holds a fixed open-addressing table of (key hash, tokens,
+    updated) slots. A key probes ``probe`` consecutive slots; idle buckets
+    (full again) count as free, and if every probed slot is busy the least
+    recently updated one is taken over. Updates hold an ``flock`` on the
+    file for the few microseconds the read-modify-write takes.
+    """
+
+    _MAGIC = 0x48455242  # "HERB"
+    _HEADER_SLOTS = 4
+
+    def __init__(self, path: str, rate: float, capacity: int, slots: int = 65536, probe: int = 8,
+                 clock: Callable[[], float] = time.monotonic):
+        self.path = path
+        self.rate = rate
+        self.capacity = capacity
+        self.slots = slots
+        self.probe = min(probe, slots)
+        self.clock = clock
+        self._pid = None
+        self._open()
+
+    def _open(self) -> None:
+        header_bytes = self._HEADER_SLOTS * 8
+        size = header_bytes + self.slots * 8 * 3
+
+        # Reopen after fork: flock is per open file description
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        with self._locked():
+            if os.fstat(self._fd).st_size == 0:
+                os.ftruncate(self._fd, size)
+            mm = np.memmap(self.path, dtype=np.uint8, mode="r+")
+            header = np.ndarray(self._HEADER_SLOTS, dtype=np.int64, buffer=mm)
+            if header[0] == 0:
+                header[1] = self.slots
+                header[0] = self._MAGIC
+            elif header[0] != self._MAGIC or header[1] != self.slots:
+                raise ValueError(f"{self.path} holds a rate limit table with a different layout")
+
+        self._mm = mm
+        self._keys = np.ndarray(self.slots, dtype=np.int64, buffer=mm, offset=header_bytes)
+        self._tokens = np.ndarray(self.slots, dtype=np.float64, buffer=mm, offset=header_bytes + self.slots * 8)
+        self._updated = np.ndarray(self.slots, dtype=np.float64, buffer=mm, offset=header_bytes + self.slots * 16)
+        self._pid = os.getpid()
+
+    @contextmanager
+    def _locked(self):
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    @staticmethod
+    def _hash(key: str) -> int:
+        # 0 marks an empty slot
+        return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "little", signed=True) or 1
+
+    def _slot(self, key_hash: int, now: float) -> int:
+        idle = self.capacity / self.rate
+        start = key_hash % self.slots
+        free = oldest = None
+        for i in range(self.probe):
+            slot = (start + i) % self.slots
+            current = int(self._keys[slot])
+            if current == key_hash:
+                return slot
+            if free is None and (current == 0 or now - self._updated[slot] >= idle):
+                free = slot
+            if oldest is None or self._updated[slot] < self._updated[oldest]:
+                oldest = slot
+        slot = free if free is not None else oldest
+        self._keys[slot] = key_hash
+        self._tokens[slot] = self.capacity
+        self._updated[slot] = now
+        return slot
+
+    def hit(self, key: str, cost: float = 1) -> RateLimitResult:
+        if self._pid != os.getpid():
+            os.close(self._fd)
+            self._open()
+        key_hash = self._hash(key)
+        with self._locked():
+            now = self.clock()
+            slot = self._slot(key_hash, now)
+            tokens, allowed = _take(
+                float(self._tokens[slot]), float(self._updated[slot]), now, self.rate, self.capacity, cost
+            )
+            self._tokens[slot] = tokens
+            self._updated[slot] = now
+        return _result(tokens, allowed, self.rate, self.capacity, cost)
+
+
+def create_rate_limiter(backend: str, rate: float, capacity: int, path: str = "", slots: int = 65536):
+    """Build a token bucket limiter for the configured backend ("memory" or "shared")"""
+    if backend == "memory":
+        return TokenBucketLimiter(rate, capacity)
+    if backend == "shared":
+        return SharedTokenBucketLimiter(path, rate, capacity, slots=slots)
+    raise ValueError(f"Unknown rate limit backend: {backend}")
@@ -16,7 +16,7 @@ if config.config_file_name is not None:
 
 # add your model's MetaData object here
 from app.models.user import User  # noqa: F401
-from app.models.room import RoomData  # noqa: F401
+from app.models.room import RoomData, RoomDataHourly, RoomDataDaily  # noqa: F401
 from app.database import Base
 target_metadata = Base.metadata
 
@@ -0,0 +1,39 @@
+"""create room_data table
+
+Revision ID: 001
+Revises: 
+Create Date: 2025-01-10 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '001'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'room_data',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('room_id', sa.String(), nullable=True),
+        sa.Column('temp', sa.Float(), nullable=True),
+        sa.Column('humidity', sa.Float(), nullable=True),
+        sa.Column('occupied', sa.Boolean(), nullable=True),
+        sa.Column('timestamp', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_room_data_id', 'room_data', ['id'])
+    op.create_index('ix_room_data_room_id', 'room_data', ['room_id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_room_data_room_id', table_name='room_data')
+    op.drop_index('ix_room_data_id', table_name='room_data')
+    op.drop_table('room_data')
@@ -0,0 +1,35 @@
+"""add (room_id, timestamp desc) index to room_data
+
+Revision ID: 003
+Revises: 002
+Create Date: 2026-10-17 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '003'
+down_revision: Union[str, None] = '002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Serves "latest reading for a room" as a single index seek instead of a
+    # sort over every row of the room. It also covers plain room_id lookups,
+    # so the single-column index is dropped to keep ingestion cheaper.
+    op.create_index(
+        'ix_room_data_room_id_timestamp',
+        'room_data',
+        ['room_id', sa.text('timestamp DESC')]
+    )
+    op.drop_index('ix_room_data_room_id', table_name='room_data')
+
+
+def downgrade() -> None:
+    op.create_index('ix_room_data_room_id', 'room_data', ['room_id'])
+    op.drop_index('ix_room_data_room_id_timestamp', table_name='room_data')
@@ -0,0 +1,72 @@
+"""add hourly and daily room_data rollup tables
+
+Revision ID: 004
+Revises: 003
+Create Date: 2026-10-17 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '004'
+down_revision: Union[str, None] = '003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+ROLLUP_TABLES = ('room_data_hourly', 'room_data_daily')
+
+# Bucket truncation per dialect, used to backfill from existing raw rows
+TRUNCATE = {
+    'postgresql': {
+        'room_data_hourly': "date_trunc('hour', timestamp)",
+        'room_data_daily': "date_trunc('day', timestamp)",
+    },
+    'sqlite': {
+        'room_data_hourly': "strftime('%Y-%m-%d %H:00:00.000000', timestamp)",
+        'room_data_daily': "strftime('%Y-%m-%d 00:00:00.000000', timestamp)",
+    },
+}
+
+
+def upgrade() -> None:
+    for table in ROLLUP_TABLES:
+        op.create_table(
+            table,
+            sa.Column('room_id', sa.String(), nullable=False),
+            sa.Column('bucket_start', sa.DateTime(), nullable=False),
+            sa.Column('count', sa.Integer(), nullable=False),
+            sa.Column('temp_sum', sa.Float(), nullable=True),
+            sa.Column('temp_min', sa.Float(), nullable=True),
+            sa.Column('temp_max', sa.Float(), nullable=True),
+            sa.Column('humidity_sum', sa.Float(), nullable=True),
+            sa.Column('humidity_min', sa.Float(), nullable=True),
+            sa.Column('humidity_max', sa.Float(), nullable=True),
+            sa.Column('occupied_count', sa.Integer(), nullable=False),
+            sa.PrimaryKeyConstraint('room_id', 'bucket_start')
+        )
+
+    truncate = TRUNCATE.get(op.get_bind().dialect.name)
+    if truncate is None:
+        return
+    for table in ROLLUP_TABLES:
+        op.execute(
+            f"""
+            INSERT INTO {table} (room_id, bucket_start, count, temp_sum, temp_min, temp_max,
+                                 humidity_sum, humidity_min, humidity_max, occupied_count)
+            SELECT room_id, {truncate[table]}, count(*), sum(temp), min(temp), max(temp),
+                   sum(humidity), min(humidity), max(humidity),
+                   sum(CASE WHEN occupied THEN 1 ELSE 0 END)
+            FROM room_data
+            WHERE timestamp IS NOT NULL
+            GROUP BY room_id, {truncate[table]}
+            """
+        )
+
+
+def downgrade() -> None:
+    for table in reversed(ROLLUP_TABLES):
+        op.drop_table(table)
@@ -0,0 +1,115 @@
+"""partition room_data by month on PostgreSQL
+
+Revision ID: 005
+Revises: 004
+Create Date: 2026-10-17 11:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '005'
+down_revision: Union[str, None] = '004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Months of partitions created ahead of "now" by this migration; afterwards
+# app/scripts/maintain_room_data.py keeps the window rolling.
+MONTHS_AHEAD = 3
+
+
+def upgrade() -> None:
+    # SQLite has no declarative partitioning; retention there uses chunked deletes
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    op.execute("ALTER TABLE room_data RENAME TO room_data_unpartitioned")
+    op.execute("ALTER TABLE room_data_unpartitioned RENAME CONSTRAINT room_data_pkey TO room_data_unpartitioned_pkey")
+    op.execute("ALTER INDEX ix_room_data_room_id_timestamp RENAME TO ix_room_data_unpartitioned_room_id_timestamp")
+    op.execute("ALTER INDEX ix_room_data_id RENAME TO ix_room_data_unpartitioned_id")
+    # Keep the id sequence alive when the old table is dropped
+    op.execute("ALTER SEQUENCE room_data_id_seq OWNED BY NONE")
+
+    # The partition key has to be part of the primary key
+    op.execute(
+        """
+        CREATE TABLE room_data (
+            id INTEGER NOT NULL DEFAULT nextval('room_data_id_seq'),
+            room_id VARCHAR,
+            temp FLOAT,
+            humidity FLOAT,
+            occupied BOOLEAN,
+            timestamp TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+            PRIMARY KEY (id, timestamp)
+        ) PARTITION BY RANGE (timestamp)
+        """
+    )
+    op.execute("ALTER SEQUENCE room_data_id_seq OWNED BY room_data.id")
+    op.execute("CREATE INDEX ix_room_data_room_id_timestamp ON room_data (room_id, timestamp DESC)")
+    op.execute("CREATE TABLE room_data_default PARTITION OF room_data DEFAULT")
+
+    # One partition per month from the oldest existing reading to MONTHS_AHEAD from now
+    op.execute(
+        f"""
+        DO $$
+        DECLARE
+            month_start DATE;
+            last_month DATE := date_trunc('month', now() + interval '{MONTHS_AHEAD} months')::date;
+        BEGIN
+            SELECT coalesce(date_trunc('month', min(timestamp)), date_trunc('month', now()))::date
+              INTO month_start FROM room_data_unpartitioned;
+            WHILE month_start <= last_month LOOP
+                EXECUTE format(
+                    'CREATE TABLE IF NOT EXISTS %I PARTITION OF room_data FOR VALUES FROM (%L) TO (%L)',
+                    'room_data_y' || to_char(month_start, 'YYYY') || 'm' || to_char(month_start, 'MM'),
+                    month_start,
+                    (month_start + interval '1 month')::date
+                );
+                month_start := (month_start + interval '1 month')::date;
+            END LOOP;
+        END $$
+        """
+    )
+
+    op.execute(
+        """
+        INSERT INTO room_data (id, room_id, temp, humidity, occupied, timestamp)
+        SELECT id, room_id, temp, humidity, occupied, coalesce(timestamp, now())
+        FROM room_data_unpartitioned
+        """
+    )
+    op.execute("DROP TABLE room_data_unpartitioned")
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    op.execute("ALTER TABLE room_data RENAME TO room_data_partitioned")
+    op.execute("ALTER TABLE room_data_partitioned RENAME CONSTRAINT room_data_pkey TO room_data_partitioned_pkey")
+    op.execute("ALTER INDEX ix_room_data_room_id_timestamp RENAME TO ix_room_data_partitioned_room_id_timestamp")
+    op.execute("ALTER SEQUENCE room_data_id_seq OWNED BY NONE")
+    op.create_table(
+        'room_data',
+        sa.Column('id', sa.Integer(), nullable=False, server_default=sa.text("nextval('room_data_id_seq')")),
+        sa.Column('room_id', sa.String(), nullable=True),
+        sa.Column('temp', sa.Float(), nullable=True),
+        sa.Column('humidity', sa.Float(), nullable=True),
+        sa.Column('occupied', sa.Boolean(), nullable=True),
+        sa.Column('timestamp', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.execute("ALTER SEQUENCE room_data_id_seq OWNED BY room_data.id")
+    op.create_index('ix_room_data_id', 'room_data', ['id'])
+    op.create_index('ix_room_data_room_id_timestamp', 'room_data', ['room_id', sa.text('timestamp DESC')])
+    op.execute(
+        """
+        INSERT INTO room_data (id, room_id, temp, humidity, occupied, timestamp)
+        SELECT id, room_id, temp, humidity, occupied, timestamp FROM room_data_partitioned
+        """
+    )
+    op.execute("DROP TABLE room_data_partitioned")
@@ -0,0 +1,28 @@
+"""index refresh_tokens for purge and per-user revocation
+
+Revision ID: 006
+Revises: 005
+Create Date: 2026-10-17 13:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '006'
+down_revision: Union[str, None] = '005'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # The background purge deletes by expires_at; reuse detection revokes by user_id
+    op.create_index('ix_refresh_tokens_expires_at', 'refresh_tokens', ['expires_at'])
+    op.create_index('ix_refresh_tokens_user_id', 'refresh_tokens', ['user_id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_refresh_tokens_user_id', table_name='refresh_tokens')
+    op.drop_index('ix_refresh_tokens_expires_at', table_name='refresh_tokens')
@@ -0,0 +1,33 @@
+"""add (created_at DESC, id DESC) index to users
+
+Revision ID: 007
+Revises: 006
+Create Date: 2026-10-17 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '007'
+down_revision: Union[str, None] = '006'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Serves keyset pages of list_users as one index range scan. On PostgreSQL
+    # the INCLUDE columns let the listing be answered by an index-only scan.
+    op.create_index(
+        'ix_users_created_at_id',
+        'users',
+        [sa.text('created_at DESC'), sa.text('id DESC')],
+        postgresql_include=['username', 'email', 'role', 'last_login']
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_users_created_at_id', table_name='users')
@@ -0,0 +1,32 @@
+"""backfill users.created_at and make it NOT NULL
+
+Revision ID: 008
+Revises: 007
+Create Date: 2026-10-17 15:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '008'
+down_revision: Union[str, None] = '007'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # list_users pages on (created_at, id): a NULL created_at cannot be encoded
+    # in a cursor and never compares below one, so those rows would be skipped.
+    # Users whose creation time was never recorded sort last, at the epoch.
+    op.execute("UPDATE users SET created_at = '1970-01-01 00:00:00' WHERE created_at IS NULL")
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.alter_column('created_at', existing_type=sa.DateTime(), nullable=False)
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.alter_column('created_at', existing_type=sa.DateTime(), nullable=True)
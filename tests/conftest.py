@@ -0,0 +1,16 @@
+import asyncio
+import pytest
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from app.database import Base
+
+@pytest.fixture
+def session_factory():
+    """Session factory bound to a fresh in-memory SQLite database"""
+    engine = create_async_engine("sqlite+aiosqlite://")
+
+    async def setup():
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+
+    asyncio.run(setup())
+    return async_sessionmaker(engine, expire_on_commit=False)
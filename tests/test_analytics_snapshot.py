@@ -0,0 +1,92 @@
+import asyncio
+from unittest.mock import patch
+
+from fastapi.testclient import TestClient
+
+from app.main import analytics, app, history
+from app.services.analytics_snapshot import SNAPSHOT_VIEWS, AnalyticsSnapshotStore
+from app.services.data_service import DataService
+from app.services.insights_service import AIInsightsService
+from app.services.ml_service import MLService
+from app.services.timeseries import MetricsBuffer
+
+def make_store(readings=24):
+    service = DataService()
+    buffer = MetricsBuffer(capacity=100)
+    for _ in range(readings):
+        buffer.append(service.generate_hotel_metrics())
+    return buffer, AnalyticsSnapshotStore(buffer, service, AIInsightsService(), MLService())
+
+def test_snapshot_is_reused_until_a_reading_lands():
+    buffer, store = make_store()
+    first = store.current()
+    assert store.current() is first
+    assert set(first.payloads) == set(SNAPSHOT_VIEWS)
+
+    buffer.append(DataService().generate_hotel_metrics())
+    second = store.current()
+    assert second is not first
+    assert second.version == buffer.count
+    assert store.builds == 2
+
+def test_optimizations_are_generated_once_per_snapshot():
+    _, store = make_store()
+    with patch.object(store.insights_service, "generate_optimizations", wraps=store.insights_service.generate_optimizations) as spy:
+        store.refresh()
+    assert spy.call_count == 1
+
+def test_snapshot_expires_after_max_age():
+    _, store = make_store()
+    store.max_age = 0
+    first = store.current()
+    assert store.current() is not first
+
+def test_empty_history_serves_empty_payloads():
+    _, store = make_store(readings=0)
+    snapshot = store.current()
+    assert snapshot.payloads["insights"] == b"[]"
+    assert snapshot.payloads["savings"] == b"{}"
+
+def test_conditional_requests_return_304():
+    client = TestClient(app)
+    response = client.get("/predictions")
+    assert response.status_code == 200
+    etag = response.headers["ETag"]
+    last_modified = response.headers["Last-Modified"]
+
+    assert client.get("/predictions", headers={"If-None-Match": etag}).status_code == 304
+    assert client.get("/predictions", headers={"If-Modified-Since": last_modified}).status_code == 304
+    assert client.get("/predictions", headers={"If-None-Match": '"stale"'}).status_code == 200
+
+    # A new reading rebuilds the snapshot, so the old validator no longer matches
+    client.get("/metrics")
+    assert analytics.current().version == history.count
+    assert client.get("/predictions", headers={"If-None-Match": etag}).status_code == 200
+
+def test_concurrent_gets_share_one_rebuild():
+    from app.utils.bounded_executor import BoundedExecutor
+
+    buffer, store = make_store()
+    store.executor = BoundedExecutor("analytics-test", workers=2, max_pending=4)
+
+    async def burst():
+        return await asyncio.gather(*(store.get() for _ in range(50)))
+
+    snapshots = asyncio.run(burst())
+    store.executor.shutdown()
+    assert store.builds == 1
+    assert all(snapshot is snapshots[0] for snapshot in snapshots)
+    assert store.executor.stats()["completed"] == 1
+
+def test_metrics_are_stored_and_returned_when_analytics_are_saturated(monkeypatch):
+    from fastapi import HTTPException
+
+    class SaturatedExecutor:
+        async def run(self, func, *args):
+            raise HTTPException(status_code=503, detail="busy")
+
+    monkeypatch.setattr(analytics, "executor", SaturatedExecutor())
+    before = history.count
+    response = TestClient(app).get("/metrics")
+    assert response.status_code == 200
+    assert history.count == before + 1
@@ -0,0 +1,82 @@
+import numpy as np
+import pytest
+
+from app.services.anomaly_baselines import RollingBaselines
+from app.services.ml_service import MLService
+from app.services.timeseries import MetricsBuffer
+
+FIELDS = ("energy_usage", "occupancy", "humidity")
+
+def make_reading(i, rng, hour=None):
+    hour = i % 24 if hour is None else hour
+    return {
+        "energy_usage": 1000.0 + rng.normal(0, 50),
+        "occupancy": 60.0 + rng.normal(0, 5),
+        "humidity": 45.0 + rng.normal(0, 2),
+        "timestamp": 1_700_006_400 + (i // 24) * 86400 + hour * 3600  # 1_700_006_400 is midnight UTC
+    }
+
+def test_incremental_stats_match_brute_force():
+    rng = np.random.default_rng(7)
+    history = MetricsBuffer(capacity=500)
+    baselines = RollingBaselines(FIELDS, window=24, baseline_window=100)
+    for i in range(437):
+        history.append(make_reading(i, rng))
+        # Sync at irregular intervals to exercise multi-reading catch-up
+        if i % 3 == 0:
+            baselines.sync(history)
+    baselines.sync(history)
+
+    for field in FIELDS:
+        recent = history.column(field, 24)
+        n, mean, std = baselines.rolling(field)
+        assert n == 24
+        assert mean == pytest.approx(recent.mean())
+        assert std == pytest.approx(recent.std())
+
+        values = history.column(field, 100)
+        hours = (history.timestamps(100) // 3600) % 24
+        for hour in (0, 5, 23):
+            n, mean, std = baselines.hourly(field, hour)
+            same_hour = values[hours == hour]
+            assert n == same_hour.size
+            assert mean == pytest.approx(same_hour.mean())
+            assert std == pytest.approx(same_hour.std())
+
+def test_sync_only_pushes_new_readings():
+    rng = np.random.default_rng(1)
+    history = MetricsBuffer(capacity=50)
+    baselines = RollingBaselines(FIELDS)
+    for i in range(30):
+        history.append(make_reading(i, rng))
+    assert baselines.sync(history) == 30
+    assert baselines.sync(history) == 0
+    history.append(make_reading(30, rng))
+    assert baselines.sync(history) == 1
+
+def test_window_must_fit_baseline():
+    with pytest.raises(ValueError):
+        RollingBaselines(FIELDS, window=48, baseline_window=24)
+
+def test_detects_anomalies_on_every_watched_metric():
+    rng = np.random.default_rng(3)
+    history = MetricsBuffer(capacity=100)
+    for i in range(60):
+        history.append(make_reading(i, rng))
+    spike = {**make_reading(60, rng), "occupancy": 200.0}
+    history.append(spike)
+
+    anomalies = MLService().detect_anomalies(spike, history)
+    statistical = [a for a in anomalies if a["type"] == "statistical_anomaly"]
+    assert [a["metric"] for a in statistical] == ["occupancy"]
+    assert statistical[0]["severity"] == "high"
+
+def test_zero_hourly_baseline_is_not_a_division_error():
+    rng = np.random.default_rng(5)
+    history = MetricsBuffer(capacity=100)
+    for i in range(72):
+        history.append({**make_reading(i, rng), "occupancy": 0.0})
+    current = {**make_reading(72, rng), "occupancy": 40.0}
+
+    anomalies = MLService().detect_anomalies(current, history)
+    assert not [a for a in anomalies if a["type"] == "temporal_anomaly" and a["metric"] == "occupancy"]
@@ -0,0 +1,198 @@
+import asyncio
+from datetime import timedelta
+
+import pytest
+from sqlalchemy import event
+
+from app.models.user import User, create_access_token, get_authenticated_user, get_current_user
+from app.services.user_cache import UserCache, user_cache
+
+
+@pytest.fixture
+def admin_user(session_factory):
+    async def create():
+        async with session_factory() as db:
+            user = User(username="admin", email="admin@example.com", password_hash="x", role="admin")
+            db.add(user)
+            await db.commit()
+            return user.id
+
+    user_cache.invalidate()
+    return asyncio.run(create())
+
+
+def count_queries(session_factory):
+    """Number of SQL statements issued through the factory's engine"""
+    statements = []
+    event.listen(session_factory.kw["bind"].sync_engine, "before_cursor_execute",
+                 lambda *args: statements.append(args[2]))
+    return statements
+
+
+def test_claims_are_trusted_without_query(session_factory, admin_user):
+    token = create_access_token({"sub": "admin", "uid": admin_user, "role": "admin"}, timedelta(minutes=5))
+    statements = count_queries(session_factory)
+
+    async def run():
+        async with session_factory() as db:
+            return await get_authenticated_user(token, db)
+
+    principal = asyncio.run(run())
+    assert (principal.id, principal.username, principal.role) == (admin_user, "admin", "admin")
+    assert statements == []
+
+
+def test_tokens_without_uid_fall_back_to_user_lookup(session_factory, admin_user):
+    token = create_access_token({"sub": "admin", "role": "admin"}, timedelta(minutes=5))
+
+    async def run():
+        async with session_factory() as db:
+            return await get_authenticated_user(token, db)
+
+    assert asyncio.run(run()).id == admin_user
+
+
+def test_current_user_served_from_cache_until_invalidated(session_factory, admin_user):
+    token = create_access_token({"sub": "admin", "uid": admin_user, "role": "admin"}, timedelta(minutes=5))
+    statements = count_queries(session_factory)
+
+    async def run():
+        async with session_factory() as db:
+            user = await get_current_user(token, db)
+            return user.id, user.email
+
+    assert asyncio.run(run()) == (admin_user, "admin@example.com")
+    assert len(statements) == 1
+    assert asyncio.run(run()) == (admin_user, "admin@example.com")
+    assert len(statements) == 1
+
+    user_cache.invalidate("admin")
+    asyncio.run(run())
+    assert len(statements) == 2
+
+
+def test_cached_user_can_be_updated(session_factory, admin_user):
+    token = create_access_token({"sub": "admin", "uid": admin_user, "role": "admin"}, timedelta(minutes=5))
+
+    async def update():
+        async with session_factory() as db:
+            await get_current_user(token, db)
+            user = await get_current_user(token, db)
+            user.email = "new@example.com"
+            await db.commit()
+
+    async def email():
+        async with session_factory() as db:
+            return (await db.get(User, admin_user)).email
+
+    asyncio.run(update())
+    assert asyncio.run(email()) == "new@example.com"
+
+
+def test_user_cache_evicts_least_recently_used():
+    cache = UserCache(ttl=60, max_entries=2)
+    cache.put("a", {"id": 1})
+    cache.put("b", {"id": 2})
+    cache.get("a")
+    cache.put("c", {"id": 3})
+
+    assert cache.get("b") is None
+    assert cache.get("a") == {"id": 1}
+    assert cache.stats()["users"] == 2
+
+
+def test_verified_token_cache_hits_until_expiry(monkeypatch):
+    from app.auth import jwt as auth_jwt
+    cache = auth_jwt.VerifiedTokenCache(max_entries=8)
+    monkeypatch.setattr(auth_jwt, "token_cache", cache)
+    token = create_access_token({"sub": "admin", "uid": 1, "role": "admin"}, timedelta(minutes=5))
+
+    first = auth_jwt.decode_access_token(token)
+    second = auth_jwt.decode_access_token(token)
+    assert first == second and first["sub"] == "admin"
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    monkeypatch.setattr(auth_jwt.time, "time", lambda: first["exp"] + 1)
+    assert cache.get(token) is None
+    assert cache.stats()["tokens"] == 0
+
+
+def test_invalid_token_is_not_cached():
+    from jose import JWTError
+    from app.auth.jwt import decode_access_token, token_cache
+
+    with pytest.raises(JWTError):
+        decode_access_token("not-a-token")
+    assert token_cache.get("not-a-token") is None
+
+
+def test_password_pool_rejects_when_saturated():
+    import threading
+    from fastapi import HTTPException
+    from app.services.password_pool import PasswordHashPool
+
+    pool = PasswordHashPool(workers=1, max_pending=1)
+    release = threading.Event()
+
+    async def run():
+        blocked = asyncio.create_task(pool.run(release.wait))
+        await asyncio.sleep(0)
+        with pytest.raises(HTTPException) as exc:
+            await pool.run(len, "x")
+        release.set()
+        await blocked
+        return exc.value
+
+    error = asyncio.run(run())
+    pool.shutdown()
+    assert error.status_code == 503
+    assert pool.stats()["rejected"] == 1
+    assert pool.stats()["pending"] == 0
+
+
+def test_last_login_buffer_coalesces_and_flushes(session_factory, admin_user, monkeypatch):
+    from datetime import datetime
+    from app.services import last_login_buffer as module
+    from app.services.last_login_buffer import LastLoginBuffer
+
+    monkeypatch.setattr(module, "async_session", session_factory)
+    buffer = LastLoginBuffer(flush_interval=60, min_interval=300)
+    user = User(id=admin_user, username="admin", last_login=None)
+    first, second = datetime(2026, 1, 1, 8, 0), datetime(2026, 1, 1, 8, 5)
+
+    assert buffer.record(user, first)
+    assert buffer.record(user, second)
+    user.last_login = second
+    assert not buffer.record(user, datetime(2026, 1, 1, 8, 6))
+    statements = count_queries(session_factory)
+
+    async def run():
+        await buffer.start()
+        await buffer.stop()
+        async with session_factory() as db:
+            return (await db.get(User, admin_user)).last_login
+
+    assert asyncio.run(run()) == second
+    assert len([s for s in statements if s.startswith("UPDATE")]) == 1
+    assert buffer.stats()["pending"] == 0
+    assert buffer.stats()["skipped_total"] == 1
+
+def test_last_login_flush_skips_deleted_users(session_factory, admin_user, monkeypatch):
+    from datetime import datetime
+    from app.services import last_login_buffer as module
+    from app.services.last_login_buffer import LastLoginBuffer
+
+    monkeypatch.setattr(module, "async_session", session_factory)
+    buffer = LastLoginBuffer(flush_interval=60)
+    when = datetime(2026, 1, 1, 8, 0)
+    buffer.record(User(id=admin_user, username="admin", last_login=None), when)
+    buffer.record(User(id=admin_user + 1, username="deleted", last_login=None), when)
+
+    async def run():
+        flushed = await buffer.flush()
+        async with session_factory() as db:
+            return flushed, (await db.get(User, admin_user)).last_login
+
+    assert asyncio.run(run()) == (True, when)
+    assert buffer.stats()["pending"] == 0
+    assert buffer.stats()["flush_errors"] == 0
@@ -0,0 +1,108 @@
+import threading
+import time
+from unittest.mock import patch
+
+import pytest
+
+from app.services.analytics_snapshot import AnalyticsSnapshotStore
+from app.services.data_service import DataService
+from app.services.forecast_cache import ForecastCache
+from app.services.insights_service import AIInsightsService
+from app.services.ml_service import MLService
+from app.services.timeseries import MetricsBuffer
+
+def test_hits_expire_and_evict_least_recently_used():
+    cache = ForecastCache(ttl=60, max_entries=2)
+    assert cache.get_or_compute("a", lambda: 1) == 1
+    assert cache.get_or_compute("a", lambda: 2) == 1
+    cache.get_or_compute("b", lambda: 2)
+    cache.get_or_compute("a", lambda: 0)  # refresh "a" so "b" is the LRU entry
+    cache.get_or_compute("c", lambda: 3)
+    assert cache.get_or_compute("b", lambda: "recomputed") == "recomputed"
+    assert cache.stats()["entries"] == 2
+
+    cache.ttl = 0
+    time.sleep(0.001)
+    assert cache.get_or_compute("c", lambda: "fresh") == "fresh"
+
+def test_concurrent_misses_compute_once():
+    cache = ForecastCache()
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return "forecast"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_compute("k", compute))) for _ in range(8)]
+    threads[0].start()
+    started.wait(5)
+    for thread in threads[1:]:
+        thread.start()
+    while cache.stats()["coalesced"] < 7:
+        time.sleep(0.001)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert results == ["forecast"] * 8
+
+def test_failures_are_not_cached():
+    cache = ForecastCache()
+
+    def fail():
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        cache.get_or_compute("k", fail)
+    assert cache.get_or_compute("k", lambda: "ok") == "ok"
+
+def test_predictions_are_deterministic_and_memoized():
+    service = MLService(forecast_cache=ForecastCache())
+    history = MetricsBuffer(capacity=10)
+    history.append(DataService().generate_hotel_metrics())
+
+    first = service.predict_energy_usage(history, hours_ahead=8)
+    assert service.predict_energy_usage(history, hours_ahead=8) is first
+    assert MLService().predict_energy_usage(history, hours_ahead=8) == first
+    assert service.forecast_cache.stats()["hits"] == 1
+
+    # A new reading or another horizon is a different key
+    history.append(DataService().generate_hotel_metrics())
+    assert service.predict_energy_usage(history, hours_ahead=8) is not first
+    assert len(service.predict_energy_usage(history, hours_ahead=4)) == 4
+    assert service.forecast_cache.stats()["misses"] == 3
+
+def test_reading_in_the_same_second_is_a_new_forecast():
+    service = MLService(forecast_cache=ForecastCache())
+    history = MetricsBuffer(capacity=10)
+    reading = DataService().generate_hotel_metrics()
+    history.append(reading)
+    first = service.predict_energy_usage(history)
+
+    history.append({**reading, "energy_usage": 9999.0})
+    second = service.predict_energy_usage(history)
+    assert second == MLService().predict_energy_usage(history)
+    assert second[0]["predicted_usage"] != first[0]["predicted_usage"]
+
+def test_snapshot_rebuilds_of_unchanged_history_reuse_the_forecast():
+    service = DataService()
+    history = MetricsBuffer(capacity=100)
+    for _ in range(24):
+        history.append(service.generate_hotel_metrics())
+    ml_service = MLService()
+    store = AnalyticsSnapshotStore(history, service, AIInsightsService(), ml_service, max_age=0)
+
+    with patch.object(ml_service, "predict_energy_usage", wraps=ml_service.predict_energy_usage) as spy:
+        store.current()
+        store.current()  # aged out, same history
+        assert (spy.call_count, store.forecasts_reused) == (1, 1)
+
+        history.append(service.generate_hotel_metrics())
+        store.current()
+        assert spy.call_count == 2
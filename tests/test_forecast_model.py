@@ -0,0 +1,89 @@
+import numpy as np
+import pytest
+
+from app.services.forecast_model import (
+    FORECAST_FIELDS, ForecastModelStore, design_matrix, resample_hourly,
+    save_forecast_model, train_forecast_model
+)
+from app.services.ml_service import MLService
+from app.services.timeseries import MetricsBuffer
+
+FIRST_HOUR = 1_700_006_400 // 3600  # midnight UTC
+
+def hotel_series(hours, seed=0):
+    """Hourly readings with a daily occupancy cycle driving energy usage"""
+    rng = np.random.default_rng(seed)
+    hour_of_day = (FIRST_HOUR + np.arange(hours)) % 24
+    occupancy = 70 + 20 * np.sin(2 * np.pi * (hour_of_day - 6) / 24) + rng.normal(0, 2, hours)
+    temperature = 22 + 4 * np.sin(2 * np.pi * (hour_of_day - 9) / 24) + rng.normal(0, 0.5, hours)
+    humidity = 55 + rng.normal(0, 3, hours)
+    usage = 12 * occupancy + 30 * np.abs(temperature - 22) + rng.normal(0, 15, hours)
+    return np.column_stack([usage, occupancy, temperature, humidity])
+
+def test_resample_hourly_averages_and_forward_fills():
+    timestamps = np.array([0, 1800, 3600, 3 * 3600 + 60])
+    values = np.array([[1.0, 3.0, 5.0, 7.0]])
+    first, series = resample_hourly(timestamps, values)
+    assert first == 0
+    assert series[:, 0].tolist() == [2.0, 5.0, 5.0, 7.0]
+
+def test_design_matrix_aligns_targets_with_origins():
+    series = np.arange(20 * len(FORECAST_FIELDS), dtype=float).reshape(20, -1)
+    X, Y = design_matrix(series, FIRST_HOUR, lags=3, horizons=2)
+    assert X.shape == (16, len(FORECAST_FIELDS) * 3 + 2)
+    # First origin is hour 2: inputs are hours 0-2, energy targets hours 3 and 4
+    assert X[0, :3].tolist() == series[0:3, 0].tolist()
+    assert Y[0, :2].tolist() == series[3:5, 0].tolist()
+
+def test_training_reports_backtest_accuracy():
+    trained = train_forecast_model(hotel_series(24 * 60), FIRST_HOUR, lags=6, horizons=8)
+    backtest = trained["meta"]["backtest"]
+    assert backtest["holdout_rows"] > 200
+    assert 0.9 < backtest["accuracy"] <= 1.0
+    assert len(backtest["horizon_accuracy"]["energy_usage"]) == 8
+
+def test_training_needs_enough_history():
+    with pytest.raises(ValueError):
+        train_forecast_model(hotel_series(30), FIRST_HOUR)
+
+def test_artifact_is_versioned_mmapped_and_loaded_once(tmp_path):
+    directory = str(tmp_path / "forecast")
+    store = ForecastModelStore(directory)
+    assert store.get() is None
+
+    trained = train_forecast_model(hotel_series(24 * 30), FIRST_HOUR, lags=6, horizons=8)
+    assert save_forecast_model(directory, trained, version="v1") == "v1"
+    assert (tmp_path / "forecast" / "LATEST").read_text() == "v1"
+
+    model = store.reload()
+    assert model.version == "v1"
+    assert isinstance(model.weights, np.memmap)
+    assert store.get() is model
+
+    X, _ = design_matrix(hotel_series(48), FIRST_HOUR, lags=6, horizons=8)
+    batch = model.predict(X)
+    assert batch.shape == (len(X), 2, 8)
+    np.testing.assert_allclose(batch[3], model.predict(X[3:4])[0])
+
+def test_ml_service_serves_model_forecasts(tmp_path):
+    directory = str(tmp_path / "forecast")
+    save_forecast_model(directory, train_forecast_model(hotel_series(24 * 30), FIRST_HOUR), version="v2")
+    service = MLService(forecast_models=ForecastModelStore(directory))
+
+    history = MetricsBuffer(capacity=100)
+    for i, row in enumerate(hotel_series(24, seed=3)):
+        history.append({**dict(zip(FORECAST_FIELDS, row)), "timestamp": (FIRST_HOUR + i) * 3600})
+
+    predictions = service.predict_energy_usage(history, hours_ahead=8)
+    assert len(predictions) == 8
+    assert {p["model_version"] for p in predictions} == {"v2"}
+    assert predictions[0]["factors"]["time_of_day"] == 0  # first hour after 24 hourly readings
+    assert service.prediction_model_accuracy == service.forecast_models.get().accuracy
+    assert service.predict_energy_usage(history, hours_ahead=8) == predictions
+
+def test_ml_service_without_model_falls_back():
+    service = MLService(forecast_models=ForecastModelStore("/nonexistent/forecast"))
+    history = MetricsBuffer(capacity=10)
+    history.append({**dict(zip(FORECAST_FIELDS, hotel_series(1)[0])), "timestamp": FIRST_HOUR * 3600})
+    assert len(service.predict_energy_usage(history, hours_ahead=3)) == 3
+    assert service.prediction_model_accuracy is None
@@ -0,0 +1,53 @@
+import asyncio
+import pytest
+from fastapi import HTTPException
+
+from app.auth.deps import CurrentUser, require_role
+from app.auth.permissions import (
+    ALL_PERMISSIONS,
+    Permission,
+    get_user_permissions,
+    has_permission,
+    has_permission_check
+)
+from app.models.user import AuthenticatedUser
+
+def principal(role):
+    return AuthenticatedUser(id=1, username=role, role=role)
+
+def test_role_masks():
+    assert get_user_permissions(principal("admin")) == list(Permission)
+    assert Permission.READ_ROOM_DATA in get_user_permissions(principal("viewer"))
+    assert has_permission_check(principal("user"), Permission.CREATE_ROOM_DATA)
+    assert not has_permission_check(principal("viewer"), Permission.CREATE_ROOM_DATA)
+    assert get_user_permissions(principal("unknown")) == []
+    assert ALL_PERMISSIONS & Permission.DELETE_USERS
+
+def test_permission_checker_runs_on_the_event_loop():
+    assert asyncio.iscoroutinefunction(has_permission([Permission.READ]))
+
+@pytest.mark.parametrize("role,allowed", [("admin", True), ("user", True), ("viewer", False), ("unknown", False)])
+def test_has_permission_requires_every_listed_permission(role, allowed):
+    checker = has_permission([Permission.READ_ROOM_DATA, Permission.CREATE_ROOM_DATA])
+    if allowed:
+        assert asyncio.run(checker(principal(role))).role == role
+    else:
+        with pytest.raises(HTTPException) as exc:
+            asyncio.run(checker(principal(role)))
+        assert exc.value.status_code == 403
+
+@pytest.mark.parametrize("required,role,allowed", [
+    ("viewer", "viewer", True),
+    ("viewer", "admin", True),
+    ("viewer", "user", False),
+    ("admin", "admin", True),
+    ("admin", "viewer", False),
+])
+def test_require_role(required, role, allowed):
+    checker = require_role(required)
+    user = CurrentUser(username="u", role=role)
+    if allowed:
+        assert asyncio.run(checker(user)) is user
+    else:
+        with pytest.raises(HTTPException):
+            asyncio.run(checker(user))
@@ -0,0 +1,100 @@
+import multiprocessing
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+
+from app.auth.rate_limiter import RateLimiter
+from app.utils.rate_limiter import SharedTokenBucketLimiter, TokenBucketLimiter, create_rate_limiter
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+def test_bucket_allows_burst_then_refills():
+    clock = FakeClock()
+    limiter = TokenBucketLimiter(rate=1.0, capacity=3, clock=clock)
+
+    assert [limiter.hit("a").allowed for _ in range(4)] == [True, True, True, False]
+    rejected = limiter.hit("a")
+    assert rejected.remaining == 0
+    assert rejected.retry_after == pytest.approx(1.0)
+    assert limiter.hit("b").allowed
+
+    clock.now += 1.5
+    result = limiter.hit("a")
+    assert result.allowed
+    assert result.remaining == 0
+    assert result.headers()["RateLimit-Limit"] == "3"
+
+def test_idle_buckets_are_evicted():
+    clock = FakeClock()
+    limiter = TokenBucketLimiter(rate=1.0, capacity=2, clock=clock)
+    for key in ("a", "b", "c"):
+        limiter.hit(key)
+    assert len(limiter) == 3
+
+    clock.now += 5
+    limiter.hit("d")
+    assert len(limiter) == 1
+
+def test_max_keys_bounds_memory():
+    limiter = TokenBucketLimiter(rate=1.0, capacity=2, max_keys=2, clock=FakeClock())
+    for key in ("a", "b", "c"):
+        limiter.hit(key)
+    assert len(limiter) == 2
+
+def _drain_from_child(path, hits):
+    limiter = SharedTokenBucketLimiter(path, rate=0.001, capacity=10, slots=64)
+    for _ in range(hits):
+        limiter.hit("shared-key")
+
+def test_shared_limiter_enforces_limit_across_processes(tmp_path):
+    path = str(tmp_path / "rl.buf")
+    limiter = SharedTokenBucketLimiter(path, rate=0.001, capacity=10, slots=64)
+    assert limiter.hit("shared-key").allowed
+
+    children = [multiprocessing.Process(target=_drain_from_child, args=(path, 4)) for _ in range(2)]
+    for child in children:
+        child.start()
+    for child in children:
+        child.join()
+
+    assert limiter.hit("shared-key").remaining == 0
+    assert not limiter.hit("shared-key").allowed
+    assert limiter.hit("other-key").allowed
+
+def test_shared_limiter_reuses_slots_of_idle_keys(tmp_path):
+    clock = FakeClock()
+    limiter = SharedTokenBucketLimiter(str(tmp_path / "rl.buf"), rate=1.0, capacity=1, slots=1, clock=clock)
+    assert limiter.hit("a").allowed
+    assert not limiter.hit("a").allowed
+    clock.now += 2
+    assert limiter.hit("b").allowed
+    assert int(limiter._keys[0]) == limiter._hash("b")
+
+def test_create_rate_limiter_backends(tmp_path):
+    assert isinstance(create_rate_limiter("memory", 1.0, 5), TokenBucketLimiter)
+    shared = create_rate_limiter("shared", 1.0, 5, path=str(tmp_path / "rl.buf"), slots=16)
+    assert isinstance(shared, SharedTokenBucketLimiter)
+    with pytest.raises(ValueError):
+        create_rate_limiter("redis", 1.0, 5)
+
+def test_dependency_sets_headers_and_rejects():
+    limit = RateLimiter("test", rate=0.001, burst=2)
+    app = FastAPI()
+
+    @app.get("/limited", dependencies=[Depends(limit)])
+    async def limited():
+        return {"ok": True}
+
+    client = TestClient(app)
+    first = client.get("/limited")
+    assert first.status_code == 200
+    assert first.headers["RateLimit-Remaining"] == "1"
+    client.get("/limited")
+    rejected = client.get("/limited")
+    assert rejected.status_code == 429
+    assert int(rejected.headers["Retry-After"]) >= 1
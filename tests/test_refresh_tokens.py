@@ -0,0 +1,100 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import select
+
+from app.database import get_db
+from app.models.user import RefreshToken, User, hash_password
+from app.routes import auth, users
+from app.services.refresh_token_service import hash_token, purge_expired_refresh_tokens
+from app.services.user_cache import user_cache
+
+PASSWORD = "Sup3r$ecret"
+
+@pytest.fixture
+def client(session_factory):
+    async def create_user():
+        async with session_factory() as db:
+            db.add(User(username="frontdesk", password_hash=hash_password(PASSWORD), role="user"))
+            await db.commit()
+
+    async def override_get_db():
+        async with session_factory() as db:
+            yield db
+
+    asyncio.run(create_user())
+    user_cache.invalidate()
+    app = FastAPI()
+    app.include_router(auth.router)
+    app.include_router(users.router)
+    app.dependency_overrides[get_db] = override_get_db
+    return TestClient(app)
+
+def login(client):
+    response = client.post("/api/v1/auth/login", data={"username": "frontdesk", "password": PASSWORD})
+    assert response.status_code == 200
+    return response.json()
+
+def test_login_persists_only_token_digest(client, session_factory):
+    tokens = login(client)
+
+    async def stored():
+        async with session_factory() as db:
+            return list((await db.execute(select(RefreshToken.token))).scalars())
+
+    digests = asyncio.run(stored())
+    assert digests == [hash_token(tokens["refresh_token"])]
+    assert tokens["refresh_token"] not in digests
+
+def test_refresh_rotates_and_detects_reuse(client):
+    first = login(client)
+
+    rotated = client.post("/api/v1/auth/refresh", json={"refresh_token": first["refresh_token"]})
+    assert rotated.status_code == 200
+    second = rotated.json()
+    assert second["refresh_token"] != first["refresh_token"]
+
+    replay = client.post("/api/v1/auth/refresh", json={"refresh_token": first["refresh_token"]})
+    assert replay.status_code == 401
+
+    # Reusing a rotated token revokes the whole family
+    assert client.post("/api/v1/auth/refresh", json={"refresh_token": second["refresh_token"]}).status_code == 401
+
+def test_access_token_is_not_accepted_for_refresh(client):
+    tokens = login(client)
+    response = client.post("/api/v1/auth/refresh", json={"refresh_token": tokens["access_token"]})
+    assert response.status_code == 401
+
+def test_refresh_token_is_not_accepted_as_bearer(client):
+    tokens = login(client)
+    headers = {"Authorization": f"Bearer {tokens['refresh_token']}"}
+    assert client.get("/api/v1/users/me", headers=headers).status_code == 401
+
+    headers = {"Authorization": f"Bearer {tokens['access_token']}"}
+    assert client.get("/api/v1/users/me", headers=headers).json()["username"] == "frontdesk"
+
+def test_logout_revokes_refresh_token(client):
+    tokens = login(client)
+    assert client.post("/api/v1/auth/logout", json={"refresh_token": tokens["refresh_token"]}).status_code == 204
+    assert client.post("/api/v1/auth/refresh", json={"refresh_token": tokens["refresh_token"]}).status_code == 401
+
+def test_purge_removes_expired_tokens(session_factory):
+    now = datetime.utcnow()
+
+    async def run():
+        async with session_factory() as db:
+            db.add(User(id=1, username="u", password_hash="x", role="user"))
+            db.add_all([
+                RefreshToken(user_id=1, token=hash_token("old"), expires_at=now - timedelta(days=1), revoked=False),
+                RefreshToken(user_id=1, token=hash_token("revoked"), expires_at=now + timedelta(days=1), revoked=True),
+                RefreshToken(user_id=1, token=hash_token("live"), expires_at=now + timedelta(days=1), revoked=False),
+            ])
+            await db.commit()
+            purged = await purge_expired_refresh_tokens(db)
+            remaining = await db.execute(select(RefreshToken.token).order_by(RefreshToken.token))
+            return purged, set(remaining.scalars())
+
+    assert asyncio.run(run()) == (1, {hash_token("revoked"), hash_token("live")})
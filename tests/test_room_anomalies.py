@@ -0,0 +1,134 @@
+import asyncio
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.database import get_db
+from app.models.room import RoomDataHourly
+from app.models.user import AuthenticatedUser, get_authenticated_user
+from app.routes import data
+from app.services.room_anomaly_service import (
+    RoomMatrix, build_room_matrix, load_room_rollups, rank_room_anomalies, rank_room_rollups
+)
+from app.services.timeseries import to_epoch
+
+START = datetime(2026, 3, 1)
+
+def hourly_rows(rooms, hours, seed=0):
+    """Rollup rows with a daily temperature cycle plus noise, one reading per bucket"""
+    rng = np.random.default_rng(seed)
+    rows = []
+    for r in range(rooms):
+        for h in range(hours):
+            temp = 21.0 + 1.5 * np.sin(2 * np.pi * h / 24) + rng.normal(0, 0.2)
+            humidity = 45.0 + rng.normal(0, 1.0)
+            rows.append((f"room_{r:04d}", START + timedelta(hours=h), 1, temp, humidity, int(h % 24 > 8)))
+    return rows
+
+def epoch_rows(rows):
+    """hourly_rows with bucket_start as epoch seconds, as load_room_rollups returns them"""
+    return [(room, to_epoch(bucket), *rest) for room, bucket, *rest in rows]
+
+def test_spiking_room_ranks_first():
+    rows = hourly_rows(50, 72)
+    # room_0007's latest hour is 6 degrees hotter than its usual cycle
+    room, bucket, count, temp, humidity, occupied = rows[7 * 72 + 71]
+    rows[7 * 72 + 71] = (room, bucket, count, temp + 6.0, humidity, occupied)
+
+    result = rank_room_rollups(epoch_rows(rows), START, 72, top_k=5)
+    assert result["rooms_scored"] == 50
+    top = result["anomalies"][0]
+    assert (top["room_id"], top["metric"]) == ("room_0007", "temp")
+    assert top["scores"]["seasonal"] > top["scores"]["zscore"] > 3
+    assert result["anomalies"][1]["score"] < top["score"] / 4
+
+def test_rooms_are_judged_on_their_latest_reported_hour():
+    rows = [row for row in hourly_rows(3, 48) if not (row[0] == "room_0001" and row[1] >= START + timedelta(hours=40))]
+    matrix = build_room_matrix(epoch_rows(rows), START, 48)
+    assert np.isnan(matrix.values["temp"][1, 40:]).all()
+    result = rank_room_anomalies(matrix, min_score=0)
+    assert result["rooms_scored"] == 3
+
+def test_scoring_two_thousand_rooms_is_fast():
+    rng = np.random.default_rng(2)
+    cycle = 21.0 + 1.5 * np.sin(2 * np.pi * np.arange(168) / 24)
+    matrix = RoomMatrix(
+        room_ids=np.array([f"room_{r:04d}" for r in range(2000)], dtype=object),
+        start=START,
+        hours=168,
+        values={
+            "temp": cycle + rng.normal(0, 0.2, (2000, 168)),
+            "humidity": rng.normal(45.0, 1.0, (2000, 168)),
+            "occupancy": rng.uniform(0, 1, (2000, 168))
+        }
+    )
+    started = time.perf_counter()
+    result = rank_room_anomalies(matrix, top_k=20, min_score=0)
+    assert time.perf_counter() - started < 1.0
+    assert result["rooms_scored"] == 2000
+    assert len(result["anomalies"]) == 20
+
+def test_building_two_thousand_rooms_is_fast():
+    rng = np.random.default_rng(4)
+    temps = 21.0 + rng.normal(0, 0.2, (2000, 168))
+    start = to_epoch(START)
+    rows = [
+        (f"room_{r:04d}", start + h * 3600, 1, temps[r, h], 45.0, 1)
+        for r in range(2000) for h in range(168)
+    ]
+    started = time.perf_counter()
+    result = rank_room_rollups(rows, START, 168, top_k=20, min_score=0)
+    assert time.perf_counter() - started < 1.0
+    assert result["rooms_scored"] == 2000
+
+def test_room_anomalies_endpoint(session_factory):
+    now = datetime.utcnow().replace(minute=0, second=0, microsecond=0)
+    rows = hourly_rows(5, 48, seed=1)
+    offset = now - (START + timedelta(hours=47))
+
+    async def load():
+        async with session_factory() as db:
+            db.add_all([
+                RoomDataHourly(room_id=room, bucket_start=bucket + offset, count=count, temp_sum=temp,
+                               temp_min=temp, temp_max=temp, humidity_sum=humidity, humidity_min=humidity,
+                               humidity_max=humidity, occupied_count=occupied)
+                for room, bucket, count, temp, humidity, occupied in rows
+            ])
+            await db.commit()
+            loaded, start = await load_room_rollups(db, now, 48)
+            return build_room_matrix(loaded, start, 48)
+
+    matrix = asyncio.run(load())
+    assert matrix.values["temp"].shape == (5, 48)
+    assert not np.isnan(matrix.values["temp"]).any()
+
+    async def override_get_db():
+        async with session_factory() as db:
+            yield db
+
+    async def override_user():
+        return AuthenticatedUser(id=1, username="viewer", role="viewer")
+
+    app = FastAPI()
+    app.include_router(data.router)
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_authenticated_user] = override_user
+    response = TestClient(app).get("/api/v1/anomalies/rooms", params={"min_score": 0, "top_k": 3})
+    assert response.status_code == 200
+    body = response.json()
+    assert body["rooms_scored"] == 5
+    assert len(body["anomalies"]) == 3
+    assert body["anomalies"][0]["score"] >= body["anomalies"][-1]["score"]
+
+def test_jump_from_a_flat_history_is_flagged():
+    rows = [("room_flat", to_epoch(START) + h * 3600, 1, 21.0, 45.0, 1) for h in range(47)]
+    rows.append(("room_flat", to_epoch(START) + 47 * 3600, 1, 60.0, 45.0, 1))
+    result = rank_room_rollups(rows, START, 48)
+    assert [a["room_id"] for a in result["anomalies"]] == ["room_flat"]
+    assert result["anomalies"][0]["metric"] == "temp"
+
+    steady = rank_room_rollups(rows[:-1], START, 48, min_score=0)
+    assert steady["anomalies"][0]["score"] == 0
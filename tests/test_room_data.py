@@ -0,0 +1,251 @@
+import asyncio
+import pytest
+from datetime import date, datetime, timedelta
+from sqlalchemy import func, select
+from app.models.room import RoomData
+from app.routes.data import _validate_bulk_items
+from app.services import ingest_buffer
+from app.services.ingest_buffer import WriteBehindBuffer
+from app.services.room_cache import LatestReadingCache, latest_readings
+from app.services.retention_service import month_start, partition_name, purge_expired_rows
+from app.services.room_data_service import bulk_insert_room_data, latest_per_room_query
+
+def reading(room_id="room_1", **overrides):
+    return {"room_id": room_id, "temp": 22.5, "humidity": 45.0, "occupied": True, **overrides}
+
+def test_validate_bulk_items_reports_per_item_status():
+    rows, results = _validate_bulk_items([reading(), {"room_id": "room_2"}, reading("room_3")])
+
+    assert [row["room_id"] for row in rows] == ["room_1", "room_3"]
+    assert [result["status"] for result in results] == ["created", "invalid", "created"]
+    assert {error["loc"] for error in results[1]["errors"]} == {("temp",), ("humidity",), ("occupied",)}
+
+def test_bulk_insert_room_data(session_factory):
+    async def run():
+        async with session_factory() as db:
+            inserted = await bulk_insert_room_data(db, [reading(f"room_{i}") for i in range(100)])
+            count = (await db.execute(select(func.count(RoomData.id)))).scalar()
+            return inserted, count
+
+    assert asyncio.run(run()) == (100, 100)
+
+def test_write_behind_buffer_backpressure_and_drain(session_factory, monkeypatch):
+    monkeypatch.setattr(ingest_buffer, "async_session", session_factory)
+    buffer = WriteBehindBuffer(max_rows=10, flush_rows=4, flush_interval=0.01)
+
+    async def run():
+        await buffer.start()
+        assert buffer.submit([reading() for _ in range(6)])
+        assert not buffer.submit([reading() for _ in range(6)])
+        await buffer.stop()
+        async with session_factory() as db:
+            return (await db.execute(select(func.count(RoomData.id)))).scalar()
+
+    assert asyncio.run(run()) == 6
+    assert buffer.depth == 0
+    assert buffer.rejected_total == 6
+    assert buffer.stats()["flushed_total"] == 6
+    assert not buffer.submit([reading()])
+
+def test_bulk_insert_assigns_ids_and_updates_latest_cache(session_factory):
+    latest_readings.invalidate()
+
+    async def run():
+        async with session_factory() as db:
+            rows = [reading("room_a", temp=20.0), reading("room_a", temp=21.0), reading("room_b")]
+            rows[1]["timestamp"] = datetime(2030, 1, 1)
+            await bulk_insert_room_data(db, rows)
+            return rows
+
+    rows = asyncio.run(run())
+    assert [row["id"] for row in rows] == [1, 2, 3]
+    assert latest_readings.get("room_a")["temp"] == 21.0
+    assert latest_readings.get("room_b")["id"] == 3
+    assert latest_readings.get("room_c") is None
+
+def test_latest_cache_expires_entries():
+    cache = LatestReadingCache(ttl=0)
+    cache.put({**reading(), "id": 1, "timestamp": datetime(2030, 1, 1)})
+    assert cache.get("room_1") is None
+
+def test_latest_per_room_query(session_factory):
+    async def run(room_ids):
+        async with session_factory() as db:
+            rows = [reading(f"room_{i % 3}", temp=float(i)) for i in range(9)]
+            for i, row in enumerate(rows):
+                row["timestamp"] = datetime(2030, 1, 1, i)
+            await bulk_insert_room_data(db, rows)
+            result = await db.execute(latest_per_room_query("sqlite", room_ids))
+            return [(row.room_id, row.temp) for row in result.scalars()]
+
+    assert asyncio.run(run(None)) == [("room_0", 6.0), ("room_1", 7.0), ("room_2", 8.0)]
+
+def test_latest_per_room_query_filters_rooms(session_factory):
+    async def run():
+        async with session_factory() as db:
+            await bulk_insert_room_data(db, [reading("room_a"), reading("room_b")])
+            result = await db.execute(latest_per_room_query("sqlite", ["room_b"]))
+            return [row.room_id for row in result.scalars()]
+
+    assert asyncio.run(run()) == ["room_b"]
+
+def test_purge_expired_rows_in_chunks(session_factory):
+    async def run():
+        async with session_factory() as db:
+            rows = [reading(f"room_{i}") for i in range(25)]
+            for i, row in enumerate(rows):
+                row["timestamp"] = datetime.utcnow() - timedelta(days=100 if i < 20 else 1)
+            await bulk_insert_room_data(db, rows)
+            deleted = await purge_expired_rows(db, retention_days=90, chunk_size=7)
+            remaining = (await db.execute(select(func.count(RoomData.id)))).scalar()
+            return deleted, remaining
+
+    assert asyncio.run(run()) == (20, 5)
+
+def test_partition_months():
+    assert month_start(date(2026, 11, 17), 2) == date(2027, 1, 1)
+    assert partition_name(month_start(date(2026, 3, 31))) == "room_data_y2026m03"
+
+def test_room_data_primary_key_matches_partitioned_table():
+    from sqlalchemy.dialects import postgresql
+    from sqlalchemy.schema import CreateTable
+    from app.models.room import RoomData
+
+    table = RoomData.__table__
+    assert [c.name for c in table.primary_key.columns] == ["id", "timestamp"]
+    assert not table.c.timestamp.nullable
+    assert "PRIMARY KEY (id, timestamp)" in str(CreateTable(table).compile(dialect=postgresql.dialect()))
+
+def test_validate_bulk_items_does_not_echo_input():
+    _, results = _validate_bulk_items([{"room_id": "room_1", "temp": "secret-ish", "humidity": 1, "occupied": True}])
+    error = results[0]["errors"][0]
+    assert "input" not in error and "ctx" not in error
+
+def test_bulk_ingest_requires_create_room_data(session_factory):
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    from app.database import get_db
+    from app.models.user import AuthenticatedUser, get_authenticated_user
+    from app.routes import data
+
+    async def override_get_db():
+        async with session_factory() as db:
+            yield db
+
+    role = {"value": "viewer"}
+
+    async def override_user():
+        return AuthenticatedUser(id=1, username="someone", role=role["value"])
+
+    app = FastAPI()
+    app.include_router(data.router)
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_authenticated_user] = override_user
+    client = TestClient(app)
+
+    assert client.post("/api/v1/data/bulk", json=[reading()]).status_code == 403
+    role["value"] = "user"
+    assert client.post("/api/v1/data/bulk", json=[reading()]).json()["accepted"] == 1
+
+class FakeSession:
+    async def __aenter__(self):
+        return None
+
+    async def __aexit__(self, *exc):
+        return False
+
+def test_write_behind_buffer_dead_letters_a_poison_row(monkeypatch):
+    written = []
+
+    async def fake_insert(db, rows):
+        if any(row["room_id"] == "poison" for row in rows):
+            raise ValueError("constraint violated")
+        written.extend(row["room_id"] for row in rows)
+        return len(rows)
+
+    monkeypatch.setattr(ingest_buffer, "bulk_insert_room_data", fake_insert)
+    monkeypatch.setattr(ingest_buffer, "async_session", FakeSession)
+    buffer = WriteBehindBuffer(max_rows=100, flush_rows=8, flush_interval=0.01, max_attempts=2)
+    rows = [reading(f"room_{i}") for i in range(16)]
+    rows[5] = reading("poison")
+    buffer.submit(rows)
+
+    async def run():
+        for _ in range(50):
+            if not buffer.depth:
+                break
+            await buffer.flush()
+
+    asyncio.run(run())
+    assert buffer.depth == 0
+    assert buffer.dead_lettered_total == 1
+    assert buffer.dead_letters[0]["room_id"] == "poison"
+    assert written == [f"room_{i}" for i in range(16) if i != 5]
+
+def test_write_behind_buffer_drains_backlog_without_waiting(monkeypatch, session_factory):
+    monkeypatch.setattr(ingest_buffer, "async_session", session_factory)
+    buffer = WriteBehindBuffer(max_rows=1000, flush_rows=10, flush_interval=60)
+
+    async def run():
+        await buffer.start()
+        buffer.submit([reading() for _ in range(100)])
+        for _ in range(200):
+            if not buffer.depth:
+                break
+            await asyncio.sleep(0.01)
+        depth = buffer.depth
+        await buffer.stop()
+        return depth
+
+    assert asyncio.run(run()) == 0
+    assert buffer.flush_count == 10
+
+def test_write_behind_buffer_returns_to_full_batches_after_dead_letter(monkeypatch):
+    sizes = []
+
+    async def fake_insert(db, rows):
+        if any(row["room_id"] == "poison" for row in rows):
+            raise ValueError("constraint violated")
+        sizes.append(len(rows))
+        return len(rows)
+
+    monkeypatch.setattr(ingest_buffer, "bulk_insert_room_data", fake_insert)
+    monkeypatch.setattr(ingest_buffer, "async_session", FakeSession)
+    buffer = WriteBehindBuffer(max_rows=5000, flush_rows=1024, max_attempts=1)
+    rows = [reading(f"room_{i}") for i in range(2048)]
+    rows[0] = reading("poison")
+    buffer.submit(rows)
+
+    async def run():
+        while buffer.depth:
+            await buffer.flush()
+
+    asyncio.run(run())
+    assert buffer.dead_lettered_total == 1
+    assert sum(sizes) == 2047
+    # The suspect batch is not trickled out row by row after the bad row is gone
+    assert len(sizes) <= 3
+    assert sizes.count(1) == 0
+
+def test_write_behind_buffer_retries_on_shutdown(monkeypatch):
+    written = []
+    failures = [ConnectionError("transient")]
+
+    async def fake_insert(db, rows):
+        if failures:
+            raise failures.pop()
+        written.extend(rows)
+        return len(rows)
+
+    monkeypatch.setattr(ingest_buffer, "bulk_insert_room_data", fake_insert)
+    monkeypatch.setattr(ingest_buffer, "async_session", FakeSession)
+    buffer = WriteBehindBuffer(max_rows=100, flush_rows=50, flush_interval=60)
+
+    async def run():
+        await buffer.start()
+        buffer.submit([reading() for _ in range(20)])
+        await buffer.stop()
+
+    asyncio.run(run())
+    assert len(written) == 20
+    assert buffer.dead_lettered_total == 0
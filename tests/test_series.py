@@ -0,0 +1,119 @@
+import asyncio
+import numpy as np
+import pytest
+from datetime import datetime, timedelta
+from app.services.room_data_service import bulk_insert_room_data
+from app.services.series_service import (
+    ROLLUP_BUCKETS, downsample_points, lttb_indices, query_rollup_series, query_room_series
+)
+
+def reading(room_id, **overrides):
+    return {"room_id": room_id, "temp": 22.5, "humidity": 45.0, "occupied": True, **overrides}
+
+def test_lttb_keeps_endpoints_and_peaks():
+    x = np.arange(1000, dtype=np.float64)
+    y = np.sin(x / 50)
+    y[500] = 10.0
+
+    indices = lttb_indices(x, y, 50)
+    assert len(indices) == 50
+    assert indices[0] == 0 and indices[-1] == 999
+    assert 500 in indices
+    assert np.all(np.diff(indices) > 0)
+
+def test_lttb_returns_everything_under_threshold():
+    x = np.arange(10, dtype=np.float64)
+    assert list(lttb_indices(x, x, 20)) == list(range(10))
+
+def test_query_room_series_buckets_in_sql(session_factory):
+    base = datetime(2030, 1, 1)
+
+    async def run():
+        async with session_factory() as db:
+            rows = [reading("room_1", temp=float(i), occupied=i % 2 == 0) for i in range(120)]
+            for i, row in enumerate(rows):
+                row["timestamp"] = base + timedelta(minutes=i)
+            await bulk_insert_room_data(db, rows)
+            return await query_room_series(db, "room_1", base, base + timedelta(hours=2), 3600, ["avg", "min", "max", "count"])
+
+    points = asyncio.run(run())
+    assert [p["timestamp"] for p in points] == [base, base + timedelta(hours=1)]
+    assert points[0]["count"] == 60
+    assert points[0]["temp_min"] == 0.0 and points[0]["temp_max"] == 59.0
+    assert points[1]["temp_avg"] == 89.5
+    assert points[0]["occupied_ratio"] == 0.5
+
+def test_downsample_points():
+    base = datetime(2030, 1, 1)
+    points = [{"timestamp": base + timedelta(minutes=i), "temp_avg": float(i % 7)} for i in range(100)]
+    assert len(downsample_points(points, 10)) == 10
+    assert downsample_points(points, 100) is points
+
+def test_rollups_match_raw_aggregates(session_factory):
+    base = datetime(2030, 1, 1)
+
+    async def run():
+        async with session_factory() as db:
+            for batch in range(2):
+                rows = [reading("room_1", temp=float(i), humidity=float(batch), occupied=i % 4 == 0) for i in range(60)]
+                for i, row in enumerate(rows):
+                    row["timestamp"] = base + timedelta(minutes=i * 2 + batch)
+                await bulk_insert_room_data(db, rows)
+            end = base + timedelta(days=1)
+            raw = await query_room_series(db, "room_1", base, end, 3600, ["avg", "min", "max", "count"])
+            hourly = await query_rollup_series(db, "room_1", base, end, ROLLUP_BUCKETS["1h"], ["avg", "min", "max", "count"])
+            daily = await query_rollup_series(db, "room_1", base, end, ROLLUP_BUCKETS["1d"], ["count"])
+            return raw, hourly, daily
+
+    raw, hourly, daily = asyncio.run(run())
+    assert len(hourly) == len(raw) == 2
+    for raw_point, rollup_point in zip(raw, hourly):
+        assert rollup_point.pop("timestamp") == raw_point.pop("timestamp")
+        assert rollup_point == pytest.approx(raw_point)
+    assert daily == [{"count": 120, "timestamp": base}]
+
+def test_rollup_aggregates_are_in_lock_order():
+    from app.services.rollup_service import aggregate_rollup_rows, truncate_hour
+
+    base = datetime(2030, 1, 1)
+    rows = [
+        reading(room, timestamp=base + timedelta(hours=h))
+        for h, room in [(2, "room_2"), (0, "room_1"), (1, "room_2"), (3, "room_1"), (0, "room_2")]
+    ]
+    keys = [(a["room_id"], a["bucket_start"]) for a in aggregate_rollup_rows(rows, truncate_hour)]
+    assert keys == sorted(keys)
+
+def test_series_endpoint_accepts_offset_aware_bounds(session_factory):
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    from app.database import get_db
+    from app.models.user import AuthenticatedUser, get_authenticated_user
+    from app.routes import data
+
+    async def seed():
+        async with session_factory() as db:
+            rows = [reading("room_1", timestamp=datetime(2030, 1, 1, 10, i)) for i in range(30)]
+            await bulk_insert_room_data(db, rows)
+
+    async def override_get_db():
+        async with session_factory() as db:
+            yield db
+
+    async def override_user():
+        return AuthenticatedUser(id=1, username="viewer", role="viewer")
+
+    asyncio.run(seed())
+    app = FastAPI()
+    app.include_router(data.router)
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_authenticated_user] = override_user
+    client = TestClient(app)
+
+    # 12:00+02:00 is 10:00 UTC; "end" is left to default to now
+    response = client.get("/api/v1/room/room_1/series", params={"start": "2030-01-01T12:00:00+02:00", "bucket": "1h"})
+    assert response.status_code == 400  # start is after the default end, but no longer a 500
+    response = client.get("/api/v1/room/room_1/series", params={
+        "start": "2030-01-01T12:00:00+02:00", "end": "2030-01-01T11:00:00Z", "bucket": "1m"
+    })
+    assert response.status_code == 200
+    assert response.json()["total_buckets"] == 30
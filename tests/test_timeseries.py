@@ -0,0 +1,125 @@
+import multiprocessing
+import threading
+import numpy as np
+import pytest
+from app.services.timeseries import MetricsBuffer, SharedMetricsBuffer, create_metrics_buffer
+
+def make_reading(i):
+    return {
+        "energy_usage": 1000.0 + i,
+        "occupancy": 50.0 + i,
+        "temperature": 22.0,
+        "humidity": 45.0,
+        "carbon_intensity": 300.0,
+        "energy_price": 0.2,
+        "potential_savings": 100.0,
+        "timestamp": 1_700_000_000 + i * 60
+    }
+
+def test_append_and_evict_keeps_latest_readings():
+    buffer = MetricsBuffer(capacity=5)
+    for i in range(12):
+        buffer.append(make_reading(i))
+
+    assert len(buffer) == 5
+    assert buffer.count == 12
+    assert list(buffer.column("energy_usage")) == [1007.0, 1008.0, 1009.0, 1010.0, 1011.0]
+    assert list(buffer.timestamps(2)) == [1_700_000_000 + 10 * 60, 1_700_000_000 + 11 * 60]
+    assert buffer.latest()["occupancy"] == 61.0
+
+def test_window_is_zero_copy_view():
+    buffer = MetricsBuffer(capacity=4)
+    for i in range(6):
+        buffer.append(make_reading(i))
+
+    window = buffer.column("energy_usage", 3)
+    assert np.shares_memory(window, buffer.window())
+    assert window.flags["C_CONTIGUOUS"]
+
+def test_records_round_trip_iso_timestamps():
+    buffer = MetricsBuffer(capacity=3)
+    buffer.append({**make_reading(0), "timestamp": "2024-01-01T10:00:00"})
+
+    records = buffer.records()
+    assert len(records) == 1
+    assert records[0]["timestamp"] == "2024-01-01T10:00:00"
+    assert records[0]["energy_usage"] == 1000.0
+
+def test_records_keep_sub_second_timestamps_and_integrations(tmp_path):
+    reading = {**make_reading(0), "integrations": 5, "timestamp": "2024-01-01T10:00:00.250000"}
+    for buffer in (MetricsBuffer(capacity=3), SharedMetricsBuffer(str(tmp_path / "metrics.buf"), capacity=3)):
+        buffer.append(reading)
+        record = buffer.records()[0]
+        assert record["timestamp"] == "2024-01-01T10:00:00.250000"
+        assert record["integrations"] == 5 and isinstance(record["integrations"], int)
+        assert buffer.frozen().records() == [record]
+        assert buffer.timestamps(1)[0] == 1_704_103_200
+
+def test_empty_buffer():
+    buffer = MetricsBuffer(capacity=3)
+    assert len(buffer) == 0
+    assert buffer.latest() is None
+    assert buffer.column("energy_usage").size == 0
+
+def _append_from_child(path, start):
+    buffer = SharedMetricsBuffer(path, capacity=8)
+    for i in range(start, start + 5):
+        buffer.append(make_reading(i))
+
+def test_shared_buffer_is_visible_across_processes(tmp_path):
+    path = str(tmp_path / "metrics.buf")
+    buffer = SharedMetricsBuffer(path, capacity=8)
+    assert buffer.seed([make_reading(0)])
+    assert not buffer.seed([make_reading(1)])
+
+    children = [multiprocessing.Process(target=_append_from_child, args=(path, start)) for start in (10, 20)]
+    for child in children:
+        child.start()
+    for child in children:
+        child.join()
+
+    assert buffer.count == 11
+    assert len(buffer) == 8
+    assert len(buffer.records()) == 8
+    assert not np.shares_memory(buffer.column("energy_usage"), buffer._values)
+
+def test_shared_buffer_rejects_mismatched_capacity(tmp_path):
+    path = str(tmp_path / "metrics.buf")
+    SharedMetricsBuffer(path, capacity=8)
+    with pytest.raises(ValueError):
+        SharedMetricsBuffer(path, capacity=16)
+
+def test_create_metrics_buffer_backends(tmp_path):
+    assert type(create_metrics_buffer("memory", capacity=4)) is MetricsBuffer
+    shared = create_metrics_buffer("shared", capacity=4, path=str(tmp_path / "m.buf"))
+    assert isinstance(shared, SharedMetricsBuffer)
+    with pytest.raises(ValueError):
+        create_metrics_buffer("redis")
+
+def test_frozen_copy_is_consistent_under_concurrent_appends():
+    buffer = MetricsBuffer(capacity=50)
+    stop = threading.Event()
+    appended = [0, 0]
+
+    def writer(slot):
+        i = 0
+        while not stop.is_set():
+            # Every column of reading i carries i, so a torn copy would mix values
+            buffer.append({name: float(i) for name in ("energy_usage", "occupancy")} | {"timestamp": i})
+            i += 1
+        appended[slot] = i
+
+    threads = [threading.Thread(target=writer, args=(slot,)) for slot in range(2)]
+    for thread in threads:
+        thread.start()
+    try:
+        for _ in range(500):
+            frozen = buffer.frozen()
+            assert frozen.count <= buffer.count
+            assert np.array_equal(frozen.column("energy_usage"), frozen.column("occupancy"))
+            assert np.array_equal(frozen.column("energy_usage"), frozen.timestamps().astype(np.float64))
+    finally:
+        stop.set()
+        for thread in threads:
+            thread.join()
+    assert buffer.count == sum(appended)
@@ -0,0 +1,160 @@
+import asyncio
+import json
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.database import get_db
+from app.models.user import AuthenticatedUser, User, get_current_admin
+from app.routes import users
+
+@pytest.fixture
+def client(session_factory, monkeypatch):
+    async def override_get_db():
+        async with session_factory() as db:
+            yield db
+
+    async def override_admin():
+        return AuthenticatedUser(id=1, username="admin", role="admin")
+
+    monkeypatch.setattr(users, "async_session", session_factory)
+    app = FastAPI()
+    app.include_router(users.router)
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_current_admin] = override_admin
+    return TestClient(app)
+
+@pytest.fixture
+def many_users(session_factory):
+    """25 users; the last five share a created_at to exercise the id tie-break"""
+    base = datetime(2026, 1, 1)
+
+    async def create():
+        async with session_factory() as db:
+            for i in range(25):
+                created_at = base + timedelta(minutes=min(i, 20))
+                db.add(User(username=f"user{i:02d}", password_hash="x", role="viewer", created_at=created_at))
+            await db.commit()
+
+    asyncio.run(create())
+
+def test_list_users_keyset_pages_cover_every_user_once(client, many_users):
+    seen = []
+    cursor = None
+    pages = 0
+    while True:
+        params = {"limit": 7}
+        if cursor:
+            params["cursor"] = cursor
+        response = client.get("/api/v1/users/", params=params)
+        assert response.status_code == 200
+        seen.extend(user["username"] for user in response.json())
+        pages += 1
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            break
+
+    assert pages == 4
+    assert len(seen) == len(set(seen)) == 25
+    assert seen[:5] == ["user24", "user23", "user22", "user21", "user20"]
+
+def test_list_users_rejects_bad_cursor(client, many_users):
+    assert client.get("/api/v1/users/", params={"cursor": "not-a-cursor"}).status_code == 400
+
+def test_list_users_ndjson_streams_remaining_users(client, many_users):
+    first_page = client.get("/api/v1/users/", params={"limit": 10})
+    response = client.get(
+        "/api/v1/users/",
+        params={"format": "ndjson", "cursor": first_page.headers["X-Next-Cursor"]}
+    )
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert len(lines) == 15
+    assert "password_hash" not in lines[0]
+
+@pytest.fixture
+def existing_user(session_factory):
+    async def create():
+        async with session_factory() as db:
+            db.add(User(id=1, username="admin", email="admin@example.com", password_hash="x", role="admin",
+                        created_at=datetime(2026, 1, 1)))
+            db.add(User(id=2, username="frontdesk", email="desk@example.com", password_hash="x", role="viewer",
+                        created_at=datetime(2026, 1, 2)))
+            await db.commit()
+
+    asyncio.run(create())
+
+def test_create_user_reports_which_field_is_taken(client, existing_user):
+    payload = {"username": "frontdesk", "email": "new@example.com", "password": "Sup3r$ecret"}
+    response = client.post("/api/v1/users/", json=payload)
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Username already registered"
+
+    payload = {"username": "night", "email": "desk@example.com", "password": "Sup3r$ecret"}
+    assert client.post("/api/v1/users/", json=payload).json()["detail"] == "Email already registered"
+
+def test_update_user_checks_email_and_last_admin_in_one_query(client, existing_user):
+    response = client.put("/api/v1/users/2", json={"email": "admin@example.com"})
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Email already registered"
+
+    response = client.put("/api/v1/users/1", json={"role": "viewer"})
+    assert response.json()["detail"] == "Cannot remove the last admin user"
+
+    response = client.put("/api/v1/users/2", json={"email": "desk2@example.com", "role": "user"})
+    assert response.status_code == 200
+    assert (response.json()["email"], response.json()["role"]) == ("desk2@example.com", "user")
+
+def test_bulk_import_from_csv(client, existing_user):
+    body = "\n".join([
+        "username,email,password,role",
+        "housekeeping,hk@example.com,Sup3r$ecret,viewer",
+        "maintenance,,Sup3r$ecret,user",
+        "weak,weak@example.com,password,viewer",
+        "frontdesk,other@example.com,Sup3r$ecret,viewer",
+        "housekeeping,hk2@example.com,Sup3r$ecret,viewer",
+    ])
+    response = client.post("/api/v1/users/bulk", content=body, headers={"content-type": "text/csv"})
+    assert response.status_code == 200
+    result = response.json()
+    assert (result["created"], result["rejected"]) == (2, 3)
+    assert [item["status"] for item in result["results"]] == ["created", "created", "invalid", "conflict", "conflict"]
+
+    listed = {user["username"]: user for user in client.get("/api/v1/users/").json()}
+    assert listed["maintenance"]["email"] is None
+    assert listed["maintenance"]["role"] == "user"
+
+def test_bulk_import_json_validation_errors_omit_passwords(client, existing_user):
+    response = client.post("/api/v1/users/bulk", json=[{"username": "x", "password": "Sup3r$ecret", "email": "bad"}])
+    item = response.json()["results"][0]
+    assert item["status"] == "invalid"
+    assert "Sup3r$ecret" not in json.dumps(item)
+
+def test_bulk_import_hashes_outside_a_transaction(client, session_factory, monkeypatch):
+    from sqlalchemy import event
+
+    engine = session_factory.kw["bind"].sync_engine
+    checked_out = []
+    event.listen(engine, "checkout", lambda *args: checked_out.append(1))
+    event.listen(engine, "checkin", lambda *args: checked_out.pop())
+    held_while_hashing = []
+
+    async def fake_map(fn, passwords):
+        held_while_hashing.append(len(checked_out))
+        return [f"hash-{p}" for p in passwords]
+
+    monkeypatch.setattr(users.bulk_password_pool, "map", fake_map)
+    response = client.post("/api/v1/users/bulk", json=[{"username": "night", "password": "Sup3r$ecret"}])
+    assert response.json()["created"] == 1
+    assert held_while_hashing == [0]
+
+@pytest.mark.parametrize("body", [
+    b"username,password\n\xff\xfe,Sup3r$ecret",
+    b"username,password\nx," + b"a" * 200000,  # over csv.field_size_limit()
+], ids=["not-utf8", "oversized-field"])
+def test_bulk_import_rejects_malformed_csv(client, body):
+    response = client.post("/api/v1/users/bulk", content=body, headers={"content-type": "text/csv"})
+    assert response.status_code == 400
+    assert response.json()["detail"].startswith("Malformed CSV")